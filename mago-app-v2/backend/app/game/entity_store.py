@@ -0,0 +1,129 @@
+"""
+Indexed entity storage: id -> entity, tile -> entities and a coarse
+spatial hash for radius queries. Serializes to the same list-of-dicts
+JSON shape as the old current_state["enemies"].
+"""
+from typing import Any, Dict, Iterator, KeysView, List, Optional, Set, Tuple
+
+Position = Tuple[int, int]
+
+CELL_SIZE = 8
+
+class Entity:
+    __slots__ = ("id", "x", "y", "data")
+    
+    def __init__(self, entity_id: str, x: int, y: int, data: Dict[str, Any]):
+        self.id = entity_id
+        self.x = x
+        self.y = y
+        self.data = data  # everything except id and position (type, name, health, ...)
+    
+    @property
+    def position(self) -> Position:
+        return (self.x, self.y)
+    
+    @property
+    def type(self) -> str:
+        return self.data.get("type", "")
+    
+    @classmethod
+    def from_dict(cls, entity: Dict[str, Any]) -> "Entity":
+        data = {k: v for k, v in entity.items() if k not in ("id", "position")}
+        x, y = entity["position"]
+        return cls(entity["id"], int(x), int(y), data)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.data, "id": self.id, "position": (self.x, self.y)}
+
+def _cell(x: int, y: int) -> Position:
+    return (x // CELL_SIZE, y // CELL_SIZE)
+
+class EntityStore:
+    def __init__(self):
+        self._by_id: Dict[str, Entity] = {}
+        self._by_pos: Dict[Position, List[Entity]] = {}
+        self._cells: Dict[Position, Set[Entity]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._by_id)
+    
+    def __iter__(self) -> Iterator[Entity]:
+        return iter(list(self._by_id.values()))
+    
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._by_id
+    
+    def _index(self, entity: Entity) -> None:
+        self._by_pos.setdefault(entity.position, []).append(entity)
+        self._cells.setdefault(_cell(entity.x, entity.y), set()).add(entity)
+    
+    def _unindex(self, entity: Entity) -> None:
+        occupants = self._by_pos[entity.position]
+        occupants.remove(entity)
+        if not occupants:
+            del self._by_pos[entity.position]
+        cell = _cell(entity.x, entity.y)
+        self._cells[cell].discard(entity)
+        if not self._cells[cell]:
+            del self._cells[cell]
+    
+    def add(self, entity_data: Dict[str, Any]) -> Entity:
+        entity = Entity.from_dict(entity_data)
+        if entity.id in self._by_id:
+            self.remove(entity.id)
+        self._by_id[entity.id] = entity
+        self._index(entity)
+        return entity
+    
+    def remove(self, entity_id: str) -> Optional[Entity]:
+        entity = self._by_id.pop(entity_id, None)
+        if entity is not None:
+            self._unindex(entity)
+        return entity
+    
+    def get(self, entity_id: str) -> Optional[Entity]:
+        return self._by_id.get(entity_id)
+    
+    def move(self, entity_id: str, position: Position) -> bool:
+        entity = self._by_id.get(entity_id)
+        if entity is None:
+            return False
+        self._unindex(entity)
+        entity.x, entity.y = int(position[0]), int(position[1])
+        self._index(entity)
+        return True
+    
+    def at(self, position: Position) -> Optional[Entity]:
+        occupants = self._by_pos.get(tuple(position))
+        return occupants[0] if occupants else None
+    
+    def is_occupied(self, position: Position) -> bool:
+        return tuple(position) in self._by_pos
+    
+    def positions(self) -> KeysView:
+        # Live view of occupied tiles; no copy per call
+        return self._by_pos.keys()
+    
+    def within(self, center: Position, radius: int) -> List[Entity]:
+        """Entities within Chebyshev distance ``radius`` of center, sorted by id"""
+        cx, cy = center
+        (min_cx, min_cy), (max_cx, max_cy) = _cell(cx - radius, cy - radius), _cell(cx + radius, cy + radius)
+        found = []
+        for gx in range(min_cx, max_cx + 1):
+            for gy in range(min_cy, max_cy + 1):
+                for entity in self._cells.get((gx, gy), ()):
+                    if abs(entity.x - cx) <= radius and abs(entity.y - cy) <= radius:
+                        found.append(entity)
+        # Cells are sets; sort so callers see the same order every run
+        found.sort(key=lambda entity: str(entity.id))
+        return found
+    
+    @classmethod
+    def from_list(cls, entities: List[Dict[str, Any]]) -> "EntityStore":
+        store = cls()
+        for entity in entities:
+            store.add(entity)
+        return store
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [entity.to_dict() for entity in self._by_id.values()]
\ No newline at end of file
@@ -1,58 +1,83 @@
-from .state_manager import game_state_manager
+from .state_manager import GameStateManager
 from app.llm import ollama_integration
+from app.llm.prompt_engine import NEARBY_RADIUS, get_dungeon_snippet
+import asyncio
+import os
 import random
 from typing import Dict, Any, List, Tuple
+from .entity_store import Entity
+
+ENEMY_DECISION_CONCURRENCY = int(os.getenv("ENEMY_DECISION_CONCURRENCY", "4"))
 
 class EventHandler:
-    def __init__(self):
+    def __init__(self, state: GameStateManager, decision_concurrency: int = ENEMY_DECISION_CONCURRENCY):
+        self.state = state
         self.turn_state = "player"  
+        self.decision_concurrency = decision_concurrency
     
     def process_player_action(self, action_data: Dict[str, Any]) -> Dict[str, Any]:
         if self.turn_state != "player":
             return {"status": "error", "message": "Not player's turn"}
         
-        player = game_state_manager.current_state["player"]
+        player = self.state.current_state["player"]
         px, py = player["position"]
-        dungeon = game_state_manager.get_dungeon()
         
         if action_data["action"] == "move":
             dx, dy = action_data.get("dx", 0), action_data.get("dy", 0)
             new_x, new_y = px + dx, py + dy
             
-            if dungeon[new_y][new_x] != '#':
-                game_state_manager.update_entity_position("player", (new_x, new_y))
-                game_state_manager.add_message(f"Player moves to ({new_x}, {new_y})")
+            blocker = self.state.entity_at((new_x, new_y))
+            if blocker is not None:
+                self.state.add_message(f"{blocker.data.get('name', blocker.type)} blocks your way")
+            elif self.state.is_passable((new_x, new_y)):
+                self.state.update_entity_position("player", (new_x, new_y))
+                self.state.add_message(f"Player moves to ({new_x}, {new_y})")
             else:
-                game_state_manager.add_message("You bump into a wall")
+                self.state.add_message("You bump into a wall")
         
         self.turn_state = "enemies"
+        self.state.mark_dirty()
         return {"status": "success", "next_turn": "enemies"}
     
     async def process_enemy_turns(self) -> Dict[str, Any]:
         if self.turn_state != "enemies":
             return {"status": "error", "message": "Not enemy turn"}
         
-        enemies = game_state_manager.current_state["enemies"]
-        player_pos = game_state_manager.get_player_position()
-        dungeon = game_state_manager.get_dungeon()
+        enemies = list(self.state.enemies)
+        player_pos = self.state.get_player_position()
+        dungeon = self.state.get_dungeon()
         
-        for enemy in enemies:
-            context = {
-                "enemy_type": enemy["type"],
-                "enemy_position": enemy["position"],
-                "player_position": player_pos,
-                "dungeon": dungeon
-            }
-            decision = await ollama_integration.get_decision(context)
-            ex, ey = enemy["position"]
+        decisions = await self._decide_enemy_moves(enemies, player_pos, dungeon)
+        
+        # Apply in enemy order so the outcome doesn't depend on response timing;
+        # enemies can't step onto walls, each other or the player
+        for enemy, decision in zip(enemies, decisions):
+            ex, ey = enemy.position
             if decision["action"] == "move":
                 dx, dy = decision.get("dx", 0), decision.get("dy", 0)
                 new_x, new_y = ex + dx, ey + dy
                 
-                if dungeon[new_y][new_x] != '#':
-                    game_state_manager.update_entity_position(enemy["id"], (new_x, new_y))
+                if self.state.is_walkable((new_x, new_y)):
+                    self.state.update_entity_position(enemy.id, (new_x, new_y))
         self.turn_state = "player"
-        game_state_manager.save_state()
+        self.state.mark_dirty()
         return {"status": "success", "next_turn": "player"}
-
-event_handler = EventHandler()
\ No newline at end of file
+    
+    async def _decide_enemy_moves(self, enemies: List[Entity], player_pos: Tuple[int, int],
+                                  dungeon: List[List[str]]) -> List[Dict[str, Any]]:
+        """Ask the LLM for every enemy's move concurrently, at most decision_concurrency at once"""
+        semaphore = asyncio.Semaphore(self.decision_concurrency)
+        
+        async def decide(enemy: Entity) -> Dict[str, Any]:
+            # The map itself stays in the registry under map_version
+            context = {
+                "enemy_type": enemy.type,
+                "enemy_position": enemy.position,
+                "player_position": player_pos,
+                "nearby_tiles": get_dungeon_snippet(dungeon, enemy.position, NEARBY_RADIUS),
+                "map_version": self.state.map_version
+            }
+            async with semaphore:
+                return await ollama_integration.get_decision(context)
+        
+        return await asyncio.gather(*(decide(enemy) for enemy in enemies))
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Field of view by recursive shadowcasting over the character map, with a
+per-map cache of visible tile sets keyed by (origin, radius). Changing a
+tile's opacity drops only the cached views whose radius box contains it.
+"""
+import os
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+Position = Tuple[int, int]
+
+FOV_RADIUS = int(os.getenv("FOV_RADIUS", "8"))
+UNKNOWN = ' '  # tiles the player has never seen
+
+# (xx, xy, yx, yy) per octant: map offset = (col*xx + row*xy, col*yx + row*yy)
+OCTANTS = [
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)
+]
+
+def is_opaque(tile: str) -> bool:
+    return tile == '#'
+
+def compute_fov(dungeon: List[List[str]], origin: Position, radius: int) -> Set[Position]:
+    """Tiles visible from origin within radius, lit wall faces included; off-map is opaque"""
+    height = len(dungeon)
+    width = len(dungeon[0]) if height else 0
+    ox, oy = origin
+    if not (0 <= ox < width and 0 <= oy < height):
+        return set()
+    
+    visible = {(ox, oy)}
+    radius_sq = radius * radius
+    for xx, xy, yx, yy in OCTANTS:
+        # Rows still to scan as (row, start slope, end slope); replaces recursion
+        stack = [(1, 1.0, 0.0)]
+        while stack:
+            first_row, start, end = stack.pop()
+            if start < end:
+                continue
+            for row in range(first_row, radius + 1):
+                dy = -row
+                blocked = False
+                next_start = start
+                for dx in range(-row, 1):
+                    left = (dx - 0.5) / (dy + 0.5)
+                    right = (dx + 0.5) / (dy - 0.5)
+                    if start < right:
+                        continue
+                    if end > left:
+                        break
+                    
+                    x, y = ox + dx * xx + dy * xy, oy + dx * yx + dy * yy
+                    inside = 0 <= x < width and 0 <= y < height
+                    if inside and dx * dx + dy * dy <= radius_sq:
+                        visible.add((x, y))
+                    
+                    wall = not inside or is_opaque(dungeon[y][x])
+                    if blocked:
+                        if wall:
+                            next_start = right
+                            continue
+                        blocked = False
+                        start = next_start
+                    elif wall and row < radius:
+                        blocked = True
+                        stack.append((row + 1, start, left))
+                        next_start = right
+                if blocked:
+                    break
+    return visible
+
+def mask_dungeon(dungeon: List[List[str]], tiles: Iterable[Position]) -> List[List[str]]:
+    """Copy of the map showing only the given tiles, the rest UNKNOWN"""
+    masked = [[UNKNOWN] * len(row) for row in dungeon]
+    for x, y in tiles:
+        masked[y][x] = dungeon[y][x]
+    return masked
+
+class FOVCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.version = 0  # bumped on every map change
+        self._views: "OrderedDict[Tuple[Position, int], FrozenSet[Position]]" = OrderedDict()
+        
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+    
+    def visible(self, dungeon: List[List[str]], origin: Position, radius: int = FOV_RADIUS) -> FrozenSet[Position]:
+        key = (tuple(origin), radius)
+        view = self._views.get(key)
+        if view is not None:
+            self._views.move_to_end(key)
+            self.hits += 1
+            return view
+        
+        self.misses += 1
+        view = self._views[key] = frozenset(compute_fov(dungeon, key[0], radius))
+        while len(self._views) > self.max_entries:
+            self._views.popitem(last=False)
+        return view
+    
+    def invalidate(self, positions: Iterable[Position]) -> int:
+        """Drop views that could see any of the changed tiles; returns how many"""
+        positions = list(positions)
+        self.version += 1
+        stale = [
+            key for key in self._views
+            if any(abs(x - key[0][0]) <= key[1] and abs(y - key[0][1]) <= key[1] for x, y in positions)
+        ]
+        for key in stale:
+            del self._views[key]
+        self.invalidated += len(stale)
+        return len(stale)
+    
+    def reset(self) -> None:
+        """New map: nothing cached is valid"""
+        self.version += 1
+        self.invalidated += len(self._views)
+        self._views.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "views": len(self._views),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated
+        }
\ No newline at end of file
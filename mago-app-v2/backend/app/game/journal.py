@@ -0,0 +1,261 @@
+"""
+Journaled persistence: a compact binary snapshot plus an append-only log
+of top-level state deltas.
+
+Snapshot (<base>.snap):
+    b"MGSN" | u8 version | u32 generation | u32 map length | map (map_codec, zlib) | zlib(JSON of the rest)
+Log (<base>.log):
+    b"MGLG" | u32 generation, then one record per save:
+    u32 length | u32 crc32 | JSON {"set": {key: value}, "unset": [key],
+        "tiles": {"set": {"x,y": tile}, "unset": []},
+        "enemies": {"set": {id: enemy}, "unset": [id]},
+        "messages": {"append": [message], "keep": n}}
+
+A record holds only what GameStateManager tracked as changed (Changes):
+whole top-level keys, single tiles, single enemies and new messages, so a
+turn that moves a few entities encodes those entities and nothing else.
+Records are flushed to the OS
+on every save and fsynced at most every ``fsync_interval`` seconds. Once
+the log passes ``compact_bytes`` a new snapshot is written atomically and
+the log is truncated. Recovery loads the snapshot and replays the log,
+dropping a torn or corrupt tail. A log whose generation doesn't match
+the snapshot predates it (compaction was interrupted) and is discarded.
+"""
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from . import map_codec
+from .entity_store import EntityStore
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"MGSN"
+SNAPSHOT_VERSION = 1
+LOG_MAGIC = b"MGLG"
+_SNAPSHOT_HEADER = struct.Struct(">4sBII")
+_LOG_HEADER = struct.Struct(">4sI")
+_RECORD_HEADER = struct.Struct(">II")
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+class Changes:
+    # What changed since the last save; filled in by GameStateManager
+    def __init__(self):
+        self.keys: Set[str] = set()  # top-level keys logged whole
+        self.tiles: Set[Tuple[int, int]] = set()
+        self.enemies: Set[str] = set()  # ids added, changed or removed
+        self.messages = 0  # messages appended to message_log
+    
+    def __bool__(self) -> bool:
+        return bool(self.keys or self.tiles or self.enemies or self.messages)
+    
+    def clear(self) -> None:
+        self.keys.clear()
+        self.tiles.clear()
+        self.enemies.clear()
+        self.messages = 0
+
+def _apply(state: Dict[str, Any], enemies: Dict[str, Dict[str, Any]], delta: Dict[str, Any]) -> None:
+    for key in delta.get("unset", []):
+        state.pop(key, None)
+    state.update(delta.get("set", {}))
+    if "tiles" in delta:
+        dungeon = state["dungeon"]
+        for position, tile in delta["tiles"]["set"].items():
+            x, y = map(int, position.split(","))
+            dungeon[y][x] = tile
+    if "enemies" in delta:
+        for entity_id in delta["enemies"].get("unset", []):
+            enemies.pop(entity_id, None)
+        enemies.update(delta["enemies"]["set"])
+    if "messages" in delta:
+        messages = delta["messages"]
+        state["message_log"] = (state.get("message_log", []) + messages["append"])[-messages["keep"]:]
+
+class Journal:
+    def __init__(self, base_path: str, fsync_interval: float = 1.0, compact_bytes: int = 1024 * 1024):
+        self.snapshot_path = f"{base_path}.snap"
+        self.log_path = f"{base_path}.log"
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self._log = None
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self.generation = 0
+        
+        self.records = 0
+        self.bytes_logged = 0
+        self.compactions = 0
+        self.fsyncs = 0
+    
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+    
+    # Snapshot
+    
+    def _write_snapshot(self, state: Dict[str, Any]) -> None:
+        dungeon = state.get("dungeon") or []
+        map_bytes = map_codec.encode_map(dungeon, compress=True) if dungeon else b""
+        rest = {k: v for k, v in state.items() if k != "dungeon"}
+        body = zlib.compress(_dumps(rest).encode())
+        
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.generation, len(map_bytes)))
+            f.write(map_bytes)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+    
+    def _read_snapshot(self) -> Dict[str, Any]:
+        with open(self.snapshot_path, "rb") as f:
+            data = f.read()
+        magic, version, self.generation, map_length = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot {self.snapshot_path}")
+        offset = _SNAPSHOT_HEADER.size
+        dungeon = map_codec.decode_map(data[offset:offset + map_length]) if map_length else []
+        state = json.loads(zlib.decompress(data[offset + map_length:]))
+        return {"dungeon": dungeon, **state}
+    
+    # Log
+    
+    def _open_log(self, truncate: bool = False):
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "wb" if truncate else "ab")
+        if truncate:
+            self._log.write(_LOG_HEADER.pack(LOG_MAGIC, self.generation))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+    
+    def _replay(self, state: Dict[str, Any]) -> int:
+        """Apply logged deltas to state; truncates a torn tail. Returns records applied, -1 if no usable log."""
+        if not os.path.exists(self.log_path):
+            return -1
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+        
+        if len(data) < _LOG_HEADER.size or _LOG_HEADER.unpack_from(data) != (LOG_MAGIC, self.generation):
+            logger.warning("Discarding journal log that doesn't match the snapshot")
+            return -1
+        
+        # Enemies by id while replaying; a list again afterwards
+        enemies = {str(e["id"]): e for e in state.get("enemies", [])}
+        offset, applied = _LOG_HEADER.size, 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, crc = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            _apply(state, enemies, json.loads(payload))
+            offset = start + length
+            applied += 1
+        state["enemies"] = list(enemies.values())
+        
+        if offset < len(data):
+            logger.warning(f"Dropping {len(data) - offset} bytes of torn journal tail")
+            with open(self.log_path, "r+b") as f:
+                f.truncate(offset)
+        self.bytes_logged = offset - _LOG_HEADER.size
+        return applied
+    
+    def recover(self) -> Optional[Dict[str, Any]]:
+        """Snapshot plus replayed log, or None if there is no journal yet"""
+        if not self.exists():
+            return None
+        state = self._read_snapshot()
+        self.records = self._replay(state)
+        if self.records < 0:
+            self.records = 0
+            self._open_log(truncate=True)
+        else:
+            self._open_log()
+        return state
+    
+    def _delta(self, state: Dict[str, Any], enemies: EntityStore, changes: Changes) -> Dict[str, Any]:
+        delta: Dict[str, Any] = {
+            "set": {k: state[k] for k in changes.keys if k in state},
+            "unset": [k for k in changes.keys if k not in state]
+        }
+        if changes.tiles and "dungeon" not in changes.keys:
+            dungeon = state["dungeon"]
+            delta["tiles"] = {"set": {f"{x},{y}": dungeon[y][x] for x, y in changes.tiles}, "unset": []}
+        if changes.enemies:
+            changed: Dict[str, Any] = {}
+            removed: List[str] = []
+            for entity_id in changes.enemies:
+                entity = enemies.get(entity_id)
+                if entity is None:
+                    removed.append(str(entity_id))
+                else:
+                    changed[str(entity_id)] = entity.to_dict()
+            delta["enemies"] = {"set": changed, "unset": removed}
+        if changes.messages and "message_log" not in changes.keys:
+            log = state.get("message_log", [])
+            delta["messages"] = {"append": log[-changes.messages:], "keep": len(log)}
+        return delta
+    
+    def append(self, state: Dict[str, Any], enemies: EntityStore, changes: Changes) -> int:
+        """Log ``changes`` (state without enemies, plus the EntityStore); returns bytes written"""
+        if self._log is None:
+            self.compact({**state, "enemies": enemies.to_list()})
+            return 0
+        if not changes:
+            return 0
+        
+        payload = _dumps(self._delta(state, enemies, changes)).encode()
+        self._log.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._log.write(payload)
+        self._log.flush()
+        self._unsynced = True
+        
+        written = _RECORD_HEADER.size + len(payload)
+        self.records += 1
+        self.bytes_logged += written
+        
+        if self.bytes_logged >= self.compact_bytes:
+            self.compact({**state, "enemies": enemies.to_list()})
+        elif time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self.sync()
+        return written
+    
+    def sync(self) -> None:
+        """fsync records written since the last sync"""
+        if self._log is not None and self._unsynced:
+            os.fsync(self._log.fileno())
+            self.fsyncs += 1
+            self._unsynced = False
+        self._last_fsync = time.monotonic()
+    
+    def compact(self, state: Dict[str, Any]) -> None:
+        """Write a fresh snapshot of state and start an empty log"""
+        self.generation += 1
+        self._write_snapshot(state)
+        self._open_log(truncate=True)
+        self._unsynced = False
+        self.records = 0
+        self.bytes_logged = 0
+        self.compactions += 1
+    
+    def close(self) -> None:
+        self.sync()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "log_bytes": self.bytes_logged,
+            "compactions": self.compactions,
+            "fsyncs": self.fsyncs
+        }
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+Live dungeon maps by map_version, so per-enemy contexts can carry the
+version instead of the whole map and the solver looks the map up here
+"""
+from typing import Dict, Hashable, List, Optional
+
+Grid = List[List[str]]
+
+class MapRegistry:
+    # One entry per live GameStateManager: registering a new version drops
+    # the one it replaces, since set_tile edits the same map in place
+    def __init__(self):
+        self._maps: Dict[Hashable, Grid] = {}
+    
+    def register(self, version: Hashable, dungeon: Grid, replaces: Optional[Hashable] = None) -> None:
+        if replaces is not None:
+            self._maps.pop(replaces, None)
+        self._maps[version] = dungeon
+    
+    def discard(self, version: Hashable) -> None:
+        self._maps.pop(version, None)
+    
+    def get(self, version: Optional[Hashable]) -> Optional[Grid]:
+        return self._maps.get(version) if version is not None else None
+    
+    def __len__(self) -> int:
+        return len(self._maps)
+
+maps = MapRegistry()
\ No newline at end of file
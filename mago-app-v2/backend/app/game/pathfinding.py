@@ -0,0 +1,159 @@
+"""
+Dijkstra maps: one distance field per goal, shared by every enemy, with
+approach, flee and ranged variants
+"""
+import heapq
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .fov import compute_fov, is_opaque
+
+Position = Tuple[int, int]
+Grid = Sequence[Sequence[str]]
+
+# 8-way moves, orthogonal first so ties prefer straight steps
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+
+APPROACH = "approach"
+FLEE = "flee"
+RANGED = "ranged"
+
+# Below -1 so fleeing enemies run past the player toward open space
+# rather than into a corner
+FLEE_FACTOR = -1.2
+
+def _flat(passable: np.ndarray) -> Tuple[List[bool], int, List[int]]:
+    # Flat cell list with a wall border, so neighbours are fixed index offsets
+    height, width = passable.shape
+    padded = np.zeros((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = passable
+    stride = width + 2
+    return padded.ravel().tolist(), stride, [dy * stride + dx for dx, dy in DIRECTIONS]
+
+def _unflat(dist: List[float], shape: Tuple[int, int]) -> np.ndarray:
+    height, width = shape
+    return np.array(dist).reshape(height + 2, width + 2)[1:-1, 1:-1]
+
+def bfs(passable: np.ndarray, seeds: Iterable[Position]) -> np.ndarray:
+    """Steps from every cell to the nearest seed; walls and unreachable cells are inf"""
+    cells, stride, offsets = _flat(passable)
+    dist = [np.inf] * len(cells)
+    queue = deque()
+    for x, y in seeds:
+        i = (y + 1) * stride + x + 1
+        if cells[i] and dist[i]:
+            dist[i] = 0
+            queue.append(i)
+    while queue:
+        i = queue.popleft()
+        d = dist[i] + 1
+        for offset in offsets:
+            j = i + offset
+            if cells[j] and dist[j] > d:
+                dist[j] = d
+                queue.append(j)
+    return _unflat(dist, passable.shape)
+
+def relax(values: np.ndarray, passable: np.ndarray) -> np.ndarray:
+    """Cheapest seed value + steps for every cell (Dijkstra, for seeds of different values)"""
+    cells, stride, offsets = _flat(passable)
+    dist = [np.inf] * len(cells)
+    heap = []
+    for (y, x), value in np.ndenumerate(values):
+        i = (y + 1) * stride + x + 1
+        if cells[i] and value < np.inf:
+            dist[i] = float(value)
+            heap.append((dist[i], i))
+    heapq.heapify(heap)
+    while heap:
+        d, i = heapq.heappop(heap)
+        if d > dist[i]:
+            continue
+        d += 1
+        for offset in offsets:
+            j = i + offset
+            if cells[j] and dist[j] > d:
+                dist[j] = d
+                heapq.heappush(heap, (d, j))
+    return _unflat(dist, passable.shape)
+
+def approach_map(passable: np.ndarray, goal: Position) -> np.ndarray:
+    return bfs(passable, [goal])
+
+def flee_map(passable: np.ndarray, goal: Position) -> np.ndarray:
+    approach = approach_map(passable, goal)
+    return relax(np.where(np.isfinite(approach), approach * FLEE_FACTOR, np.inf), passable)
+
+def ranged_map(grid: Grid, passable: np.ndarray, goal: Position, distance: int) -> np.ndarray:
+    # Nearest tile exactly distance away with a clear view of the goal, else approach
+    seeds = [
+        (x, y) for x, y in compute_fov(grid, goal, distance)
+        if passable[y, x] and max(abs(x - goal[0]), abs(y - goal[1])) == distance
+    ]
+    return bfs(passable, seeds) if seeds else approach_map(passable, goal)
+
+def downhill(dmap: np.ndarray, position: Position) -> Optional[Position]:
+    """(dx, dy) to the lowest neighbour below position, or None"""
+    x, y = position
+    height, width = dmap.shape
+    best, step = dmap[y, x], None
+    for dx, dy in DIRECTIONS:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < width and 0 <= ny < height and dmap[ny, nx] < best:
+            best, step = dmap[ny, nx], (dx, dy)
+    return step
+
+class DijkstraCache:
+    # Keyed by (map_version, goal, kind) so a lookup doesn't touch the grid;
+    # without a version the tiles themselves are the key. LRU, max_entries maps
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._maps: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, grid: Grid, goal: Sequence[int], kind: str = APPROACH, distance: int = 4,
+            version: Optional[Hashable] = None) -> np.ndarray:
+        goal = (int(goal[0]), int(goal[1]))
+        variant = (goal, kind, distance if kind == RANGED else None)
+        if version is not None:
+            key = ("version", version) + variant
+        else:
+            key = (len(grid), "".join("".join(row) for row in grid)) + variant
+
+        dmap = self._maps.get(key)
+        if dmap is not None:
+            self._maps.move_to_end(key)
+            self.hits += 1
+            return dmap
+
+        self.misses += 1
+        passable = np.array([[not is_opaque(tile) for tile in row] for row in grid], dtype=bool)
+        if kind == FLEE:
+            dmap = flee_map(passable, goal)
+        elif kind == RANGED:
+            dmap = ranged_map(grid, passable, goal, distance)
+        else:
+            dmap = approach_map(passable, goal)
+        self._maps[key] = dmap
+        while len(self._maps) > self.max_entries:
+            self._maps.popitem(last=False)
+        return dmap
+
+    def step(self, grid: Grid, position: Sequence[int], goal: Sequence[int], kind: str = APPROACH,
+             distance: int = 4, max_distance: Optional[int] = None,
+             version: Optional[Hashable] = None) -> Optional[Position]:
+        """Next (dx, dy) down the map, or None (no lower neighbour, or approach beyond max_distance)"""
+        dmap = self.get(grid, goal, kind, distance, version)
+        x, y = int(position[0]), int(position[1])
+        if not (0 <= y < dmap.shape[0] and 0 <= x < dmap.shape[1]):
+            return None
+        if kind == APPROACH and max_distance is not None and dmap[y, x] > max_distance:
+            return None
+        return downhill(dmap, (x, y))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"maps": len(self._maps), "hits": self.hits, "misses": self.misses}
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Registry of concurrent game sessions keyed by session id
+
+Each session has its own GameStateManager, EventHandler (turn state)
+and asyncio.Lock. Idle sessions are evicted least recently used first,
+flushed to their own save files under SESSION_DIR, when there are more
+than MAX_SESSIONS or their estimated footprint exceeds
+SESSION_MEMORY_BUDGET. Sessions are only created through
+session(..., create=True); unknown ids raise SessionNotFound. Save files
+of sessions that are not loaded and untouched for SESSION_TTL seconds
+are deleted by the auto-save loop. The "default" session keeps the
+legacy game_state.json save (created on first use, never pruned) so
+existing single-game setups carry on.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from .event_handler import EventHandler
+from .state_manager import AUTO_SAVE_INTERVAL, GameStateManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = "default"
+SESSION_DIR = os.getenv("SESSION_DIR", "sessions")
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "500"))
+SESSION_MEMORY_BUDGET = int(os.getenv("SESSION_MEMORY_BUDGET", str(256 * 1024 * 1024)))
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))  # 0 keeps saves forever
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Rough per-object costs for the footprint estimate
+_BYTES_PER_TILE = 8
+_BYTES_PER_ENTITY = 600
+_BYTES_BASE = 16 * 1024
+
+class InvalidSessionId(Exception):
+    pass
+
+class SessionNotFound(Exception):
+    pass
+
+class GameSession:
+    def __init__(self, session_id: str, state: GameStateManager):
+        self.session_id = session_id
+        self.state = state
+        self.events = EventHandler(state)
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.size = 0
+        self.update_size()
+    
+    def update_size(self) -> None:
+        dungeon = self.state.get_dungeon()
+        tiles = len(dungeon) * (len(dungeon[0]) if dungeon else 0)
+        self.size = _BYTES_BASE + tiles * _BYTES_PER_TILE + len(self.state.enemies) * _BYTES_PER_ENTITY
+
+class SessionRegistry:
+    def __init__(self, session_dir: str = SESSION_DIR, max_sessions: int = MAX_SESSIONS,
+                 memory_budget: int = SESSION_MEMORY_BUDGET, session_ttl: float = SESSION_TTL):
+        self.session_dir = session_dir
+        self.max_sessions = max_sessions
+        self.memory_budget = memory_budget
+        self.session_ttl = session_ttl
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self.memory = 0
+        
+        self.loads = 0
+        self.created = 0
+        self.evictions = 0
+        self.pruned = 0
+    
+    def _save_file(self, session_id: str) -> str:
+        if session_id == DEFAULT_SESSION:
+            return "game_state.json"
+        return os.path.join(self.session_dir, f"{session_id}.json")
+    
+    def _open(self, session_id: str, create: bool) -> GameSession:
+        if not _SESSION_ID.match(session_id):
+            raise InvalidSessionId(f"Invalid session id: {session_id!r}")
+        save_file = self._save_file(session_id)
+        
+        state = GameStateManager(save_file=save_file)
+        if state.load_state():
+            self.loads += 1
+        elif not create and session_id != DEFAULT_SESSION:
+            raise SessionNotFound(f"Unknown session: {session_id}")
+        else:
+            os.makedirs(os.path.dirname(save_file) or ".", exist_ok=True)
+            state.generate_new_dungeon()
+            state.add_message("New game started!")
+            state.save_state()
+            self.created += 1
+        return GameSession(session_id, state)
+    
+    @asynccontextmanager
+    async def session(self, session_id: str = DEFAULT_SESSION, create: bool = False) -> AsyncIterator[GameSession]:
+        """Hold a session's lock for the duration of one request"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._open(session_id, create)
+            self._sessions[session_id] = session
+            self.memory += session.size
+        self._sessions.move_to_end(session_id)
+        
+        # Counted before waiting on the lock so eviction never takes it from under us
+        session.users += 1
+        try:
+            async with session.lock:
+                session.last_used = time.monotonic()
+                yield session
+        finally:
+            session.users -= 1
+            self.memory -= session.size
+            session.update_size()
+            self.memory += session.size
+            self._evict()
+    
+    def _evict(self) -> None:
+        # Least recently used first; sessions in use are skipped
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions and self.memory <= self.memory_budget:
+                return
+            session = self._sessions[session_id]
+            if session.users or session.lock.locked():
+                continue
+            self._close(session)
+            self.evictions += 1
+    
+    def _close(self, session: GameSession) -> None:
+        session.state.close()
+        del self._sessions[session.session_id]
+        self.memory -= session.size
+    
+    def flush_all(self) -> int:
+        return sum(1 for session in self._sessions.values() if session.state.flush())
+    
+    def prune_expired(self) -> int:
+        # Saves of sessions nobody has loaded within session_ttl; live ones are kept
+        if self.session_ttl <= 0 or not os.path.isdir(self.session_dir):
+            return 0
+        cutoff = time.time() - self.session_ttl
+        files: Dict[str, List[str]] = {}
+        newest: Dict[str, float] = {}
+        for name in os.listdir(self.session_dir):
+            session_id = name.split(".", 1)[0]
+            path = os.path.join(self.session_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            files.setdefault(session_id, []).append(path)
+            newest[session_id] = max(newest.get(session_id, 0.0), mtime)
+        
+        pruned = 0
+        for session_id, mtime in newest.items():
+            if session_id in self._sessions or mtime > cutoff:
+                continue
+            for path in files[session_id]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.error(f"Failed to delete {path}: {e}")
+            pruned += 1
+        self.pruned += pruned
+        return pruned
+    
+    async def auto_save_loop(self, interval: float = AUTO_SAVE_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.flush_all()
+            self.prune_expired()
+    
+    def close(self) -> None:
+        for session in list(self._sessions.values()):
+            self._close(session)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": len(self._sessions),
+            "memory_estimate": self.memory,
+            "memory_budget": self.memory_budget,
+            "loads": self.loads,
+            "created": self.created,
+            "evictions": self.evictions,
+            "pruned": self.pruned
+        }
+
+session_registry = SessionRegistry()
\ No newline at end of file
@@ -1,16 +1,58 @@
 """
 Manages persistent game state including dungeon layout, entities, and player status
-Uses JSON file storage for persistence between sessions
+Persists between sessions to a snapshot + append-only journal, or with
+SAVE_MODE=json to a single JSON file rewritten on every save
+Changes are marked dirty and written by the auto-save loop, at most once
+per AUTO_SAVE_INTERVAL seconds. The methods below also record which keys,
+tiles, enemies and messages changed, so the journal logs just those;
+code that edits current_state directly names the keys in mark_dirty()
+Enemies live in an indexed EntityStore and are merged back in by get_state()
+get_visible_state() is the player's view: tiles in FOV or seen before on
+this level and the enemies currently in view. The explored set is not
+saved, so after load_state() or a restart the player's map memory starts
+empty and refills as tiles come into view
+map_version changes with every tile change and is unique across sessions,
+so path caches can key on it instead of the map; the current version is
+registered in map_registry.maps so contexts can refer to the map by it
 """
+import itertools
 import json
+import logging
 import os
 import random
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, KeysView, List, Optional, Set, Tuple
+
+from .entity_store import Entity, EntityStore
+from .fov import FOV_RADIUS, FOVCache, is_opaque, mask_dungeon
+from .journal import Changes, Journal
+from .map_registry import maps
+
+AUTO_SAVE_INTERVAL = float(os.getenv("AUTO_SAVE_INTERVAL", "30"))
+SAVE_MODE = os.getenv("SAVE_MODE", "journal")
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "1.0"))
+JOURNAL_COMPACT_BYTES = int(os.getenv("JOURNAL_COMPACT_BYTES", str(1024 * 1024)))
+MESSAGE_LOG_SIZE = 10
+
+logger = logging.getLogger(__name__)
+
+_map_versions = itertools.count(1)
 
 class GameStateManager:
-    def __init__(self, save_file: str = "game_state.json"):
+    def __init__(self, save_file: str = "game_state.json", save_mode: str = SAVE_MODE):
         self.save_file = save_file
+        self.journal: Optional[Journal] = None
+        if save_mode == "journal":
+            self.journal = Journal(os.path.splitext(save_file)[0], JOURNAL_FSYNC_INTERVAL, JOURNAL_COMPACT_BYTES)
         self.current_state: Dict[str, Any] = self._initialize_default_state()
+        self.enemies = EntityStore()
+        self.fov = FOVCache()
+        self.explored: Set[Tuple[int, int]] = set()  # in memory only, see module docstring
+        self.map_version = None
+        self._new_map_version()
+        self.changes = Changes()
+        self.dirty = False
+        self.saves = 0
+        self.coalesced_saves = 0
         
     def _initialize_default_state(self) -> Dict[str, Any]:
         return {
@@ -22,7 +64,6 @@ class GameStateManager:
                 "attack_power": 5,
                 "inventory": []
             },
-            "enemies": [],
             "items": [],
             "current_level": 1,
             "message_log": ["Welcome to Mago!"]
@@ -40,46 +81,134 @@ class GameStateManager:
                     row.append('.' if (x + y) % 3 != 0 else '#')
             dungeon.append(row)
         self.current_state["dungeon"] = dungeon
+        self.changes.keys.add("dungeon")
+        self.changes.tiles.clear()
+        self._new_map_version()
+        self.fov.reset()
+        self.explored = set()
+    
+    def _new_map_version(self) -> None:
+        previous, self.map_version = self.map_version, next(_map_versions)
+        maps.register(self.map_version, self.get_dungeon(), replaces=previous)
+    
+    def get_state(self) -> Dict[str, Any]:
+        return {**self.current_state, "enemies": self.enemies.to_list()}
+    
+    def get_visible_state(self, radius: int = FOV_RADIUS) -> Dict[str, Any]:
+        dungeon = self.get_dungeon()
+        visible = self.fov.visible(dungeon, self.get_player_position(), radius)
+        self.explored |= visible
+        enemies = [e for e in self.enemies.to_list() if tuple(e["position"]) in visible]
+        return {**self.current_state, "dungeon": mask_dungeon(dungeon, self.explored), "enemies": enemies}
     
     def save_state(self) -> None:
-        with open(self.save_file, 'w') as f:
-            json.dump(self.current_state, f, indent=2)
+        if self.journal is not None:
+            self.journal.append(self.current_state, self.enemies, self.changes)
+        else:
+            with open(self.save_file, 'w') as f:
+                json.dump(self.get_state(), f, indent=2)
+        self.changes.clear()
+        self.dirty = False
+        self.saves += 1
+    
+    def mark_dirty(self, *keys: str) -> None:
+        # Several changes between auto-saves cost one write
+        self.changes.keys.update(keys)
+        if self.dirty:
+            self.coalesced_saves += 1
+        self.dirty = True
+    
+    def flush(self) -> bool:
+        if not self.dirty:
+            return False
+        self.save_state()
+        return True
+    
+    def close(self) -> None:
+        self.flush()
+        maps.discard(self.map_version)
+        if self.journal is not None:
+            self.journal.close()
     
     def load_state(self) -> bool:
+        if self.journal is not None and self.journal.exists():
+            try:
+                state = self.journal.recover()
+            except (ValueError, OSError) as e:
+                logger.error(f"Journal recovery failed: {e}")
+                return False
+            self._set_state(state)
+            return True
+        
+        # JSON save (SAVE_MODE=json, or a save from before journaling)
         if not os.path.exists(self.save_file):
             return False
             
         try:
             with open(self.save_file, 'r') as f:
-                self.current_state = json.load(f)
+                state = json.load(f)
+            self._set_state(state)
             return True
         except json.JSONDecodeError:
             return False
     
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        self.enemies = EntityStore.from_list(state.pop("enemies", []))
+        self.current_state = state
+        self.changes.clear()
+        self._new_map_version()
+        self.fov.reset()
+        self.explored = set()
+    
     def update_entity_position(self, entity_id: str, new_position: Tuple[int, int]) -> None:
         if entity_id == "player":
             self.current_state["player"]["position"] = new_position
-        else:
-            for enemy in self.current_state["enemies"]:
-                if enemy["id"] == entity_id:
-                    enemy["position"] = new_position
-                    break
+            self.changes.keys.add("player")
+        elif self.enemies.move(entity_id, new_position):
+            self.changes.enemies.add(entity_id)
     
     def add_enemy(self, enemy_data: Dict[str, Any]) -> None:
-        self.current_state["enemies"].append(enemy_data)
+        self.changes.enemies.add(self.enemies.add(enemy_data).id)
+    
+    def entity_at(self, position: Tuple[int, int]) -> Optional[Entity]:
+        return self.enemies.at(position)
+    
+    def get_enemies_near(self, center: Tuple[int, int], radius: int) -> List[Entity]:
+        return self.enemies.within(center, radius)
+    
+    def is_passable(self, position: Tuple[int, int]) -> bool:
+        # In bounds and not a wall
+        x, y = position
+        dungeon = self.current_state["dungeon"]
+        return 0 <= y < len(dungeon) and 0 <= x < len(dungeon[y]) and dungeon[y][x] != '#'
+    
+    def is_walkable(self, position: Tuple[int, int]) -> bool:
+        # Passable and not occupied by the player or an enemy
+        if not self.is_passable(position):
+            return False
+        return not self.enemies.is_occupied(tuple(position)) and tuple(position) != self.get_player_position()
+    
+    def set_tile(self, position: Tuple[int, int], tile: str) -> None:
+        x, y = position
+        dungeon = self.get_dungeon()
+        if is_opaque(dungeon[y][x]) != is_opaque(tile):
+            self.fov.invalidate([position])
+        dungeon[y][x] = tile
+        self.changes.tiles.add((x, y))
+        self._new_map_version()
+        self.mark_dirty()
     
     def add_message(self, message: str) -> None:
         self.current_state["message_log"].append(message)
-        if len(self.current_state["message_log"]) > 10:
-            self.current_state["message_log"] = self.current_state["message_log"][-10:]
+        if len(self.current_state["message_log"]) > MESSAGE_LOG_SIZE:
+            self.current_state["message_log"] = self.current_state["message_log"][-MESSAGE_LOG_SIZE:]
+        self.changes.messages = min(self.changes.messages + 1, MESSAGE_LOG_SIZE)
     
     def get_player_position(self) -> Tuple[int, int]:
         return tuple(self.current_state["player"]["position"])
     
-    def get_enemy_positions(self) -> List[Tuple[int, int]]:
-        return [tuple(enemy["position"]) for enemy in self.current_state["enemies"]]
+    def get_enemy_positions(self) -> KeysView:
+        return self.enemies.positions()
     
     def get_dungeon(self) -> List[List[str]]:
-        return self.current_state["dungeon"]
-
-game_state_manager = GameStateManager()
\ No newline at end of file
+        return self.current_state["dungeon"]
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Offline batch generation of entities into the content library
+
+Entities only: prompt_engine has no quest template in this app (quests
+are batch generated by mago-app-v3).
+Run from mago-app-v2/backend:
+    python -m app.llm.batch_generate --count 2000 --workers 8
+    python -m app.llm.batch_generate --count 500 --stub --out /tmp/library.db
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import ollama_integration
+from .content_library import CONTENT_LIBRARY_PATH, ContentLibrary
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ["goblin", "orc", "skeleton", "rat", "slime", "troll"]
+THEMES = ["dungeon"]
+FLUSH_EVERY = 100
+
+_STUB_PREFIXES = ["Grim", "Mur", "Skar", "Vol", "Thra", "Nek"]
+_STUB_SUFFIXES = ["nash", "gul", "rik", "dor", "mok", "zar"]
+_STUB_ABILITIES = ["stealth", "poison", "regenerate", "charge", "summon", "fly"]
+
+def _stub_entity(context: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    # Entity-shaped JSON without a model, for development and load tests
+    level = context["level"]
+    return {
+        "type": context["type"],
+        "name": rng.choice(_STUB_PREFIXES) + rng.choice(_STUB_SUFFIXES),
+        "description": f"A level {level} {context['type']} of the {context['theme']}",
+        "health": 6 + 3 * level + rng.randint(0, 4),
+        "attack_power": 2 + level + rng.randint(0, 2),
+        "abilities": rng.sample(_STUB_ABILITIES, 2),
+        "symbol": context["type"][0],
+        "color": "#%06X" % rng.randrange(0x1000000)
+    }
+
+async def _worker(jobs: "asyncio.Queue[Optional[Dict[str, Any]]]", results: List[Tuple],
+                  stub: bool, rng: random.Random):
+    while True:
+        context = await jobs.get()
+        if context is None:
+            return
+        if stub:
+            entity = _stub_entity(context, rng)
+        else:
+            entity = await ollama_integration.try_generate_entity(context["type"], context)
+            if entity is None:
+                logger.warning("Skipping invalid entity JSON")
+                continue
+        results.append(("entity", context["type"], context["theme"], context["level"], entity))
+
+async def generate(library: ContentLibrary, count: int, entity_types: List[str], themes: List[str],
+                   max_level: int, workers: int, stub: bool, seed: Optional[int] = None) -> int:
+    # count entities over types x themes x levels 1..max_level; returns rows written
+    rng = random.Random(seed)
+    jobs: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    for _ in range(count):
+        jobs.put_nowait({
+            "type": rng.choice(entity_types),
+            "level": rng.randint(1, max_level),
+            "theme": rng.choice(themes)
+        })
+    for _ in range(workers):
+        jobs.put_nowait(None)
+
+    results: List[Tuple] = []
+    written = 0
+    tasks = [asyncio.create_task(_worker(jobs, results, stub, rng)) for _ in range(workers)]
+    try:
+        while not all(task.done() for task in tasks):
+            await asyncio.sleep(0.5)
+            if len(results) >= FLUSH_EVERY:
+                batch, results[:] = results[:], []
+                written += library.add_many(batch)
+                logger.info(f"{written}/{count} written")
+        for task in tasks:
+            task.result()
+        written += library.add_many(results)
+    finally:
+        await ollama_integration.close_session()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--types", nargs="+", default=ENTITY_TYPES)
+    parser.add_argument("--themes", nargs="+", default=THEMES)
+    parser.add_argument("--max-level", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=ollama_integration.OLLAMA_MAX_CONNECTIONS)
+    parser.add_argument("--out", default=CONTENT_LIBRARY_PATH)
+    parser.add_argument("--stub", action="store_true", help="generate locally without Ollama")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    library = ContentLibrary(args.out)
+    start = time.perf_counter()
+    written = asyncio.run(generate(library, args.count, args.types, args.themes, args.max_level,
+                                   args.workers, args.stub, args.seed))
+    logger.info(f"Wrote {written} entities to {args.out} in {time.perf_counter() - start:.1f}s: {library.counts()}")
+    library.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
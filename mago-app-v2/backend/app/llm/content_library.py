@@ -0,0 +1,104 @@
+"""Pre-generated content library (SQLite) written by batch_generate"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_LIBRARY_PATH = os.getenv("CONTENT_LIBRARY_PATH", "content_library.db")
+CONTENT_LIBRARY_COUNT_TTL = float(os.getenv("CONTENT_LIBRARY_COUNT_TTL", "60"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    type TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS content_lookup ON content (kind, type, theme, level);
+"""
+
+class ContentLibrary:
+    # Rows are (kind, type, theme, level, body JSON). Sampled by level range so
+    # any band size works; a missing file is an empty library until written
+    def __init__(self, path: str = CONTENT_LIBRARY_PATH, count_ttl: float = CONTENT_LIBRARY_COUNT_TTL):
+        self.path = path
+        self.count_ttl = count_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        # (count, expires) per bucket; re-read after count_ttl or a failed lookup
+        self._counts: Dict[Tuple, Tuple[int, float]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        if self._conn is None and (create or os.path.exists(self.path)):
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def add_many(self, rows: Iterable[Tuple[str, str, str, int, Dict[str, Any]]]) -> int:
+        conn = self._connect(create=True)
+        rows = [(kind, type_, theme, level, json.dumps(body)) for kind, type_, theme, level, body in rows]
+        with conn:
+            conn.executemany(
+                "INSERT INTO content (kind, type, theme, level, body) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        self._counts.clear()
+        return len(rows)
+
+    def sample(self, kind: str, type_: str, theme: str, min_level: int, max_level: int) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        if conn is None:
+            self.misses += 1
+            return None
+
+        where = "kind = ? AND type = ? AND theme = ? AND level BETWEEN ? AND ?"
+        params = (kind, type_, theme, min_level, max_level)
+        try:
+            now = time.monotonic()
+            cached = self._counts.get(params)
+            if cached is None or cached[1] <= now:
+                count = conn.execute(f"SELECT COUNT(*) FROM content WHERE {where}", params).fetchone()[0]
+                self._counts[params] = (count, now + self.count_ttl)
+            else:
+                count = cached[0]
+            if not count:
+                self.misses += 1
+                return None
+            row = conn.execute(
+                f"SELECT body FROM content WHERE {where} LIMIT 1 OFFSET ?", params + (random.randrange(count),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Content library error: {e}")
+            self.misses += 1
+            return None
+
+        if row is None:
+            # Rows went away since counting
+            self._counts.pop(params, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def counts(self) -> Dict[str, int]:
+        conn = self._connect()
+        if conn is None:
+            return {}
+        rows = conn.execute("SELECT kind, type, COUNT(*) FROM content GROUP BY kind, type")
+        return {f"{kind}:{type_}": n for kind, type_, n in rows}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses}
\ No newline at end of file
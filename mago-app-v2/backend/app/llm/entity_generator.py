@@ -1,18 +1,43 @@
-from .ollama_integration import generate_entity
+from .ollama_integration import fallback_entity, generate_entity, try_generate_entity
+from .content_library import ContentLibrary
+from .variant_pool import VariantPool, band_levels, level_band
+import os
 import random
 import string
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+CONTENT_POOL_VARIANTS = int(os.getenv("CONTENT_POOL_VARIANTS", "4"))
+CONTENT_POOL_MAX_USES = int(os.getenv("CONTENT_POOL_MAX_USES", "3"))
+CONTENT_POOL_MAX_BUCKETS = int(os.getenv("CONTENT_POOL_MAX_BUCKETS", "64"))
+CONTENT_LEVEL_BAND = int(os.getenv("CONTENT_LEVEL_BAND", "3"))
 
 class EntityGenerator:
     def __init__(self):
-        self.entity_cache = {}
+        # Built offline by app.llm.batch_generate; sampled before generating live
+        self.library = ContentLibrary()
+        # A few variants per (type, level band, theme), refilled in the background
+        self.entity_pool = VariantPool(
+            self._generate,
+            variants=CONTENT_POOL_VARIANTS,
+            max_uses=CONTENT_POOL_MAX_USES,
+            max_buckets=CONTENT_POOL_MAX_BUCKETS
+        )
+    
+    async def _generate(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # None (not the placeholder) when the model fails, so it never gets pooled
+        band = level_band(context["level"], CONTENT_LEVEL_BAND)
+        entity = self.library.sample("entity", context["type"], context["theme"],
+                                     *band_levels(band, CONTENT_LEVEL_BAND))
+        if entity is not None:
+            return entity
+        return await try_generate_entity(context["type"], context)
     
-    async def create_enemy(self, enemy_type: str, position: Tuple[int, int]) -> Dict[str, Any]:
-        if enemy_type in self.entity_cache:
-            base = self.entity_cache[enemy_type].copy()
-        else:
-            base = await generate_entity(enemy_type)
-            self.entity_cache[enemy_type] = base
+    async def create_enemy(self, enemy_type: str, position: Tuple[int, int],
+                           level: int = 1, theme: str = "dungeon") -> Dict[str, Any]:
+        key = (enemy_type, level_band(level, CONTENT_LEVEL_BAND), theme)
+        base = await self.entity_pool.get(key, {"type": enemy_type, "level": level, "theme": theme})
+        if base is None:
+            base = fallback_entity(enemy_type)
         
         enemy = base.copy()
         enemy["id"] = self._generate_id()
@@ -25,6 +50,10 @@ class EntityGenerator:
         item["position"] = position
         return item
     
+    async def close(self) -> None:
+        await self.entity_pool.close()
+        self.library.close()
+    
     def _generate_id(self, length: int = 8) -> str:
         return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
@@ -1,16 +1,47 @@
 import aiohttp
+import asyncio
 import json
 import logging
 import os
 import random
+from app.game.map_registry import maps
+from app.game.pathfinding import APPROACH, FLEE, RANGED
 from .prompt_engine import get_decision_prompt, get_entity_prompt
-from typing import Dict, Any, List, Tuple
+from .tactical_solver import TacticalSolver
+from typing import Dict, Any, List, Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_BASE_URL = f"{OLLAMA_HOST}/api/generate"
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "30"))
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "2"))
+OLLAMA_RETRY_BACKOFF = float(os.getenv("OLLAMA_RETRY_BACKOFF", "0.25"))
+ENABLE_TACTICAL_SOLVER = os.getenv("ENABLE_TACTICAL_SOLVER", "true").lower() == "true"
+ENEMY_SIGHT_RADIUS = int(os.getenv("ENEMY_SIGHT_RADIUS", "8"))
+
+# Answers obvious enemy moves (adjacent, clear path, out of sight) without the LLM
+tactical_solver = TacticalSolver(ENEMY_SIGHT_RADIUS)
+
+# Shared keep-alive session; created on first use, closed on app shutdown
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=OLLAMA_MAX_CONNECTIONS, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=OLLAMA_TIMEOUT)
+        )
+    return _session
+
+async def close_session() -> None:
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
 
 async def get_ollama_response(prompt: str, model: str = "llama3") -> str:
     payload = {
@@ -20,19 +51,34 @@ async def get_ollama_response(prompt: str, model: str = "llama3") -> str:
         "options": {"temperature": 0.7, "max_tokens": 150}
     }
     
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(OLLAMA_BASE_URL, json=payload) as response:
+    # Retry connection errors, timeouts and 5xx with exponential backoff
+    for attempt in range(OLLAMA_RETRIES + 1):
+        try:
+            async with get_session().post(OLLAMA_BASE_URL, json=payload) as response:
                 if response.status == 200:
                     data = await response.json()
                     return data.get("response", "").strip()
                 logger.error(f"Ollama error: {response.status}")
-                return ""
-    except aiohttp.ClientError as e:
-        logger.error(f"HTTP error: {str(e)}")
-        return ""
+                if response.status < 500:
+                    return ""
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"HTTP error: {str(e)}")
+        
+        if attempt < OLLAMA_RETRIES:
+            await asyncio.sleep(OLLAMA_RETRY_BACKOFF * 2 ** attempt)
+    return ""
+
+def _dungeon(context: Dict[str, Any]) -> Optional[List[List[str]]]:
+    # Game contexts name the live map by map_version; API callers may pass it
+    return context.get("dungeon") or maps.get(context.get("map_version"))
 
 async def get_decision(context: Dict[str, Any]) -> Dict[str, Any]:
+    if ENABLE_TACTICAL_SOLVER and "enemy_position" in context and "player_position" in context:
+        decision = tactical_solver.solve(context["enemy_position"], context["player_position"],
+                                         _dungeon(context), context.get("map_version"))
+        if decision is not None:
+            return decision
+    
     prompt = get_decision_prompt(context)
     response = await get_ollama_response(prompt)
     
@@ -40,28 +86,52 @@ async def get_decision(context: Dict[str, Any]) -> Dict[str, Any]:
         return json.loads(response)
     except json.JSONDecodeError:
         logger.warning("LLM returned invalid JSON, using fallback")
-        return {
-            "action": "move",
-            "dx": random.randint(-1, 1),
-            "dy": random.randint(-1, 1)
-        }
+        return fallback_decision(context)
+
+def fallback_decision(context: Dict[str, Any]) -> Dict[str, Any]:
+    # Roll down the shared Dijkstra map; "behavior" may ask to flee or keep at range
+    dungeon = _dungeon(context)
+    if dungeon and "enemy_position" in context and "player_position" in context:
+        behavior = context.get("behavior", APPROACH)
+        kind = behavior if behavior in (FLEE, RANGED) else APPROACH
+        step = tactical_solver.paths.step(dungeon, context["enemy_position"], context["player_position"],
+                                          kind, distance=context.get("range", 4),
+                                          version=context.get("map_version"))
+        if step is not None:
+            return {"action": "move", "dx": step[0], "dy": step[1]}
+        return {"action": "wait"}
+    return {
+        "action": "move",
+        "dx": random.randint(-1, 1),
+        "dy": random.randint(-1, 1)
+    }
 
 async def generate_entity(entity_type: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    entity = await try_generate_entity(entity_type, context)
+    return entity if entity is not None else fallback_entity(entity_type)
+
+async def try_generate_entity(entity_type: str, context: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+    # None when the model is unreachable or returns unusable JSON
     prompt = get_entity_prompt(entity_type, context)
     response = await get_ollama_response(prompt)
     
     try:
         entity = json.loads(response)
-        entity.setdefault("symbol", "?")
-        entity.setdefault("color", "#FF00FF")
-        return entity
     except json.JSONDecodeError:
         logger.error("Failed to parse entity JSON")
-        return {
-            "type": entity_type,
-            "name": "Unknown",
-            "health": 10,
-            "attack_power": 3,
-            "symbol": "?",
-            "color": "#FF00FF"
-        }
\ No newline at end of file
+        return None
+    if not isinstance(entity, dict):
+        return None
+    entity.setdefault("symbol", "?")
+    entity.setdefault("color", "#FF00FF")
+    return entity
+
+def fallback_entity(entity_type: str) -> Dict[str, Any]:
+    return {
+        "type": entity_type,
+        "name": "Unknown",
+        "health": 10,
+        "attack_power": 3,
+        "symbol": "?",
+        "color": "#FF00FF"
+    }
\ No newline at end of file
@@ -1,5 +1,9 @@
 import json
 from typing import Dict, Any, List, Tuple
+from app.game.fov import UNKNOWN, compute_fov
+from app.game.map_registry import maps
+
+NEARBY_RADIUS = 3
 
 def get_decision_prompt(context: Dict[str, Any]) -> str:
     return f"""
@@ -31,14 +35,18 @@ Output Format (JSON ONLY):
 Current Situation:
 The player is at {context['player_position']} and you are at {context['enemy_position']}.
 The dungeon layout around you:
-{_get_dungeon_snippet(context['dungeon'], context['enemy_position'], 3)}
+{_nearby_tiles(context)}
 
 Decision (JSON ONLY):
 """.strip()
 
 def get_entity_prompt(entity_type: str, context: Dict[str, Any] = None) -> str:
+    context = context or {}
+    setting = "a roguelike game"
+    if "level" in context or "theme" in context:
+        setting = f"level {context.get('level', 1)} of a {context.get('theme', 'dungeon')} in a roguelike game"
     return f"""
-Create a new {entity_type} for a roguelike game. Follow these guidelines:
+Create a new {entity_type} for {setting}. Follow these guidelines:
 
 Output Format (JSON ONLY):
 {{
@@ -78,15 +86,24 @@ Dragon: {{
 Create a new {entity_type}:
 """.strip()
 
-def _get_dungeon_snippet(dungeon: List[List[str]], center: Tuple[int, int], radius: int) -> str:
+def _nearby_tiles(context: Dict[str, Any]) -> str:
+    # Enemy contexts carry the window; others name the map by version or carry it
+    if "nearby_tiles" in context:
+        return context["nearby_tiles"]
+    dungeon = context.get("dungeon") or maps.get(context.get("map_version")) or []
+    return get_dungeon_snippet(dungeon, context['enemy_position'], NEARBY_RADIUS)
+
+def get_dungeon_snippet(dungeon: List[List[str]], center: Tuple[int, int], radius: int) -> str:
+    # Only what the enemy can actually see; FOV range covers the whole square
     cx, cy = center
+    visible = compute_fov(dungeon, (cx, cy), 2 * radius)
     snippet = []
     for y in range(cy-radius, cy+radius+1):
         row = []
         for x in range(cx-radius, cx+radius+1):
-            if 0 <= y < len(dungeon) and 0 <= x < len(dungeon[0]):
+            if (x, y) in visible:
                 row.append(dungeon[y][x])
             else:
-                row.append(' ')
+                row.append(UNKNOWN)
         snippet.append(''.join(row))
     return '\n'.join(snippet)
\ No newline at end of file
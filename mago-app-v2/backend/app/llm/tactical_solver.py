@@ -0,0 +1,49 @@
+"""Rule-based pre-solver for enemy moves that don't need the LLM"""
+from typing import Any, Dict, Hashable, Optional, Sequence
+
+from app.game.pathfinding import DijkstraCache, Grid
+
+class TacticalSolver:
+    # Adjacent: attack. Beyond sight_radius: wait. Within it: step along a
+    # path of at most 2 * sight_radius. Anything else goes to the model (None)
+    def __init__(self, sight_radius: int = 8, paths: Optional[DijkstraCache] = None):
+        self.sight_radius = sight_radius
+        self.paths = paths or DijkstraCache()
+        self.resolved: Dict[str, int] = {"attack": 0, "move": 0, "wait": 0}
+        self.escalated = 0
+
+    def solve(self, enemy_pos: Sequence[int], player_pos: Sequence[int],
+              grid: Optional[Grid] = None, map_version: Optional[Hashable] = None) -> Optional[Dict[str, Any]]:
+        ex, ey = enemy_pos
+        px, py = player_pos
+        dx, dy = px - ex, py - ey
+        distance = max(abs(dx), abs(dy))
+
+        if distance == 1:
+            return self._resolve({"action": "attack", "dx": dx, "dy": dy, "target": "player"})
+        if distance > self.sight_radius:
+            return self._resolve({"action": "wait"})
+        if not grid:
+            return self._escalate()
+
+        step = self.paths.step(grid, (ex, ey), (px, py), max_distance=2 * self.sight_radius,
+                               version=map_version)
+        if step is None:
+            return self._escalate()
+        return self._resolve({"action": "move", "dx": step[0], "dy": step[1]})
+
+    def _resolve(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        self.resolved[decision["action"]] += 1
+        return decision
+
+    def _escalate(self) -> None:
+        self.escalated += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.resolved.values()) + self.escalated
+        return {
+            "resolved": dict(self.resolved),
+            "escalated": self.escalated,
+            "escalation_ratio": round(self.escalated / total, 4) if total else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Benchmark: per-request ClientSession vs the shared pooled session
+
+Starts a stub Ollama /api/generate server on localhost that answers
+immediately, so the timings are pure client overhead (session and
+connector setup, TCP connect, teardown).
+
+Run from mago-app-v2/backend:
+    python -m benchmarks.ollama_session_benchmark
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from app.llm import ollama_integration
+
+async def _stub_generate(request: web.Request) -> web.Response:
+    await request.json()
+    return web.json_response({"response": '{"action": "move", "dx": 1, "dy": 0}'})
+
+async def _start_stub() -> web.AppRunner:
+    app = web.Application()
+    app.router.add_post("/api/generate", _stub_generate)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+async def _per_request_session(url: str, payload: dict) -> str:
+    """Previous behaviour: a new ClientSession for every prompt"""
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=payload) as response:
+            data = await response.json()
+            return data.get("response", "").strip()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    runner = await _start_stub()
+    port = runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}/api/generate"
+    ollama_integration.OLLAMA_BASE_URL = url
+    payload = {"model": "llama3", "prompt": "hi", "stream": False}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def timed(fn) -> float:
+        async def one():
+            async with semaphore:
+                await fn()
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        return time.perf_counter() - start
+
+    fresh = await timed(lambda: _per_request_session(url, payload))
+    pooled = await timed(lambda: ollama_integration.get_ollama_response("hi"))
+    await ollama_integration.close_session()
+    await runner.cleanup()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    for name, total in (("per-request session", fresh), ("shared session", pooled)):
+        print(f"{name:>20}: {total:6.3f}s total  {total / args.requests * 1000:7.3f}ms/request")
+    print(f"{'overhead removed':>20}: {(fresh - pooled) / args.requests * 1000:7.3f}ms/request")
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
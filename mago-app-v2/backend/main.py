@@ -1,8 +1,11 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.game.state_manager import game_state_manager
-from app.game.event_handler import event_handler
+from app.game.session_registry import DEFAULT_SESSION, InvalidSessionId, SessionNotFound, session_registry
 from app.llm.entity_generator import entity_generator
+from app.llm import ollama_integration
+from app.game import map_codec
+import asyncio
+import uuid
 import uvicorn
 import os
 
@@ -22,36 +25,72 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    if not game_state_manager.load_state():
-        game_state_manager.generate_new_dungeon()
-        game_state_manager.add_message("New game started!")
-        game_state_manager.save_state()
+    app.state.auto_save = asyncio.create_task(session_registry.auto_save_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.auto_save.cancel()
+    session_registry.close()
+    await entity_generator.close()
+    await ollama_integration.close_session()
 
 @app.post("/game/action")
-async def handle_player_action(action: dict):
+async def handle_player_action(action: dict, session_id: str = DEFAULT_SESSION):
     try:
-        result = event_handler.process_player_action(action)
-        return result
+        async with session_registry.session(session_id) as session:
+            return session.events.process_player_action(action)
+    except InvalidSessionId as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/game/process_enemies")
-async def process_enemy_turns():
+async def process_enemy_turns(session_id: str = DEFAULT_SESSION):
     try:
-        result = await event_handler.process_enemy_turns()
-        return result
+        async with session_registry.session(session_id) as session:
+            return await session.events.process_enemy_turns()
+    except InvalidSessionId as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/game/state")
-async def get_game_state():
-    return game_state_manager.current_state
+async def get_game_state(map_encoding: str = map_codec.ENCODING_JSON, session_id: str = DEFAULT_SESSION,
+                         fov: bool = True):
+    # fov=false returns the whole level (debugging, map editors)
+    try:
+        async with session_registry.session(session_id) as session:
+            state = session.state.get_visible_state() if fov else session.state.get_state()
+    except InvalidSessionId as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    encoding = map_codec.negotiate(map_encoding)
+    if encoding == map_codec.ENCODING_JSON:
+        return state
+    return {**state, "dungeon": map_codec.encode_map_json(state["dungeon"], encoding)}
+
+@app.post("/game/session")
+async def create_session():
+    session_id = uuid.uuid4().hex
+    async with session_registry.session(session_id, create=True):
+        pass
+    return {"session_id": session_id}
+
+@app.get("/game/sessions")
+async def get_session_stats():
+    return session_registry.stats()
 
 @app.post("/game/decision")
 async def get_llm_decision(request: dict):
     try:
         from app.llm.ollama_integration import get_decision
-        context = request.get("game_state", {})
+        # map_version is only trusted from session state; a client's could alias another map
+        context = {k: v for k, v in request.get("game_state", {}).items() if k != "map_version"}
         decision = await get_decision(context)
         return {"decision": decision}
     except Exception as e:
@@ -67,12 +106,30 @@ async def generate_llm_entity(request: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/llm/stats")
+async def get_llm_stats():
+    return {
+        "tactical": ollama_integration.tactical_solver.stats(),
+        "paths": ollama_integration.tactical_solver.paths.stats(),
+        "entity_pool": entity_generator.entity_pool.stats(),
+        "content_library": entity_generator.library.stats()
+    }
+
 @app.post("/entity/generate")
-async def generate_entity(entity_type: str, x: int, y: int):
+async def generate_entity(entity_type: str, x: int, y: int, session_id: str = DEFAULT_SESSION):
     try:
-        enemy = await entity_generator.create_enemy(entity_type, (x, y))
-        game_state_manager.add_enemy(enemy)
+        async with session_registry.session(session_id) as session:
+            level = session.state.current_state.get("current_level", 1)
+        # Generate without holding the session so its turns aren't stalled on the model
+        enemy = await entity_generator.create_enemy(entity_type, (x, y), level=level)
+        async with session_registry.session(session_id) as session:
+            session.state.add_enemy(enemy)
+            session.state.mark_dirty()
         return enemy
+    except InvalidSessionId as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,70 @@
+import json
+import os
+
+from app.game.state_manager import GameStateManager
+
+def _normalized(state):
+    return json.loads(json.dumps(state, sort_keys=True))
+
+def _played(tmp_path, turns):
+    """A manager with a snapshot plus ``turns`` logged saves; returns it and each saved state"""
+    manager = GameStateManager(str(tmp_path / "game.json"), save_mode="journal")
+    manager.generate_new_dungeon(20, 12)
+    manager.add_enemy({"id": "rat", "type": "rat", "position": (5, 5), "health": 3})
+    manager.mark_dirty()
+    manager.save_state()
+    saved = [_normalized(manager.get_state())]
+    for turn in range(turns):
+        manager.update_entity_position("player", (2 + turn, 2))
+        manager.update_entity_position("rat", (5, 5 + turn % 3))
+        manager.set_tile((3, 3 + turn), "+")
+        manager.add_message(f"turn {turn}")
+        manager.mark_dirty()
+        manager.save_state()
+        saved.append(_normalized(manager.get_state()))
+    manager.close()
+    return manager, saved
+
+def _recovered(tmp_path):
+    manager = GameStateManager(str(tmp_path / "game.json"), save_mode="journal")
+    assert manager.load_state()
+    return manager
+
+def test_recovery_replays_every_record(tmp_path):
+    _, saved = _played(tmp_path, 5)
+    assert _normalized(_recovered(tmp_path).get_state()) == saved[-1]
+
+def test_torn_tail_is_dropped_and_truncated(tmp_path):
+    manager, saved = _played(tmp_path, 5)
+    log_path = manager.journal.log_path
+    size = os.path.getsize(log_path)
+    with open(log_path, "r+b") as f:
+        f.truncate(size - 3)
+
+    recovered = _recovered(tmp_path)
+    assert _normalized(recovered.get_state()) == saved[-2]
+    assert recovered.journal.records == 4
+    # The torn record is cut off so later appends follow a valid one
+    recovered.add_message("after recovery")
+    recovered.mark_dirty()
+    recovered.save_state()
+    expected = _normalized(recovered.get_state())
+    recovered.close()
+    assert _normalized(_recovered(tmp_path).get_state()) == expected
+
+def test_corrupt_record_stops_replay(tmp_path):
+    manager, saved = _played(tmp_path, 3)
+    log_path = manager.journal.log_path
+    with open(log_path, "r+b") as f:
+        data = bytearray(f.read())
+        data[-5] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+    assert _normalized(_recovered(tmp_path).get_state()) == saved[-2]
+
+def test_log_from_older_generation_is_ignored(tmp_path):
+    manager, saved = _played(tmp_path, 2)
+    with open(manager.journal.log_path, "r+b") as f:
+        f.seek(4)
+        f.write((manager.journal.generation + 1).to_bytes(4, "big"))
+    assert _normalized(_recovered(tmp_path).get_state()) == saved[0]
\ No newline at end of file
@@ -0,0 +1,26 @@
+import base64
+import random
+
+import pytest
+
+from app.game import map_codec
+
+def _map(width, height, seed=0):
+    rng = random.Random(seed)
+    return [[rng.choice("#..+") for _ in range(width)] for _ in range(height)]
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("rows", [_map(50, 50), [["#"] * 600], [["."]]])
+def test_round_trip(rows, compress):
+    assert map_codec.decode_map(map_codec.encode_map(rows, compress=compress)) == rows
+
+def test_json_wrapper_round_trip():
+    rows = _map(30, 20)
+    wrapped = map_codec.encode_map_json(rows, map_codec.ENCODING_RLE_ZLIB)
+    assert wrapped["encoding"] == map_codec.ENCODING_RLE_ZLIB
+    assert map_codec.decode_map(base64.b64decode(wrapped["data"])) == rows
+
+def test_truncated_payload_is_rejected():
+    data = map_codec.encode_map(_map(20, 10), compress=False)
+    with pytest.raises(ValueError):
+        map_codec.decode_map(data[:-2])
\ No newline at end of file
@@ -31,12 +31,39 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = "llama3.2:3b-instruct-q4_K_M"
     ENABLE_LLM_CACHE: bool = True
     LLM_CACHE_TTL: int = 3600  # 1 hour
+    OLLAMA_TIMEOUT: float = 30.0  # seconds per call
+    OLLAMA_MAX_CONCURRENCY: int = 4  # in-flight inference requests per worker
+    OLLAMA_PULL_TIMEOUT: float = 1800.0  # seconds for a background model pull
+    ENABLE_LLM_L1_CACHE: bool = True  # per-worker cache in front of Redis
+    LLM_L1_MAX_ENTRIES: int = 10000
+    LLM_L1_MAX_BYTES: int = 16 * 1024 * 1024  # memory ceiling (serialized size)
+    LLM_L1_TTL: int = 60  # seconds
+    LLM_CACHE_WINDOW: int = 3  # tile radius around the enemy included in cache keys
+    LLM_PENDING_POLL_INTERVAL: float = 0.05  # seconds between checks for a peer's result
+    ENABLE_TACTICAL_SOLVER: bool = True  # resolve obvious enemy moves without the LLM
+    TACTICAL_SIGHT_RADIUS: int = 8  # tiles; players further away are out of sight
+    PATH_CACHE_ENTRIES: int = 32  # Dijkstra maps kept per worker (one per map x goal x kind)
+    
+    CONTENT_POOL_VARIANTS: int = 4  # generated variants kept per bucket
+    CONTENT_POOL_MAX_USES: int = 3  # serves before a variant is replaced
+    CONTENT_POOL_MAX_BUCKETS: int = 64
+    CONTENT_LEVEL_BAND: int = 3  # player levels sharing one bucket
+    CONTENT_LIBRARY_PATH: str = "content_library.db"  # built by app.services.batch_generate
+    CONTENT_LIBRARY_COUNT_TTL: float = 60.0  # seconds before bucket row counts are re-read
     
     # Game
     AUTO_SAVE_INTERVAL: int = 30  # seconds
+    SAVE_BATCH_SIZE: int = 500  # rows per bulk upsert statement
+    SESSION_STATE_TTL: int = 24 * 3600  # seconds live state stays in Redis after last action
+    ENABLE_LEGACY_SAVE: bool = False  # also call GameService.save_game on SAVE and disconnect
+    ENABLE_FOV: bool = True  # send clients only the tiles and entities their player can see or remembers
+    FOV_RADIUS: int = 8  # tiles
+    FOV_CACHE_ENTRIES: int = 1024  # cached views per connection
     MAX_INVENTORY_SIZE: int = 20
     DUNGEON_WIDTH: int = 80
     DUNGEON_HEIGHT: int = 40
+    DUNGEON_POOL_SIZE: int = 4  # ready levels per (theme, level, size)
+    DUNGEON_POOL_WORKERS: int = 2
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,175 @@
+"""In-process LRU/TTL cache layered in front of Redis"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """
+    Size-bounded LRU cache with per-entry TTL
+
+    Stores parsed objects as-is; callers must not mutate what they get back.
+    Bounded by entry count and by an estimate of the serialized size.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires, _ = entry
+        if expires < time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None):
+        """Insert ``value``; ``size`` is its approximate footprint in bytes"""
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        expires = time.monotonic() + min(ttl or self.ttl, self.ttl)
+        self._entries[key] = (value, expires, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+class TieredCache:
+    """
+    L1 (this worker's LRUCache) in front of L2 (Redis)
+
+    Writes and deletes publish the key on ``channel``; every other worker
+    listening there drops its L1 copy, so L1 never serves a value another
+    worker has replaced. Call ``start()`` once Redis is connected.
+    """
+
+    def __init__(self, redis_client: RedisClient, channel: str, enabled: bool = True,
+                 max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024, ttl: float = 60.0):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.enabled = enabled
+        self.l1 = LRUCache(max_entries, max_bytes, ttl)
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._listener: Optional[asyncio.Task] = None
+
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Cached value from L1, else from Redis (filling L1)"""
+        if self.enabled:
+            value = self.l1.get(key)
+            if value is not None:
+                self.l1_hits += 1
+                return value
+
+        value = await self.redis_client.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.l2_hits += 1
+        if self.enabled:
+            self.l1.set(key, value, len(json.dumps(value)))
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Write through to Redis and L1, and invalidate other workers"""
+        await self.redis_client.set(key, value, ttl=ttl)
+        if self.enabled:
+            self.l1.set(key, value, len(json.dumps(value)), ttl=ttl)
+            await self._publish(key)
+
+    async def delete(self, key: str):
+        await self.redis_client.delete(key)
+        if self.enabled:
+            self.l1.pop(key)
+            await self._publish(key)
+
+    async def _publish(self, key: str):
+        await self.redis_client.publish(self.channel, {"origin": self.origin, "key": key})
+
+    async def start(self):
+        """Start listening for other workers' invalidations"""
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub()
+                await pubsub.subscribe(self.channel)
+                # Anything may have changed while we weren't subscribed
+                self.l1.clear()
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self._invalidate(message["data"])
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                self.l1.clear()
+                await asyncio.sleep(1.0)
+
+    def _invalidate(self, data: str):
+        try:
+            message = json.loads(data)
+        except (TypeError, json.JSONDecodeError):
+            return
+        if message.get("origin") != self.origin:
+            self.l1.pop(message.get("key"))
+            self.invalidations += 1
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        """L1/L2 hit counters and L1 footprint"""
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "l1_entries": len(self.l1),
+            "l1_bytes": self.l1.bytes,
+        }
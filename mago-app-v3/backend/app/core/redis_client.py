@@ -1,6 +1,6 @@
 """Redis client for caching"""
 import redis.asyncio as redis
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 import json
 import logging
 
@@ -8,6 +8,30 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Delete a key only while it still holds the caller's value (lock release)
+_DELETE_IF_EQUALS = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Reset a key's TTL only while it still holds the caller's value (lock keepalive)
+_EXPIRE_IF_EQUALS = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Push onto the head of a list only while it is shorter than a cap
+_LPUSH_CAPPED = """
+if redis.call('llen', KEYS[1]) < tonumber(ARGV[2]) then
+    return redis.call('lpush', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
 class RedisClient:
     """Async Redis client wrapper"""
     
@@ -56,6 +80,14 @@ class RedisClient:
         except Exception as e:
             logger.error(f"Redis set error: {e}")
     
+    async def set_nx(self, key: str, value: Any, ttl: int) -> bool:
+        """Set value only if key is absent (short-lived lock); True if set"""
+        try:
+            return bool(await self.redis.set(key, json.dumps(value), ex=ttl, nx=True))
+        except Exception as e:
+            logger.error(f"Redis set_nx error: {e}")
+            return False
+    
     async def delete(self, key: str):
         """Delete key from Redis"""
         try:
@@ -63,6 +95,22 @@ class RedisClient:
         except Exception as e:
             logger.error(f"Redis delete error: {e}")
     
+    async def delete_if_equals(self, key: str, value: Any) -> bool:
+        """Atomically delete key if it still holds value; True if deleted"""
+        try:
+            return bool(await self.redis.eval(_DELETE_IF_EQUALS, 1, key, json.dumps(value)))
+        except Exception as e:
+            logger.error(f"Redis delete_if_equals error: {e}")
+            return False
+    
+    async def expire_if_equals(self, key: str, value: Any, ttl: int) -> bool:
+        """Atomically reset key's TTL if it still holds value; True if refreshed"""
+        try:
+            return bool(await self.redis.eval(_EXPIRE_IF_EQUALS, 1, key, json.dumps(value), ttl))
+        except Exception as e:
+            logger.error(f"Redis expire_if_equals error: {e}")
+            return False
+    
     async def exists(self, key: str) -> bool:
         """Check if key exists"""
         try:
@@ -71,6 +119,78 @@ class RedisClient:
             logger.error(f"Redis exists error: {e}")
             return False
     
+    async def lpush(self, key: str, value: Any):
+        """Push value onto the head of a list"""
+        try:
+            await self.redis.lpush(key, json.dumps(value))
+        except Exception as e:
+            logger.error(f"Redis lpush error: {e}")
+    
+    async def lpush_capped(self, key: str, value: Any, cap: int) -> bool:
+        """Atomically push value onto the head of a list shorter than cap; True if pushed"""
+        try:
+            return bool(await self.redis.eval(_LPUSH_CAPPED, 1, key, json.dumps(value), cap))
+        except Exception as e:
+            logger.error(f"Redis lpush_capped error: {e}")
+            return False
+    
+    async def rpop(self, key: str) -> Optional[Any]:
+        """Pop value from the tail of a list"""
+        try:
+            value = await self.redis.rpop(key)
+            if value:
+                return json.loads(value)
+            return None
+        except Exception as e:
+            logger.error(f"Redis rpop error: {e}")
+            return None
+    
+    async def llen(self, key: str) -> int:
+        """Get list length"""
+        try:
+            return await self.redis.llen(key)
+        except Exception as e:
+            logger.error(f"Redis llen error: {e}")
+            return 0
+    
+    async def hgetall(self, key: str) -> Dict[str, Any]:
+        """Get all fields of a hash, JSON-decoded"""
+        try:
+            fields = await self.redis.hgetall(key)
+            return {field: json.loads(value) for field, value in fields.items()}
+        except Exception as e:
+            logger.error(f"Redis hgetall error: {e}")
+            return {}
+    
+    async def hset(self, key: str, mapping: Dict[str, Any], ttl: int = None):
+        """Set hash fields (JSON-encoded) and optionally refresh the key's TTL"""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={field: json.dumps(value) for field, value in mapping.items()})
+            if ttl:
+                pipe.expire(key, ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis hset error: {e}")
+    
+    async def hdel(self, key: str, *fields: str):
+        """Delete hash fields"""
+        try:
+            await self.redis.hdel(key, *fields)
+        except Exception as e:
+            logger.error(f"Redis hdel error: {e}")
+    
+    async def publish(self, channel: str, message: Any):
+        """Publish a JSON message on a pub/sub channel"""
+        try:
+            await self.redis.publish(channel, json.dumps(message))
+        except Exception as e:
+            logger.error(f"Redis publish error: {e}")
+    
+    def pubsub(self):
+        """New pub/sub connection (caller subscribes and closes it)"""
+        return self.redis.pubsub()
+    
     async def close(self):
         """Close Redis connection"""
         if self.redis:
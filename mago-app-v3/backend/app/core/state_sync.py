@@ -0,0 +1,184 @@
+"""Per-connection state diffing for STATE_UPDATE / STATE_DELTA messages"""
+import json
+from typing import Any, Dict, List, Optional
+
+def _snapshot(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy state as the client sees it (tuples become lists)"""
+    return json.loads(json.dumps(state))
+
+def _is_tile_map(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and isinstance(value[0], list)
+
+def _is_entity_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, dict) and "id" in v for v in value)
+
+def _is_log(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+def _diff_tiles(old: List[List[Any]], new: List[List[Any]]) -> Optional[List[List[Any]]]:
+    """[[x, y, tile], ...] for changed tiles, or None if the shape changed"""
+    if len(old) != len(new) or any(len(a) != len(b) for a, b in zip(old, new)):
+        return None
+    changes = []
+    for y, (old_row, new_row) in enumerate(zip(old, new)):
+        if old_row != new_row:
+            changes.extend([x, y, tile] for x, (was, tile) in enumerate(zip(old_row, new_row)) if was != tile)
+    return changes
+
+def _diff_entities(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    old_by_id = {e["id"]: e for e in old}
+    new_ids = [e["id"] for e in new]
+    present = set(new_ids)
+    removed = [eid for eid in old_by_id if eid not in present]
+    changed = [e for e in new if old_by_id.get(e["id"]) != e]
+
+    delta: Dict[str, Any] = {}
+    if changed:
+        delta["upsert"] = changed
+    if removed:
+        delta["remove"] = removed
+
+    # Only send ordering when upsert/remove alone would not reproduce it
+    kept = [eid for eid in old_by_id if eid in present]
+    expected = kept + [eid for eid in new_ids if eid not in old_by_id]
+    if expected != new_ids:
+        delta["order"] = new_ids
+    return delta
+
+def _appended_lines(old: List[str], new: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Lines appended to a (possibly trimmed) log, or None if it was rewritten
+
+    ``length`` is the log size after appending, so clients can trim the
+    same way the server did.
+    """
+    for overlap in range(min(len(old), len(new)), 0, -1):
+        if old[-overlap:] == new[:overlap]:
+            return {"lines": new[overlap:], "length": len(new)}
+    return None
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Structural diff of two JSON-like states
+
+    Returns a dict with any of:
+    - set:      {key: value} replaced wholesale
+    - unset:    [key] removed
+    - tiles:    {key: [[x, y, tile], ...]} changed map cells
+    - entities: {key: {"upsert": [...], "remove": [ids], "order": [ids]}}
+    - append:   {key: {"lines": [...], "length": n}} appended log lines
+    - nested:   {key: delta} for nested dicts
+    """
+    delta: Dict[str, Any] = {}
+
+    def put(kind: str, key: str, value: Any):
+        delta.setdefault(kind, {})[key] = value
+
+    for key, value in new.items():
+        if key not in old:
+            put("set", key, value)
+            continue
+        before = old[key]
+        if before == value:
+            continue
+
+        if isinstance(before, dict) and isinstance(value, dict):
+            put("nested", key, diff_state(before, value))
+        elif _is_tile_map(before) and _is_tile_map(value):
+            tiles = _diff_tiles(before, value)
+            if tiles is None:
+                put("set", key, value)
+            else:
+                put("tiles", key, tiles)
+        elif _is_log(before) and _is_log(value):
+            appended = _appended_lines(before, value)
+            if appended is None:
+                put("set", key, value)
+            else:
+                put("append", key, appended)
+        elif before and value and _is_entity_list(before) and _is_entity_list(value):
+            put("entities", key, _diff_entities(before, value))
+        else:
+            put("set", key, value)
+
+    unset = [key for key in old if key not in new]
+    if unset:
+        delta["unset"] = unset
+    return delta
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a diff_state delta to a snapshot (reference for clients)"""
+    result = dict(state)
+    for key in delta.get("unset", []):
+        result.pop(key, None)
+    result.update(delta.get("set", {}))
+
+    for key, sub in delta.get("nested", {}).items():
+        result[key] = apply_delta(result[key], sub)
+    for key, changes in delta.get("tiles", {}).items():
+        rows = [row[:] for row in result[key]]
+        for x, y, tile in changes:
+            rows[y][x] = tile
+        result[key] = rows
+    for key, appended in delta.get("append", {}).items():
+        merged = result[key] + appended["lines"]
+        result[key] = merged[len(merged) - appended["length"]:]
+    for key, sub in delta.get("entities", {}).items():
+        by_id = {e["id"]: e for e in result[key]}
+        order = [e["id"] for e in result[key]]
+        for eid in sub.get("remove", []):
+            by_id.pop(eid, None)
+            order.remove(eid)
+        for entity in sub.get("upsert", []):
+            if entity["id"] not in by_id:
+                order.append(entity["id"])
+            by_id[entity["id"]] = entity
+        result[key] = [by_id[eid] for eid in sub.get("order", order)]
+    return result
+
+class StateSync:
+    """
+    Tracks what one connection has acknowledged and encodes state messages
+
+    A client that sends {"type": "ACK", "seq": n} after applying message n
+    receives STATE_DELTA messages diffed against its last acknowledged
+    state. Clients that never ack, lag more than ``max_lag`` messages
+    behind, or reach ``keyframe_interval`` get a full STATE_UPDATE keyframe.
+    """
+
+    def __init__(self, keyframe_interval: int = 100, max_lag: int = 8):
+        self.keyframe_interval = keyframe_interval
+        self.max_lag = max_lag
+        self.seq = 0
+        self.acked_seq: Optional[int] = None
+        self.acked_state: Optional[Dict[str, Any]] = None
+        self.last_keyframe = 0
+        self._pending: Dict[int, Dict[str, Any]] = {}
+
+    def encode(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the next state message for this connection"""
+        self.seq += 1
+        snapshot = _snapshot(state)
+        self._pending[self.seq] = snapshot
+        # Only the last max_lag messages can still become a delta base
+        self._pending.pop(self.seq - self.max_lag - 1, None)
+
+        lagging = self.acked_seq is None or self.seq - self.acked_seq > self.max_lag
+        if lagging or self.seq - self.last_keyframe >= self.keyframe_interval:
+            self.last_keyframe = self.seq
+            return {"type": "STATE_UPDATE", "seq": self.seq, "keyframe": True, "data": state}
+
+        return {
+            "type": "STATE_DELTA",
+            "seq": self.seq,
+            "base": self.acked_seq,
+            "data": diff_state(self.acked_state, snapshot),
+        }
+
+    def ack(self, seq: int):
+        """Record that the client has applied message ``seq``"""
+        if seq not in self._pending or (self.acked_seq is not None and seq <= self.acked_seq):
+            return
+        self.acked_seq = seq
+        self.acked_state = self._pending[seq]
+        self._pending = {s: snap for s, snap in self._pending.items() if s > seq}
@@ -44,6 +44,16 @@ class ConnectionManager:
                 logger.error(f"Failed to send message to {user_id}: {e}")
                 self.disconnect(user_id)
     
+    async def send_personal_bytes(self, data: bytes, user_id: str):
+        """Send binary frame to specific user"""
+        websocket = self.active_connections.get(user_id)
+        if websocket:
+            try:
+                await websocket.send_bytes(data)
+            except Exception as e:
+                logger.error(f"Failed to send binary message to {user_id}: {e}")
+                self.disconnect(user_id)
+    
     async def broadcast(self, message: Dict[str, Any], room: str = None):
         """Broadcast message to all users or specific room"""
         if room:
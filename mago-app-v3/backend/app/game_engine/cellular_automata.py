@@ -0,0 +1,41 @@
+"""Vectorized cellular automata for cave generation"""
+import numpy as np
+
+# Neighbourhood thresholds: 5+ walls -> wall, 3- walls -> floor, 4 -> unchanged
+WALL_THRESHOLD = 5
+FLOOR_THRESHOLD = 3
+
+def count_wall_neighbours(walls: np.ndarray) -> np.ndarray:
+    """
+    Count walls in the 8-neighbourhood of every cell at once
+
+    ``walls`` is a boolean (height, width) mask. Cells outside the grid
+    count as walls, matching the per-cell rule the generator used before.
+    """
+    height, width = walls.shape
+    padded = np.pad(walls, 1, mode="constant", constant_values=True).astype(np.uint8)
+
+    counts = np.zeros((height, width), dtype=np.uint8)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy == 1 and dx == 1:
+                continue
+            counts += padded[dy:dy + height, dx:dx + width]
+    return counts
+
+def step(walls: np.ndarray) -> np.ndarray:
+    """Run one automaton iteration; the outer border is left untouched"""
+    counts = count_wall_neighbours(walls)
+    result = walls.copy()
+
+    inner = result[1:-1, 1:-1]
+    inner_counts = counts[1:-1, 1:-1]
+    inner[inner_counts >= WALL_THRESHOLD] = True
+    inner[inner_counts <= FLOOR_THRESHOLD] = False
+    return result
+
+def run(walls: np.ndarray, iterations: int) -> np.ndarray:
+    """Run ``iterations`` automaton steps on a wall mask"""
+    for _ in range(iterations):
+        walls = step(walls)
+    return walls
@@ -1,34 +1,21 @@
 """Advanced procedural dungeon generator"""
+import os
 import random
-from typing import List, Tuple, Set
-from enum import Enum
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Tuple
 
-class TileType(Enum):
-    WALL = "#"
-    FLOOR = "."
-    DOOR = "+"
-    STAIRS_DOWN = ">"
-    STAIRS_UP = "<"
-    WATER = "~"
-    LAVA = "^"
-    CHEST = "C"
+import numpy as np
 
-class Room:
-    def __init__(self, x: int, y: int, width: int, height: int):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.center = (x + width // 2, y + height // 2)
-    
-    def intersects(self, other: 'Room') -> bool:
-        """Check if this room intersects another (with 1-tile buffer)"""
-        return (
-            self.x <= other.x + other.width + 1 and
-            self.x + self.width + 1 >= other.x and
-            self.y <= other.y + other.height + 1 and
-            self.y + self.height + 1 >= other.y
-        )
+from app.game_engine import cellular_automata
+from app.game_engine.regions import RegionMap, label_regions, region_links
+from app.game_engine.rooms import Room, PlacementIndex, BSPNode, bsp_partition
+from app.game_engine.tile_grid import TileType, TileCode, new_grid, grid_to_rows, rows_to_grid
+
+# Maps larger than this are laid out with BSP instead of scattered rooms
+BSP_AREA_THRESHOLD = 80 * 40
+# Below this many values, setting up numpy's generator costs more than it saves
+BATCH_NOISE_MIN = 4096
+BSP_MIN_LEAF = 6
 
 class DungeonGenerator:
     """
@@ -38,18 +25,42 @@ class DungeonGenerator:
     - BSP (Binary Space Partitioning) for large structures
     - Cellular Automata for organic caves
     - Wave Function Collapse for themed rooms (future)
+    
+    Seed contract: a generator's layout depends only on (width, height,
+    seed, level, theme). Each instance draws from its own random.Random(seed),
+    so generators can run concurrently on threads or processes, and the
+    stream matches what random.seed(seed) produced in earlier versions.
+    
+    Tiles are stored in ``self.grid`` as a (height, width) uint8 array of
+    TileCode values. ``self.dungeon`` is a List[List[str]] snapshot built on
+    each read, so writing into it changes nothing; use ``set_tile`` (or
+    assign a whole map to ``self.dungeon``).
     """
     
     def __init__(self, width: int = 80, height: int = 40, seed: int = None):
         self.width = width
         self.height = height
-        self.seed = seed or random.randint(0, 999999)
-        random.seed(self.seed)
+        self.seed = seed if seed is not None else random.randint(0, 999999)
+        # Private stream: generators never share or disturb global random state
+        self.rng = random.Random(self.seed)
         
-        self.dungeon: List[List[str]] = []
+        self.grid: np.ndarray = new_grid(0, 0)
         self.rooms: List[Room] = []
         self.corridors: List[Tuple[int, int]] = []
     
+    @property
+    def dungeon(self) -> List[List[str]]:
+        """Read-only character map snapshot of the tile grid (edits to it are not kept)"""
+        return grid_to_rows(self.grid)
+    
+    @dungeon.setter
+    def dungeon(self, rows: List[List[str]]):
+        self.grid = rows_to_grid(rows)
+    
+    def set_tile(self, x: int, y: int, tile: TileType):
+        """Change one tile in place"""
+        self.grid[y, x] = tile.code
+    
     def generate(self, level: int = 1, theme: str = "dungeon") -> List[List[str]]:
         """
         Generate dungeon based on level and theme
@@ -61,8 +72,7 @@ class DungeonGenerator:
         - mixed: Combination of above
         """
         # Initialize empty dungeon (all walls)
-        self.dungeon = [[TileType.WALL.value for _ in range(self.width)] 
-                        for _ in range(self.height)]
+        self.grid = new_grid(self.width, self.height)
         
         if theme == "cave":
             self._generate_cave(level)
@@ -79,9 +89,22 @@ class DungeonGenerator:
         return self.dungeon
     
     def _generate_dungeon(self, level: int):
-        """Generate classic dungeon using BSP"""
+        """Generate classic dungeon: scattered rooms, or BSP on large maps"""
+        if self.width * self.height > BSP_AREA_THRESHOLD:
+            self._place_bsp_rooms(level)
+        else:
+            self._place_scattered_rooms(level)
+        
+        # Add stairs
+        if self.rooms:
+            self.grid[self.rooms[0].center[1], self.rooms[0].center[0]] = TileCode.STAIRS_UP
+            self.grid[self.rooms[-1].center[1], self.rooms[-1].center[0]] = TileCode.STAIRS_DOWN
+    
+    def _place_scattered_rooms(self, level: int):
+        """Place random rooms, each joined to the previous one"""
         # Number of rooms increases with level
         num_rooms = min(8 + level * 2, 30)
+        index = PlacementIndex(self.width, self.height)
         
         attempts = 0
         max_attempts = num_rooms * 10
@@ -90,52 +113,90 @@ class DungeonGenerator:
             attempts += 1
             
             # Room size varies
-            room_width = random.randint(4, 12)
-            room_height = random.randint(4, 8)
-            room_x = random.randint(1, self.width - room_width - 1)
-            room_y = random.randint(1, self.height - room_height - 1)
+            room_width = self.rng.randint(4, 12)
+            room_height = self.rng.randint(4, 8)
+            room_x = self.rng.randint(1, self.width - room_width - 1)
+            room_y = self.rng.randint(1, self.height - room_height - 1)
             
             new_room = Room(room_x, room_y, room_width, room_height)
             
             # Check for intersections
-            if not any(new_room.intersects(other) for other in self.rooms):
+            if index.is_free(new_room):
                 self._create_room(new_room)
+                index.add(new_room)
                 
                 # Connect to previous room
                 if self.rooms:
                     self._create_corridor(new_room.center, self.rooms[-1].center)
                 
                 self.rooms.append(new_room)
+    
+    def _place_bsp_rooms(self, level: int):
+        """Partition the map with BSP, one room per leaf, siblings joined"""
+        # Smaller leaves (more, tighter rooms) on deeper levels
+        max_leaf = max(BSP_MIN_LEAF * 2, 20 - level)
+        root = bsp_partition(1, 1, self.width - 2, self.height - 2,
+                             BSP_MIN_LEAF, max_leaf, self.rng)
         
-        # Add stairs
-        if self.rooms:
-            self.dungeon[self.rooms[0].center[1]][self.rooms[0].center[0]] = TileType.STAIRS_UP.value
-            self.dungeon[self.rooms[-1].center[1]][self.rooms[-1].center[0]] = TileType.STAIRS_DOWN.value
+        for leaf in root.leaves():
+            if leaf.width < 5 or leaf.height < 5:
+                continue
+            
+            # Keep a 1-tile gap to the right/bottom neighbour leaf
+            room_width = self.rng.randint(4, min(12, leaf.width - 1))
+            room_height = self.rng.randint(4, min(8, leaf.height - 1))
+            room_x = leaf.x + self.rng.randint(0, leaf.width - room_width - 1)
+            room_y = leaf.y + self.rng.randint(0, leaf.height - room_height - 1)
+            
+            leaf.room = Room(room_x, room_y, room_width, room_height)
+            self._create_room(leaf.room)
+            self.rooms.append(leaf.room)
+        
+        self._connect_bsp(root)
+    
+    def _connect_bsp(self, root: BSPNode):
+        """Join the two halves of every split with a corridor"""
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                continue
+            left, right = node.left.any_room(), node.right.any_room()
+            if left and right:
+                self._create_corridor(left.center, right.center)
+            stack.extend((node.left, node.right))
+    
+    def _random_floats(self, count: int) -> np.ndarray:
+        """
+        ``count`` values of self.rng.random() drawn at once
+        
+        numpy's MT19937 turns words into doubles the same way as
+        random.Random, so running it from self.rng's state gives the same
+        values. self.rng then advances exactly as ``count`` calls would.
+        """
+        if count < BATCH_NOISE_MIN:
+            return np.array([self.rng.random() for _ in range(count)])
+        version, internal, gauss_next = self.rng.getstate()
+        mt = np.random.RandomState()
+        mt.set_state(("MT19937", np.array(internal[:-1], dtype=np.uint32), internal[-1]))
+        values = mt.random_sample(count)
+        _, key, pos = mt.get_state()[:3]
+        self.rng.setstate((version, tuple(key.tolist()) + (int(pos),), gauss_next))
+        return values
     
     def _generate_cave(self, level: int):
         """Generate organic cave using Cellular Automata"""
-        # Initialize with random noise
-        for y in range(1, self.height - 1):
-            for x in range(1, self.width - 1):
-                if random.random() < 0.45:
-                    self.dungeon[y][x] = TileType.FLOOR.value
+        # Initialize with random noise (one draw per interior cell, row-major,
+        # so a seed yields the same cave as the original per-cell loop)
+        inner_h, inner_w = max(self.height - 2, 0), max(self.width - 2, 0)
+        noise = self._random_floats(inner_h * inner_w)
+        walls = self.grid == TileCode.WALL
+        walls[1:1 + inner_h, 1:1 + inner_w] &= (noise >= 0.45).reshape(inner_h, inner_w)
         
-        # Run cellular automata iterations
+        # Run cellular automata iterations over the whole grid at once
         iterations = 4 + min(level // 2, 3)
-        for _ in range(iterations):
-            new_dungeon = [row[:] for row in self.dungeon]
-            
-            for y in range(1, self.height - 1):
-                for x in range(1, self.width - 1):
-                    wall_count = self._count_adjacent_walls(x, y)
-                    
-                    # Rules: If 5+ walls nearby, become wall. If 3- walls, become floor
-                    if wall_count >= 5:
-                        new_dungeon[y][x] = TileType.WALL.value
-                    elif wall_count <= 3:
-                        new_dungeon[y][x] = TileType.FLOOR.value
-            
-            self.dungeon = new_dungeon
+        walls = cellular_automata.run(walls, iterations)
+        self.grid = np.where(walls, TileCode.WALL, TileCode.FLOOR).astype(self.grid.dtype)
         
         # Ensure connectivity
         self._connect_cave_regions()
@@ -169,9 +230,10 @@ class DungeonGenerator:
     
     def _create_room(self, room: Room):
         """Carve out a rectangular room"""
-        for y in range(room.y, min(room.y + room.height, self.height - 1)):
-            for x in range(room.x, min(room.x + room.width, self.width - 1)):
-                self.dungeon[y][x] = TileType.FLOOR.value
+        self.grid[
+            room.y:min(room.y + room.height, self.height - 1),
+            room.x:min(room.x + room.width, self.width - 1),
+        ] = TileCode.FLOOR
     
     def _create_corridor(self, start: Tuple[int, int], end: Tuple[int, int]):
         """Create L-shaped corridor between two points"""
@@ -179,7 +241,7 @@ class DungeonGenerator:
         x2, y2 = end
         
         # 50% chance to go horizontal first or vertical first
-        if random.random() < 0.5:
+        if self.rng.random() < 0.5:
             # Horizontal then vertical
             self._create_horizontal_corridor(x1, x2, y1)
             self._create_vertical_corridor(x2, y1, y2)
@@ -190,136 +252,83 @@ class DungeonGenerator:
     
     def _create_horizontal_corridor(self, x1: int, x2: int, y: int):
         """Create horizontal corridor"""
-        for x in range(min(x1, x2), max(x1, x2) + 1):
-            if 0 < x < self.width - 1 and 0 < y < self.height - 1:
-                self.dungeon[y][x] = TileType.FLOOR.value
+        if not 0 < y < self.height - 1:
+            return
+        start = max(min(x1, x2), 1)
+        end = min(max(x1, x2), self.width - 2)
+        if start <= end:
+            self.grid[y, start:end + 1] = TileCode.FLOOR
     
     def _create_vertical_corridor(self, x: int, y1: int, y2: int):
         """Create vertical corridor"""
-        for y in range(min(y1, y2), max(y1, y2) + 1):
-            if 0 < x < self.width - 1 and 0 < y < self.height - 1:
-                self.dungeon[y][x] = TileType.FLOOR.value
-    
-    def _count_adjacent_walls(self, x: int, y: int) -> int:
-        """Count walls in 3x3 area (for cellular automata)"""
-        count = 0
-        for dy in [-1, 0, 1]:
-            for dx in [-1, 0, 1]:
-                nx, ny = x + dx, y + dy
-                if nx == x and ny == y:
-                    continue
-                if 0 <= nx < self.width and 0 <= ny < self.height:
-                    if self.dungeon[ny][nx] == TileType.WALL.value:
-                        count += 1
-                else:
-                    count += 1  # Out of bounds counts as wall
-        return count
+        if not 0 < x < self.width - 1:
+            return
+        start = max(min(y1, y2), 1)
+        end = min(max(y1, y2), self.height - 2)
+        if start <= end:
+            self.grid[start:end + 1, x] = TileCode.FLOOR
     
     def _connect_cave_regions(self):
         """Ensure all cave regions are connected"""
-        # Find all floor regions using flood fill
         regions = self._find_regions()
         
-        if len(regions) <= 1:
+        if regions.count <= 1:
             return
         
-        # Connect each region to the next largest
-        regions.sort(key=len, reverse=True)
-        for i in range(1, len(regions)):
-            # Pick random tiles from each region
-            point1 = random.choice(list(regions[0]))
-            point2 = random.choice(list(regions[i]))
+        # Join regions along a spanning tree of their nearest tile pairs
+        for point1, point2 in region_links(regions):
             self._create_corridor(point1, point2)
-            
-            # Merge regions
-            regions[0].update(regions[i])
     
-    def _find_regions(self) -> List[Set[Tuple[int, int]]]:
-        """Find all disconnected floor regions"""
-        visited = set()
-        regions = []
-        
-        for y in range(self.height):
-            for x in range(self.width):
-                if (x, y) not in visited and self.dungeon[y][x] == TileType.FLOOR.value:
-                    region = self._flood_fill(x, y, visited)
-                    if region:
-                        regions.append(region)
-        
-        return regions
-    
-    def _flood_fill(self, x: int, y: int, visited: Set[Tuple[int, int]]) -> Set[Tuple[int, int]]:
-        """Flood fill to find connected region"""
-        if (x, y) in visited or self.dungeon[y][x] != TileType.FLOOR.value:
-            return set()
-        
-        region = set()
-        stack = [(x, y)]
-        
-        while stack:
-            cx, cy = stack.pop()
-            if (cx, cy) in visited:
-                continue
-            if self.dungeon[cy][cx] != TileType.FLOOR.value:
-                continue
-            
-            visited.add((cx, cy))
-            region.add((cx, cy))
-            
-            # Check 4 adjacent tiles
-            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                nx, ny = cx + dx, cy + dy
-                if 0 <= nx < self.width and 0 <= ny < self.height:
-                    stack.append((nx, ny))
-        
-        return region
+    def _find_regions(self) -> RegionMap:
+        """Label all disconnected floor regions"""
+        return label_regions(self.grid == TileCode.FLOOR)
     
     def _add_doors(self):
         """Add doors at room entrances"""
         for room in self.rooms:
             # Check room edges for corridor connections
-            for x in range(room.x, room.x + room.width):
-                # Top edge
-                if (room.y > 0 and 
-                    self.dungeon[room.y][x] == TileType.FLOOR.value and
-                    self.dungeon[room.y - 1][x] == TileType.FLOOR.value and
-                    random.random() < 0.3):
-                    self.dungeon[room.y][x] = TileType.DOOR.value
-                
-                # Bottom edge
-                if (room.y + room.height < self.height - 1 and
-                    self.dungeon[room.y + room.height - 1][x] == TileType.FLOOR.value and
-                    self.dungeon[room.y + room.height][x] == TileType.FLOOR.value and
-                    random.random() < 0.3):
-                    self.dungeon[room.y + room.height - 1][x] = TileType.DOOR.value
+            xs = slice(room.x, room.x + room.width)
+            top_row, bottom_row = room.y, room.y + room.height - 1
+            
+            top = np.zeros(room.width, dtype=bool)
+            if room.y > 0:
+                top = (self.grid[top_row, xs] == TileCode.FLOOR) & (self.grid[top_row - 1, xs] == TileCode.FLOOR)
+            bottom = np.zeros(room.width, dtype=bool)
+            if room.y + room.height < self.height - 1:
+                bottom = (self.grid[bottom_row, xs] == TileCode.FLOOR) & (self.grid[bottom_row + 1, xs] == TileCode.FLOOR)
+            
+            # Roll only for candidate tiles, top before bottom, left to right
+            for i in np.flatnonzero(top | bottom).tolist():
+                if top[i] and self.rng.random() < 0.3:
+                    self.grid[top_row, room.x + i] = TileCode.DOOR
+                if bottom[i] and self.rng.random() < 0.3:
+                    self.grid[bottom_row, room.x + i] = TileCode.DOOR
     
     def _add_water_pools(self, level: int):
         """Add water/lava pools based on level"""
-        num_pools = random.randint(0, 2 + level // 3)
+        num_pools = self.rng.randint(0, 2 + level // 3)
         
         for _ in range(num_pools):
-            pool_size = random.randint(2, 5)
-            x = random.randint(1, self.width - pool_size - 1)
-            y = random.randint(1, self.height - pool_size - 1)
+            pool_size = self.rng.randint(2, 5)
+            x = self.rng.randint(1, self.width - pool_size - 1)
+            y = self.rng.randint(1, self.height - pool_size - 1)
             
-            tile_type = TileType.LAVA if level > 5 and random.random() < 0.3 else TileType.WATER
+            tile_type = TileType.LAVA if level > 5 and self.rng.random() < 0.3 else TileType.WATER
             
-            for dy in range(pool_size):
-                for dx in range(pool_size):
-                    if self.dungeon[y + dy][x + dx] == TileType.FLOOR.value:
-                        self.dungeon[y + dy][x + dx] = tile_type.value
+            pool = self.grid[y:y + pool_size, x:x + pool_size]
+            pool[pool == TileCode.FLOOR] = tile_type.code
     
     def _add_chests(self, level: int):
         """Add treasure chests in rooms"""
         num_chests = min(len(self.rooms) // 3, 5)
         
         for _ in range(num_chests):
-            room = random.choice(self.rooms)
-            chest_x = room.x + random.randint(1, room.width - 2)
-            chest_y = room.y + random.randint(1, room.height - 2)
+            room = self.rng.choice(self.rooms)
+            chest_x = room.x + self.rng.randint(1, room.width - 2)
+            chest_y = room.y + self.rng.randint(1, room.height - 2)
             
-            if self.dungeon[chest_y][chest_x] == TileType.FLOOR.value:
-                self.dungeon[chest_y][chest_x] = TileType.CHEST.value
+            if self.grid[chest_y, chest_x] == TileCode.FLOOR:
+                self.grid[chest_y, chest_x] = TileCode.CHEST
     
     def get_spawn_point(self) -> Tuple[int, int]:
         """Get valid spawn point (center of first room or random floor)"""
@@ -328,9 +337,34 @@ class DungeonGenerator:
         
         # Find random floor tile
         for _ in range(100):
-            x = random.randint(1, self.width - 2)
-            y = random.randint(1, self.height - 2)
-            if self.dungeon[y][x] == TileType.FLOOR.value:
+            x = self.rng.randint(1, self.width - 2)
+            y = self.rng.randint(1, self.height - 2)
+            if self.grid[y, x] == TileCode.FLOOR:
                 return (x, y)
         
         return (self.width // 2, self.height // 2)
+
+def _generate_one(args: Tuple[int, int, int, int, str]) -> DungeonGenerator:
+    width, height, seed, level, theme = args
+    generator = DungeonGenerator(width, height, seed=seed)
+    generator.generate(level=level, theme=theme)
+    return generator
+
+def generate_many(seeds: Iterable[int], theme: str = "dungeon", level: int = 1,
+                  width: int = 80, height: int = 40, workers: int = None) -> List[DungeonGenerator]:
+    """
+    Generate one level per seed across worker processes
+    
+    Returns generated DungeonGenerator instances in seed order, identical to
+    running DungeonGenerator(width, height, seed).generate(level, theme)
+    serially for each seed.
+    """
+    jobs = [(width, height, seed, level, theme) for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    
+    if workers == 1 or len(jobs) <= 1:
+        return [_generate_one(job) for job in jobs]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        return list(executor.map(_generate_one, jobs, chunksize=chunksize))
@@ -0,0 +1,253 @@
+"""Shadowcasting field of view, cached per position and map version"""
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+Position = Tuple[int, int]
+
+# (xx, xy, yx, yy) per octant: map offset = (col*xx + row*xy, col*yx + row*yy)
+OCTANTS = [
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+]
+
+UNKNOWN = " "  # tiles the player has never seen
+_WALL = ord("#")
+
+# State keys holding entity lists that are hidden outside the player's view
+ENTITY_KEYS = ("enemies", "entities")
+
+def compute_fov(opaque: Sequence[Sequence[bool]], origin: Position, radius: int) -> Set[Position]:
+    """
+    Tiles visible from ``origin`` within ``radius`` (recursive shadowcasting)
+
+    ``opaque`` is indexed [y][x]; off-map counts as opaque. Opaque tiles
+    that are lit (the faces of walls) are included.
+    """
+    height = len(opaque)
+    width = len(opaque[0]) if height else 0
+    ox, oy = origin
+    if not (0 <= ox < width and 0 <= oy < height):
+        return set()
+
+    visible = {(ox, oy)}
+    radius_sq = radius * radius
+    for xx, xy, yx, yy in OCTANTS:
+        # Rows still to scan as (row, start slope, end slope); replaces recursion
+        stack = [(1, 1.0, 0.0)]
+        while stack:
+            first_row, start, end = stack.pop()
+            if start < end:
+                continue
+            for row in range(first_row, radius + 1):
+                dy = -row
+                blocked = False
+                next_start = start
+                for dx in range(-row, 1):
+                    left = (dx - 0.5) / (dy + 0.5)
+                    right = (dx + 0.5) / (dy - 0.5)
+                    if start < right:
+                        continue
+                    if end > left:
+                        break
+
+                    x, y = ox + dx * xx + dy * xy, oy + dx * yx + dy * yy
+                    inside = 0 <= x < width and 0 <= y < height
+                    if inside and dx * dx + dy * dy <= radius_sq:
+                        visible.add((x, y))
+
+                    wall = not inside or opaque[y][x]
+                    if blocked:
+                        if wall:
+                            next_start = right
+                            continue
+                        blocked = False
+                        start = next_start
+                    elif wall and row < radius:
+                        blocked = True
+                        stack.append((row + 1, start, left))
+                        next_start = right
+                if blocked:
+                    break
+    return visible
+
+class FOVCache:
+    """
+    Visible tile sets for one map, keyed by (origin, radius)
+
+    ``update`` moves the cache to a new map state and bumps ``version``.
+    Only views whose radius box contains a tile that became or stopped
+    being opaque are dropped; the rest are still exact and carry over, so
+    opening a door doesn't recompute every view on the level. Other tile
+    changes (floor to chest, say) invalidate nothing.
+    """
+
+    def __init__(self, opaque: np.ndarray, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.version = 0
+        self._views: "OrderedDict[Tuple[Position, int], FrozenSet[Position]]" = OrderedDict()
+        self._load(opaque)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def _load(self, opaque: np.ndarray):
+        self._opaque = opaque.copy()
+        # Nested lists: per-tile lookups are much cheaper than on an ndarray
+        self._rows: List[List[bool]] = opaque.tolist()
+
+    def visible(self, origin: Position, radius: int) -> FrozenSet[Position]:
+        key = ((int(origin[0]), int(origin[1])), radius)
+        view = self._views.get(key)
+        if view is not None:
+            self._views.move_to_end(key)
+            self.hits += 1
+            return view
+
+        self.misses += 1
+        view = self._views[key] = frozenset(compute_fov(self._rows, key[0], radius))
+        while len(self._views) > self.max_entries:
+            self._views.popitem(last=False)
+        return view
+
+    def update(self, opaque: np.ndarray) -> int:
+        """Apply a new opacity map; returns the number of cached views dropped"""
+        if opaque.shape != self._opaque.shape:
+            dropped = len(self._views)
+            self.version += 1
+            self._views.clear()
+            self._load(opaque)
+            self.invalidated += dropped
+            return dropped
+
+        ys, xs = np.nonzero(opaque != self._opaque)
+        return self.set_opaque({(x, y): bool(opaque[y, x]) for x, y in zip(xs.tolist(), ys.tolist())})
+
+    def set_opaque(self, changes: Dict[Position, bool]) -> int:
+        """Apply single-tile opacity changes; returns the number of cached views dropped"""
+        changes = {(x, y): value for (x, y), value in changes.items() if self._rows[y][x] != value}
+        if not changes:
+            return 0
+        self.version += 1
+        for (x, y), value in changes.items():
+            self._rows[y][x] = value
+            self._opaque[y, x] = value
+
+        xs = np.array([x for x, _ in changes])
+        ys = np.array([y for _, y in changes])
+        stale = [
+            key for key in self._views
+            if np.any((np.abs(xs - key[0][0]) <= key[1]) & (np.abs(ys - key[0][1]) <= key[1]))
+        ]
+        for key in stale:
+            del self._views[key]
+        self.invalidated += len(stale)
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """View cache counters"""
+        return {
+            "version": self.version,
+            "views": len(self._views),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+        }
+
+def _position(value: Any) -> Optional[Position]:
+    """(x, y) from a [x, y] pair or an {"x", "y"} dict"""
+    if isinstance(value, dict) and "x" in value and "y" in value:
+        return int(value["x"]), int(value["y"])
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return int(value[0]), int(value[1])
+    return None
+
+def _tiles(rows: List[List[str]]) -> np.ndarray:
+    """Character map as a (height, width) array of ASCII codes"""
+    width = len(rows[0])
+    return np.frombuffer("".join("".join(row) for row in rows).encode("ascii"), dtype=np.uint8).reshape(-1, width)
+
+class PlayerView:
+    """
+    What one player currently sees and remembers of the level
+
+    ``filter_state`` replaces the state's ``dungeon`` with the tiles seen
+    so far (as they were when last seen; never seen tiles are UNKNOWN)
+    and drops entities outside the current view. A new level resets the
+    memory.
+
+    Each call compares the map row by row with the previous one and
+    passes only the changed opacity to the FOVCache. Remembered tiles
+    are updated only where they are visible now. Unchanged masked rows
+    are reused, and a changed row is copied rather than edited, so
+    earlier results are never modified.
+    """
+
+    def __init__(self, radius: int = 8, max_entries: int = 1024):
+        self.radius = radius
+        self.max_entries = max_entries
+        self.cache: Optional[FOVCache] = None
+        self._level: Any = None
+        self._shape: Optional[Tuple[int, int]] = None
+        self._source: List[List[str]] = []  # map as of the last call
+        self._masked: List[List[str]] = []  # remembered tiles, UNKNOWN elsewhere
+
+    def _opacity_changes(self, rows: List[List[str]]) -> Dict[Position, bool]:
+        """Tiles whose opacity changed since the last call; refreshes the copy of the map"""
+        changes: Dict[Position, bool] = {}
+        for y, (row, before) in enumerate(zip(rows, self._source)):
+            if row == before:
+                continue
+            for x, (tile, was) in enumerate(zip(row, before)):
+                if tile != was and (tile == "#") != (was == "#"):
+                    changes[(x, y)] = tile == "#"
+            self._source[y] = list(row)
+        return changes
+
+    def observe(self, rows: List[List[str]], origin: Position, level: Any = None) -> Tuple[List[List[str]], FrozenSet[Position]]:
+        """Masked map and visible tiles after looking from ``origin``"""
+        shape = (len(rows), len(rows[0]))
+        if self.cache is None or self._shape != shape or level != self._level:
+            self.cache = FOVCache(_tiles(rows) == _WALL, self.max_entries)
+            self._shape = shape
+            self._level = level
+            self._source = [list(row) for row in rows]
+            self._masked = [[UNKNOWN] * shape[1] for _ in range(shape[0])]
+        else:
+            self.cache.set_opaque(self._opacity_changes(rows))
+
+        visible = self.cache.visible(origin, self.radius)
+        copied: Dict[int, List[str]] = {}
+        for x, y in visible:
+            tile = rows[y][x]
+            if self._masked[y][x] != tile:
+                row = copied.get(y)
+                if row is None:
+                    row = copied[y] = self._masked[y][:]
+                row[x] = tile
+        for y, row in copied.items():
+            self._masked[y] = row
+        return list(self._masked), visible
+
+    @staticmethod
+    def _in_view(entity: Any, visible: FrozenSet[Position]) -> bool:
+        # Entities without a map position (carried items etc.) are always kept
+        position = _position(entity.get("position")) if isinstance(entity, dict) else None
+        return position is None or position in visible
+
+    def filter_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of ``state`` limited to what the player can see or remembers"""
+        rows = state.get("dungeon")
+        origin = _position((state.get("player") or {}).get("position"))
+        if not rows or origin is None:
+            return state
+
+        masked, visible = self.observe(rows, origin, state.get("current_level", state.get("dungeon_level")))
+        filtered = {**state, "dungeon": masked}
+        for key in ENTITY_KEYS:
+            entities = state.get(key)
+            if isinstance(entities, list):
+                filtered[key] = [e for e in entities if self._in_view(e, visible)]
+        return filtered
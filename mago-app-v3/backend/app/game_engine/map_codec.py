@@ -0,0 +1,79 @@
+"""
+Compact wire format for dungeon maps
+
+Layout (big-endian):
+    u8  flags      bit 0 set -> body is zlib-compressed
+    u16 width
+    u16 height
+    ... body       (count u8, tile u8) run-length pairs, tile = ASCII char
+
+Encodings a client can negotiate:
+    json      nested List[List[str]] (default, fallback)
+    rle       binary frame, run-length body
+    rle+zlib  binary frame, run-length body compressed with zlib
+"""
+import struct
+import zlib
+from typing import List
+
+import numpy as np
+
+ENCODING_JSON = "json"
+ENCODING_RLE = "rle"
+ENCODING_RLE_ZLIB = "rle+zlib"
+ENCODINGS = (ENCODING_JSON, ENCODING_RLE, ENCODING_RLE_ZLIB)
+
+FLAG_ZLIB = 0x01
+_HEADER = struct.Struct(">BHH")
+_MAX_RUN = 255
+
+def negotiate(requested: str) -> str:
+    """Pick the encoding to use for a client request, falling back to JSON"""
+    return requested if requested in ENCODINGS else ENCODING_JSON
+
+def rle_encode(tiles: np.ndarray) -> bytes:
+    """Run-length encode a flat uint8 array as (count, value) byte pairs"""
+    if tiles.size == 0:
+        return b""
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(tiles)) + 1))
+    lengths = np.diff(np.append(starts, tiles.size))
+    values = tiles[starts]
+
+    # Split runs longer than 255 into full chunks plus a remainder
+    chunks = (lengths + _MAX_RUN - 1) // _MAX_RUN
+    counts = np.full(chunks.sum(), _MAX_RUN, dtype=np.int64)
+    counts[np.cumsum(chunks) - 1] = lengths - _MAX_RUN * (chunks - 1)
+
+    return np.column_stack((counts, np.repeat(values, chunks))).astype(np.uint8).tobytes()
+
+def rle_decode(body: bytes) -> np.ndarray:
+    """Inverse of rle_encode"""
+    pairs = np.frombuffer(body, dtype=np.uint8).reshape(-1, 2)
+    return np.repeat(pairs[:, 1], pairs[:, 0])
+
+def encode_map(rows: List[List[str]], compress: bool = True) -> bytes:
+    """Encode a character map into the binary wire format"""
+    height = len(rows)
+    width = len(rows[0]) if rows else 0
+    tiles = np.frombuffer("".join("".join(row) for row in rows).encode("ascii"), dtype=np.uint8)
+
+    body = rle_encode(tiles)
+    flags = 0
+    if compress:
+        body = zlib.compress(body)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(flags, width, height) + body
+
+def decode_map(data: bytes) -> List[List[str]]:
+    """Decode the binary wire format back into a character map"""
+    flags, width, height = _HEADER.unpack_from(data)
+    body = data[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    tiles = rle_decode(body)
+    if tiles.size != width * height:
+        raise ValueError("Map payload does not match its dimensions")
+    text = tiles.tobytes().decode("ascii")
+    return [list(text[y * width:(y + 1) * width]) for y in range(height)]
@@ -0,0 +1,199 @@
+"""Dijkstra maps: one distance field per goal, shared by every enemy"""
+import heapq
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.game_engine.fov import compute_fov
+
+Position = Tuple[int, int]
+Grid = Sequence[Sequence[str]]
+
+# 8-way moves, orthogonal first so ties prefer straight steps
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+
+APPROACH = "approach"
+FLEE = "flee"
+RANGED = "ranged"
+
+# Scaled-down negated approach map; below -1 so fleeing enemies prefer
+# running past the player toward open space over cornering themselves
+FLEE_FACTOR = -1.2
+
+_WALL = ord("#")
+
+def _flat(passable: np.ndarray) -> Tuple[List[bool], int, List[int]]:
+    """Passability as a flat list with a wall border, its row stride and neighbour offsets"""
+    height, width = passable.shape
+    padded = np.zeros((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = passable
+    stride = width + 2
+    return padded.ravel().tolist(), stride, [dy * stride + dx for dx, dy in DIRECTIONS]
+
+def _unflat(dist: List[float], shape: Tuple[int, int]) -> np.ndarray:
+    height, width = shape
+    return np.array(dist).reshape(height + 2, width + 2)[1:-1, 1:-1]
+
+def bfs(passable: np.ndarray, seeds: Iterable[Position]) -> np.ndarray:
+    """8-way step distance from every cell to the nearest seed (one deque pass)"""
+    cells, stride, offsets = _flat(passable)
+    dist = [np.inf] * len(cells)
+    queue = deque()
+    for x, y in seeds:
+        i = (y + 1) * stride + x + 1
+        if cells[i] and dist[i]:
+            dist[i] = 0
+            queue.append(i)
+    while queue:
+        i = queue.popleft()
+        d = dist[i] + 1
+        for offset in offsets:
+            j = i + offset
+            if cells[j] and dist[j] > d:
+                dist[j] = d
+                queue.append(j)
+    return _unflat(dist, passable.shape)
+
+def relax(values: np.ndarray, passable: np.ndarray) -> np.ndarray:
+    """
+    Lower every passable cell to its cheapest seed value + steps to it
+
+    Dijkstra from every finite cell of ``values``; needed where seeds
+    differ in value (flee maps), otherwise ``bfs`` is cheaper. Walls and
+    unreachable cells stay at infinity.
+    """
+    cells, stride, offsets = _flat(passable)
+    height, width = passable.shape
+    dist = [np.inf] * len(cells)
+    heap = []
+    for (y, x), value in np.ndenumerate(values):
+        i = (y + 1) * stride + x + 1
+        if cells[i] and value < np.inf:
+            dist[i] = float(value)
+            heap.append((dist[i], i))
+    heapq.heapify(heap)
+    while heap:
+        d, i = heapq.heappop(heap)
+        if d > dist[i]:
+            continue
+        d += 1
+        for offset in offsets:
+            j = i + offset
+            if cells[j] and dist[j] > d:
+                dist[j] = d
+                heapq.heappush(heap, (d, j))
+    return _unflat(dist, (height, width))
+
+def approach_map(passable: np.ndarray, goal: Position) -> np.ndarray:
+    """Steps from every cell to ``goal``"""
+    return bfs(passable, [goal])
+
+def flee_map(passable: np.ndarray, goal: Position) -> np.ndarray:
+    """Rolling downhill moves away from ``goal`` without running into dead ends"""
+    approach = approach_map(passable, goal)
+    return relax(np.where(np.isfinite(approach), approach * FLEE_FACTOR, np.inf), passable)
+
+def ranged_map(passable: np.ndarray, goal: Position, distance: int) -> np.ndarray:
+    """
+    Steps to the nearest tile ``distance`` away from ``goal`` with a clear view of it
+
+    Falls back to the approach map when no such tile exists.
+    """
+    visible = compute_fov((~passable).tolist(), goal, distance)
+    seeds = [
+        (x, y) for x, y in visible
+        if passable[y, x] and max(abs(x - goal[0]), abs(y - goal[1])) == distance
+    ]
+    if not seeds:
+        return approach_map(passable, goal)
+    return bfs(passable, seeds)
+
+def downhill(dmap: np.ndarray, position: Position, blocked: Optional[Set[Position]] = None) -> Optional[Position]:
+    """(dx, dy) to the lowest neighbour below ``position``, or None if none is lower"""
+    x, y = position
+    height, width = dmap.shape
+    best, step = dmap[y, x], None
+    for dx, dy in DIRECTIONS:
+        nx, ny = x + dx, y + dy
+        if not (0 <= nx < width and 0 <= ny < height) or (blocked and (nx, ny) in blocked):
+            continue
+        if dmap[ny, nx] < best:
+            best, step = dmap[ny, nx], (dx, dy)
+    return step
+
+def _tiles(grid: Grid) -> np.ndarray:
+    """Character map as a (height, width) array of ASCII codes"""
+    tiles = np.frombuffer("".join("".join(row) for row in grid).encode("ascii"), dtype=np.uint8)
+    return tiles.reshape(len(grid), -1)
+
+class DijkstraCache:
+    """
+    Dijkstra maps keyed by (map version, goal, kind), least recently used out
+
+    Every enemy chasing the same player on the same map reads one
+    distance field, so a turn costs one search rather than one per enemy.
+    Callers pass a ``version`` that is unique per map state (bumped on
+    every tile change) so a lookup doesn't touch the grid; without one
+    the tiles themselves are hashed into the key.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._maps: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, grid: Grid, goal: Sequence[int], kind: str = APPROACH, distance: int = 4,
+            version: Optional[Hashable] = None) -> np.ndarray:
+        """Distance field for ``kind`` (approach, flee or ranged) around ``goal``"""
+        goal = (int(goal[0]), int(goal[1]))
+        variant = (goal, kind, distance if kind == RANGED else None)
+        tiles = None
+        if version is not None:
+            key = ("version", version) + variant
+        else:
+            tiles = _tiles(grid)
+            key = (tiles.shape, tiles.tobytes()) + variant
+
+        dmap = self._maps.get(key)
+        if dmap is not None:
+            self._maps.move_to_end(key)
+            self.hits += 1
+            return dmap
+
+        self.misses += 1
+        passable = (tiles if tiles is not None else _tiles(grid)) != _WALL
+        if kind == FLEE:
+            dmap = flee_map(passable, goal)
+        elif kind == RANGED:
+            dmap = ranged_map(passable, goal, distance)
+        else:
+            dmap = approach_map(passable, goal)
+        self._maps[key] = dmap
+        while len(self._maps) > self.max_entries:
+            self._maps.popitem(last=False)
+        return dmap
+
+    def step(self, grid: Grid, position: Sequence[int], goal: Sequence[int], kind: str = APPROACH,
+             distance: int = 4, blocked: Optional[Set[Position]] = None,
+             max_distance: Optional[int] = None, version: Optional[Hashable] = None) -> Optional[Position]:
+        """
+        Next (dx, dy) for an enemy at ``position``, or None
+
+        None when no neighbour is lower (on the goal, at firing range,
+        cornered, or every way down is ``blocked``) or, for approach, when
+        the goal is unreachable or more than ``max_distance`` steps away.
+        """
+        dmap = self.get(grid, goal, kind, distance, version)
+        x, y = int(position[0]), int(position[1])
+        if not (0 <= y < dmap.shape[0] and 0 <= x < dmap.shape[1]):
+            return None
+        if kind == APPROACH and max_distance is not None and dmap[y, x] > max_distance:
+            return None
+        return downhill(dmap, (x, y), blocked)
+
+    def stats(self) -> Dict[str, Any]:
+        """Distance field cache counters"""
+        return {"maps": len(self._maps), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,166 @@
+"""Connected-region labelling and nearest-pair region linking on tile grids"""
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+Point = Tuple[int, int]
+
+@dataclass
+class RegionMap:
+    """
+    Result of labelling a boolean mask into 4-connected regions
+
+    labels: int32 (height, width) array, 0 outside regions, ids start at 1
+    sizes: sizes[i] is the tile count of region i + 1
+    representatives: first (x, y) of each region in row-major scan order
+    """
+    labels: np.ndarray
+    sizes: np.ndarray
+    representatives: List[Point]
+
+    @property
+    def count(self) -> int:
+        return len(self.representatives)
+
+def label_regions(mask: np.ndarray) -> RegionMap:
+    """
+    Label 4-connected regions of ``mask`` with scanline union-find
+
+    Each row is split into horizontal runs; runs that overlap a run in the
+    next row are unioned, so the work is proportional to the number of
+    runs rather than the number of tiles.
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+
+    num_runs = len(run_rows)
+    row_bounds = np.searchsorted(run_rows, np.arange(height + 1)).tolist()
+    starts, ends = run_starts.tolist(), run_ends.tolist()
+    parent = list(range(num_runs))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for row in range(height - 1):
+        i, i_end = row_bounds[row], row_bounds[row + 1]
+        j, j_end = row_bounds[row + 1], row_bounds[row + 2]
+        while i < i_end and j < j_end:
+            if starts[i] < ends[j] and starts[j] < ends[i]:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+            if ends[i] < ends[j]:
+                i += 1
+            else:
+                j += 1
+
+    # Number regions in order of first appearance so labels are deterministic
+    ids = {}
+    run_labels = np.empty(num_runs, dtype=np.int32)
+    for run in range(num_runs):
+        run_labels[run] = ids.setdefault(find(run), len(ids) + 1)
+
+    labels = np.zeros((height, width), dtype=np.int32)
+    labels[mask] = np.repeat(run_labels, run_ends - run_starts)
+    sizes = np.bincount(labels.ravel(), minlength=len(ids) + 1)[1:]
+
+    _, first_runs = np.unique(run_labels, return_index=True)
+    representatives = list(zip(run_starts[first_runs].tolist(), run_rows[first_runs].tolist()))
+    return RegionMap(labels=labels, sizes=sizes, representatives=representatives)
+
+def _nearest_region_tile(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Manhattan nearest-tile transform: for every cell, the (x, y) of the
+    closest ``mask`` tile, computed with a row pass and two column sweeps
+    """
+    height, width = mask.shape
+    far = 2 * (width + height)
+    cols = np.arange(width)
+
+    # Nearest tile within each row (to the left or right)
+    left = np.maximum.accumulate(np.where(mask, cols, -far), axis=1)
+    right = np.minimum.accumulate(np.where(mask, cols, far)[:, ::-1], axis=1)[:, ::-1]
+    use_left = (cols - left) <= (right - cols)
+    dist = np.where(use_left, cols - left, right - cols)
+    src_x = np.where(use_left, left, right)
+    src_y = np.repeat(np.arange(height)[:, None], width, axis=1)
+
+    # Propagate down then up the columns, one step costing one tile
+    sweeps = [(y - 1, y) for y in range(1, height)]
+    sweeps += [(y + 1, y) for y in range(height - 2, -1, -1)]
+    for prev, y in sweeps:
+        candidate = dist[prev] + 1
+        better = candidate < dist[y]
+        dist[y] = np.where(better, candidate, dist[y])
+        src_x[y] = np.where(better, src_x[prev], src_x[y])
+        src_y[y] = np.where(better, src_y[prev], src_y[y])
+
+    return src_x, src_y
+
+def region_links(region_map: RegionMap) -> List[Tuple[Point, Point]]:
+    """
+    Pick corridor endpoints that join every region with short corridors
+
+    Every cell is assigned its nearest region tile; wherever two
+    neighbouring cells belong to different regions, the pair of tiles they
+    point at is a candidate link. The shortest candidate per region pair
+    feeds a minimum spanning tree, returned as (point_a, point_b) pairs.
+    """
+    if region_map.count <= 1:
+        return []
+
+    labels = region_map.labels
+    src_x, src_y = _nearest_region_tile(labels > 0)
+    owner = labels[src_y, src_x]
+
+    ends_a, ends_b = [], []
+    for a, b in (
+        (np.s_[:, :-1], np.s_[:, 1:]),
+        (np.s_[:-1, :], np.s_[1:, :]),
+    ):
+        boundary = owner[a] != owner[b]
+        ends_a.append((owner[a][boundary], src_x[a][boundary], src_y[a][boundary]))
+        ends_b.append((owner[b][boundary], src_x[b][boundary], src_y[b][boundary]))
+    la, ax, ay = (np.concatenate(parts) for parts in zip(*ends_a))
+    lb, bx, by = (np.concatenate(parts) for parts in zip(*ends_b))
+
+    # Orient every candidate so la < lb, then keep the cheapest per pair
+    swap = la > lb
+    la, lb = np.where(swap, lb, la), np.where(swap, la, lb)
+    ax, bx = np.where(swap, bx, ax), np.where(swap, ax, bx)
+    ay, by = np.where(swap, by, ay), np.where(swap, ay, by)
+    cost = np.abs(ax - bx) + np.abs(ay - by)
+
+    order = np.lexsort((cost, lb, la))
+    pair_keys = la[order].astype(np.int64) * (region_map.count + 1) + lb[order]
+    _, first = np.unique(pair_keys, return_index=True)
+    best = order[first]
+    best = best[np.lexsort((lb[best], la[best], cost[best]))]
+
+    # Kruskal over region pairs
+    parent = list(range(region_map.count + 1))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    links = []
+    for k in best.tolist():
+        root_a, root_b = find(int(la[k])), find(int(lb[k]))
+        if root_a == root_b:
+            continue
+        parent[root_b] = root_a
+        links.append(((int(ax[k]), int(ay[k])), (int(bx[k]), int(by[k]))))
+        if len(links) == region_map.count - 1:
+            break
+    return links
@@ -0,0 +1,125 @@
+"""Room geometry, occupancy index and BSP partitioning"""
+import random
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+class Room:
+    def __init__(self, x: int, y: int, width: int, height: int):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.center = (x + width // 2, y + height // 2)
+
+    def intersects(self, other: 'Room') -> bool:
+        """Check if this room intersects another (with 1-tile buffer)"""
+        return (
+            self.x <= other.x + other.width + 1 and
+            self.x + self.width + 1 >= other.x and
+            self.y <= other.y + other.height + 1 and
+            self.y + self.height + 1 >= other.y
+        )
+
+class PlacementIndex:
+    """
+    Occupancy grid of placed rooms answering overlap queries
+
+    Each placed room marks its footprint grown by the 1-tile buffer, so
+    ``is_free`` is equivalent to checking ``Room.intersects`` against
+    every placed room. Both ``add`` and ``is_free`` touch only the room's
+    own rectangle: cost scales with room area, not with map size or how
+    many rooms exist.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.blocked = np.zeros((height, width), dtype=bool)
+
+    def add(self, room: Room):
+        """Mark a placed room (and its buffer) as occupied"""
+        y0, x0 = max(room.y - 1, 0), max(room.x - 1, 0)
+        self.blocked[y0:room.y + room.height + 2, x0:room.x + room.width + 2] = True
+
+    def is_free(self, room: Room) -> bool:
+        """True if ``room`` would not intersect any placed room"""
+        y0, x0 = max(room.y, 0), max(room.x, 0)
+        y1 = min(room.y + room.height, self.height - 1) + 1
+        x1 = min(room.x + room.width, self.width - 1) + 1
+        return not self.blocked[y0:y1, x0:x1].any()
+
+class BSPNode:
+    """Rectangle in a binary space partition; leaves hold at most one room"""
+
+    def __init__(self, x: int, y: int, width: int, height: int):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.left: Optional['BSPNode'] = None
+        self.right: Optional['BSPNode'] = None
+        self.room: Optional[Room] = None
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.left is None
+
+    def split(self, min_size: int, rng=random) -> bool:
+        """Split into two children; returns False if too small to split"""
+        # Split across the longer side, otherwise pick at random
+        if self.width > self.height * 1.25:
+            horizontal = False
+        elif self.height > self.width * 1.25:
+            horizontal = True
+        else:
+            horizontal = rng.random() < 0.5
+
+        # Fall back to the other axis if the preferred one is too short
+        for horizontal in (horizontal, not horizontal):
+            span = self.height if horizontal else self.width
+            if span >= 2 * min_size:
+                break
+        else:
+            return False
+
+        cut = rng.randint(min_size, span - min_size)
+        if horizontal:
+            self.left = BSPNode(self.x, self.y, self.width, cut)
+            self.right = BSPNode(self.x, self.y + cut, self.width, self.height - cut)
+        else:
+            self.left = BSPNode(self.x, self.y, cut, self.height)
+            self.right = BSPNode(self.x + cut, self.y, self.width - cut, self.height)
+        return True
+
+    def leaves(self) -> Iterator['BSPNode']:
+        """Leaves in left-to-right order"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                yield node
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+
+    def any_room(self) -> Optional[Room]:
+        """First room found in this subtree"""
+        for leaf in self.leaves():
+            if leaf.room:
+                return leaf.room
+        return None
+
+def bsp_partition(x: int, y: int, width: int, height: int,
+                  min_leaf: int, max_leaf: int, rng=random) -> BSPNode:
+    """Partition a rectangle until every leaf is at most ``max_leaf`` on each side"""
+    root = BSPNode(x, y, width, height)
+    pending: List[BSPNode] = [root]
+    while pending:
+        node = pending.pop()
+        if node.width <= max_leaf and node.height <= max_leaf:
+            continue
+        if node.split(min_leaf, rng):
+            pending.append(node.left)
+            pending.append(node.right)
+    return root
@@ -0,0 +1,68 @@
+"""Compact uint8 tile grid and conversion to/from character maps"""
+from enum import Enum, IntEnum
+from typing import List
+
+import numpy as np
+
+class TileType(Enum):
+    WALL = "#"
+    FLOOR = "."
+    DOOR = "+"
+    STAIRS_DOWN = ">"
+    STAIRS_UP = "<"
+    WATER = "~"
+    LAVA = "^"
+    CHEST = "C"
+
+    @property
+    def code(self) -> "TileCode":
+        """uint8 code used for this tile in a tile grid"""
+        return TileCode[self.name]
+
+class TileCode(IntEnum):
+    """uint8 tile codes, one per TileType (same member names)"""
+    WALL = 0
+    FLOOR = 1
+    DOOR = 2
+    STAIRS_DOWN = 3
+    STAIRS_UP = 4
+    WATER = 5
+    LAVA = 6
+    CHEST = 7
+
+TILE_DTYPE = np.uint8
+
+# code -> character, indexed by TileCode
+CODE_TO_CHAR = np.array([TileType[code.name].value for code in TileCode])
+
+# byte -> code lookup table; 255 marks characters that are not tiles
+_UNKNOWN = 255
+_CHAR_TO_CODE = np.full(256, _UNKNOWN, dtype=TILE_DTYPE)
+for _code in TileCode:
+    _CHAR_TO_CODE[ord(TileType[_code.name].value)] = _code
+
+def new_grid(width: int, height: int, fill: TileCode = TileCode.WALL) -> np.ndarray:
+    """Create a (height, width) tile grid filled with a single tile"""
+    return np.full((height, width), fill, dtype=TILE_DTYPE)
+
+def grid_to_rows(grid: np.ndarray) -> List[List[str]]:
+    """Convert a tile grid to the legacy List[List[str]] map"""
+    return CODE_TO_CHAR[grid].tolist()
+
+def rows_to_grid(rows: List[List[str]]) -> np.ndarray:
+    """Convert a legacy List[List[str]] map to a tile grid"""
+    if not rows:
+        return new_grid(0, 0)
+
+    width = len(rows[0])
+    try:
+        raw = "".join("".join(row) for row in rows).encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError("Map contains non-ASCII tiles")
+    if len(raw) != width * len(rows):
+        raise ValueError("Map rows must be single characters of equal length")
+
+    grid = _CHAR_TO_CODE[np.frombuffer(raw, dtype=np.uint8)].reshape(len(rows), width)
+    if (grid == _UNKNOWN).any():
+        raise ValueError("Map contains unknown tile characters")
+    return grid
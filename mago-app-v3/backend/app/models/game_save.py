@@ -0,0 +1,21 @@
+"""Persisted game state, one row per user"""
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+class GameSave(Base):
+    """Latest saved game state for a user"""
+    __tablename__ = "game_saves"
+    
+    user_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    state: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
@@ -0,0 +1,117 @@
+"""
+Offline batch generation of quests into the content library
+
+Runs HybridLLMService.generate (the _build_prompt quest template) through
+a pool of concurrent workers against Ollama (or --stub, a local
+generator for development), writing results in batches to the SQLite
+library that the running service samples before generating live.
+Quests only: _build_prompt has no entity template in this app (entities
+are batch generated by mago-app-v2).
+
+Run from mago-app-v3/backend:
+    python -m app.services.batch_generate --count 2000 --workers 8
+    python -m app.services.batch_generate --count 500 --stub --out /tmp/library.db
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.content_library import ContentLibrary
+from app.services.llm_service import HybridLLMService
+
+logger = logging.getLogger(__name__)
+
+THEMES = ["dark", "dungeon", "cave", "fortress"]
+FLUSH_EVERY = 100
+
+_STUB_VERBS = ["Recover", "Destroy", "Escort", "Investigate", "Cleanse"]
+_STUB_OBJECTS = ["the Sunken Idol", "the Bone Lantern", "a Lost Cartographer", "the Whispering Well", "the Ember Seal"]
+
+def _stub_quest(context: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """Quest-shaped JSON without a model, for development and load tests"""
+    level = context["player_level"]
+    title = f"{rng.choice(_STUB_VERBS)} {rng.choice(_STUB_OBJECTS)}"
+    return {
+        "title": title,
+        "description": f"{title} in the {context['dungeon_theme']} depths.",
+        "objectives": [f"Reach floor {level + rng.randint(0, 2)}", rng.choice(["Defeat the guardian", "Return alive"])],
+        "rewards": {"experience": 50 * level, "gold": 20 * level + rng.randint(0, 30)},
+        "difficulty": rng.choice(["easy", "medium", "hard"]),
+    }
+
+async def _worker(service: HybridLLMService, jobs: "asyncio.Queue[Optional[Dict[str, Any]]]",
+                  results: List[Tuple], stub: bool, rng: random.Random):
+    while True:
+        context = await jobs.get()
+        if context is None:
+            return
+        if stub:
+            quest = _stub_quest(context, rng)
+        else:
+            quest = await service.generate(context)
+            if quest is None:
+                logger.warning("Skipping failed generation")
+                continue
+        results.append(("quest", "quest", context["dungeon_theme"], context["player_level"], quest))
+
+async def generate(library: ContentLibrary, count: int, themes: List[str], max_level: int,
+                   workers: int, stub: bool, seed: Optional[int] = None, host: str = None) -> int:
+    """Generate ``count`` quests over themes x levels 1..max_level; returns rows written"""
+    rng = random.Random(seed)
+    service = HybridLLMService(host=host, max_concurrency=workers)
+    if not stub and not await service.check_ollama():
+        raise SystemExit(f"Ollama not reachable at {service.host}")
+
+    jobs: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    for _ in range(count):
+        jobs.put_nowait({
+            "type": "generate_quest",
+            "player_level": rng.randint(1, max_level),
+            "dungeon_theme": rng.choice(themes),
+        })
+    for _ in range(workers):
+        jobs.put_nowait(None)
+
+    results: List[Tuple] = []
+    written = 0
+    tasks = [asyncio.create_task(_worker(service, jobs, results, stub, rng)) for _ in range(workers)]
+    try:
+        while not all(task.done() for task in tasks):
+            await asyncio.sleep(0.5)
+            if len(results) >= FLUSH_EVERY:
+                batch, results[:] = results[:], []
+                written += library.add_many(batch)
+                logger.info(f"{written}/{count} written")
+        for task in tasks:
+            task.result()
+        written += library.add_many(results)
+    finally:
+        await service.close()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--themes", nargs="+", default=THEMES)
+    parser.add_argument("--max-level", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=settings.OLLAMA_MAX_CONCURRENCY)
+    parser.add_argument("--out", default=settings.CONTENT_LIBRARY_PATH)
+    parser.add_argument("--host", default=settings.OLLAMA_HOST, help="Ollama host")
+    parser.add_argument("--stub", action="store_true", help="generate locally without Ollama")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    library = ContentLibrary(args.out)
+    start = time.perf_counter()
+    written = asyncio.run(generate(library, args.count, args.themes, args.max_level, args.workers,
+                                   args.stub, args.seed, args.host))
+    logger.info(f"Wrote {written} quests to {args.out} in {time.perf_counter() - start:.1f}s: {library.counts()}")
+    library.close()
+
+if __name__ == "__main__":
+    main()
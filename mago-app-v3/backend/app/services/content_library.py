@@ -0,0 +1,115 @@
+"""Pre-generated content library (SQLite) written by batch_generate"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    type TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS content_lookup ON content (kind, type, theme, level);
+"""
+
+class ContentLibrary:
+    """
+    Indexed on-disk library of generated entities and quests
+
+    Rows are (kind, type, theme, level, body) where body is the JSON the
+    model produced. Lookups pick a random row for a level range, so a
+    library built with one level band size works with any other. A
+    missing file is an empty library; it is only created when writing.
+    Row counts per bucket are cached for ``count_ttl`` seconds, so rows
+    added by another process (a batch_generate run) show up without a
+    restart.
+    """
+
+    def __init__(self, path: str, count_ttl: float = 60.0):
+        self.path = path
+        self.count_ttl = count_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        # (count, expires) per bucket; re-read after count_ttl or a failed lookup
+        self._counts: Dict[Tuple, Tuple[int, float]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        if self._conn is None and (create or os.path.exists(self.path)):
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def add_many(self, rows: Iterable[Tuple[str, str, str, int, Dict[str, Any]]]) -> int:
+        """Insert (kind, type, theme, level, body) rows; returns the number added"""
+        conn = self._connect(create=True)
+        rows = [(kind, type_, theme, level, json.dumps(body)) for kind, type_, theme, level, body in rows]
+        with conn:
+            conn.executemany(
+                "INSERT INTO content (kind, type, theme, level, body) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        self._counts.clear()
+        return len(rows)
+
+    def sample(self, kind: str, type_: str, theme: str, min_level: int, max_level: int) -> Optional[Dict[str, Any]]:
+        """A random stored item matching the bucket, or None"""
+        conn = self._connect()
+        if conn is None:
+            self.misses += 1
+            return None
+
+        where = "kind = ? AND type = ? AND theme = ? AND level BETWEEN ? AND ?"
+        params = (kind, type_, theme, min_level, max_level)
+        try:
+            now = time.monotonic()
+            cached = self._counts.get(params)
+            if cached is None or cached[1] <= now:
+                count = conn.execute(f"SELECT COUNT(*) FROM content WHERE {where}", params).fetchone()[0]
+                self._counts[params] = (count, now + self.count_ttl)
+            else:
+                count = cached[0]
+            if not count:
+                self.misses += 1
+                return None
+            row = conn.execute(
+                f"SELECT body FROM content WHERE {where} LIMIT 1 OFFSET ?", params + (random.randrange(count),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Content library error: {e}")
+            self.misses += 1
+            return None
+
+        if row is None:
+            # Rows went away since counting
+            self._counts.pop(params, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def counts(self) -> Dict[str, int]:
+        """Stored items per kind:type"""
+        conn = self._connect()
+        if conn is None:
+            return {}
+        rows = conn.execute("SELECT kind, type, COUNT(*) FROM content GROUP BY kind, type")
+        return {f"{kind}:{type_}": n for kind, type_, n in rows}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Library hit/miss counters"""
+        return {"hits": self.hits, "misses": self.misses}
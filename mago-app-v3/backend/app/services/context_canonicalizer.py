@@ -0,0 +1,94 @@
+"""Translation- and symmetry-normalized LLM contexts for cache keys"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# The 8 symmetries of the square as (a, b, c, d): (x, y) -> (a*x + b*y, c*x + d*y)
+SYMMETRIES: List[Tuple[int, int, int, int]] = [
+    (1, 0, 0, 1),    # identity
+    (0, -1, 1, 0),   # rotate 90
+    (-1, 0, 0, -1),  # rotate 180
+    (0, 1, -1, 0),   # rotate 270
+    (-1, 0, 0, 1),   # mirror x
+    (1, 0, 0, -1),   # mirror y
+    (0, 1, 1, 0),    # transpose
+    (0, -1, -1, 0),  # anti-transpose
+]
+IDENTITY = 0
+
+# Tile classes the window is quantized to; unlisted tiles count as floor
+TILE_CLASSES = {"#": "#", "~": "~", "^": "~"}
+
+def _apply(transform: int, x: int, y: int) -> Tuple[int, int]:
+    a, b, c, d = SYMMETRIES[transform]
+    return a * x + b * y, c * x + d * y
+
+def _apply_inverse(transform: int, x: int, y: int) -> Tuple[int, int]:
+    # Orthogonal matrices: the inverse is the transpose
+    a, b, c, d = SYMMETRIES[transform]
+    return a * x + c * y, b * x + d * y
+
+def local_window(grid: Optional[Sequence[Sequence[str]]], center: Sequence[int], radius: int) -> List[List[str]]:
+    """Quantized (2r+1)^2 tile window around center; off-map counts as wall"""
+    cx, cy = center
+    window = []
+    for y in range(cy - radius, cy + radius + 1):
+        row = []
+        for x in range(cx - radius, cx + radius + 1):
+            inside = grid is not None and 0 <= y < len(grid) and 0 <= x < len(grid[y])
+            row.append(TILE_CLASSES.get(grid[y][x], ".") if inside else "#")
+        window.append(row)
+    return window
+
+def _transform_window(window: List[List[str]], transform: int) -> List[str]:
+    radius = len(window) // 2
+    out = [[""] * len(window) for _ in window]
+    for y, row in enumerate(window):
+        for x, tile in enumerate(row):
+            tx, ty = _apply(transform, x - radius, y - radius)
+            out[ty + radius][tx + radius] = tile
+    return ["".join(row) for row in out]
+
+def canonicalize(context: Dict[str, Any], radius: int = 3) -> Tuple[Dict[str, Any], int]:
+    """
+    Rewrite an enemy context relative to the enemy, in canonical orientation
+
+    ``enemy_pos``/``player_pos`` become the player's offset and ``dungeon``
+    a quantized tile window around the enemy; of the 8 rotations and
+    reflections the lexicographically smallest is kept. Returns the
+    canonical context and the transform index that produced it. Contexts
+    without both positions are returned unchanged with IDENTITY.
+    """
+    enemy_pos, player_pos = context.get("enemy_pos"), context.get("player_pos")
+    if enemy_pos is None or player_pos is None:
+        return context, IDENTITY
+
+    offset = (player_pos[0] - enemy_pos[0], player_pos[1] - enemy_pos[1])
+    window = local_window(context.get("dungeon"), enemy_pos, radius)
+
+    best: Optional[Tuple[Tuple[int, int], List[str]]] = None
+    best_transform = IDENTITY
+    for transform in range(len(SYMMETRIES)):
+        candidate = (_apply(transform, *offset), _transform_window(window, transform))
+        if best is None or candidate < best:
+            best, best_transform = candidate, transform
+
+    canonical = {k: v for k, v in context.items() if k not in ("enemy_pos", "player_pos", "dungeon", "map_version")}
+    canonical["offset"] = list(best[0])
+    canonical["window"] = best[1]
+    return canonical, best_transform
+
+def _has_step(decision: Dict[str, Any]) -> bool:
+    return isinstance(decision.get("dx"), int) and isinstance(decision.get("dy"), int)
+
+def to_canonical(decision: Dict[str, Any], transform: int) -> Dict[str, Any]:
+    """Rotate a world-frame decision's (dx, dy) into the canonical frame"""
+    if transform == IDENTITY or not _has_step(decision):
+        return dict(decision)
+    dx, dy = _apply(transform, decision["dx"], decision["dy"])
+    return dict(decision, dx=dx, dy=dy)
+
+def to_world(decision: Dict[str, Any], transform: int) -> Dict[str, Any]:
+    """Map a canonical-frame decision's (dx, dy) back to world coordinates"""
+    if transform == IDENTITY or not _has_step(decision):
+        return dict(decision)
+    dx, dy = _apply_inverse(transform, decision["dx"], decision["dy"])
+    return dict(decision, dx=dx, dy=dy)
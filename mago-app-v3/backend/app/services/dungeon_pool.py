@@ -0,0 +1,172 @@
+"""Pool of pre-generated dungeon levels, refilled in background processes"""
+import asyncio
+import base64
+import logging
+import os
+import random
+import time
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.game_engine.dungeon_generator import DungeonGenerator
+from app.game_engine.tile_grid import TILE_DTYPE, grid_to_rows
+
+logger = logging.getLogger(__name__)
+
+# (theme, level, width, height)
+Bucket = Tuple[str, int, int, int]
+
+# Upper bound on one refill; a worker that dies mid-refill frees the bucket after this
+REFILL_LOCK_TTL = 120
+
+def _generate_level(theme: str, level: int, width: int, height: int, seed: int) -> Dict[str, Any]:
+    """Generate one level and pack it for storage (runs in a worker process)"""
+    generator = DungeonGenerator(width, height, seed=seed)
+    generator.generate(level=level, theme=theme)
+    return {
+        "seed": generator.seed,
+        "width": width,
+        "height": height,
+        "spawn_point": list(generator.get_spawn_point()),
+        "tiles": base64.b64encode(zlib.compress(generator.grid.tobytes())).decode("ascii"),
+    }
+
+def _unpack_level(packed: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand a packed level into the dungeon map callers expect"""
+    raw = zlib.decompress(base64.b64decode(packed["tiles"]))
+    grid = np.frombuffer(raw, dtype=TILE_DTYPE).reshape(packed["height"], packed["width"])
+    return {
+        "seed": packed["seed"],
+        "dungeon": grid_to_rows(grid),
+        "spawn_point": tuple(packed["spawn_point"]),
+    }
+
+class DungeonPool:
+    """
+    Keeps ready-made levels per (theme, level, size) bucket in Redis
+
+    Levels are stored as zlib-compressed uint8 tile grids. ``acquire`` pops
+    one (a hit) or generates it on the spot (a miss), then tops the bucket
+    back up to ``size`` from a process pool without blocking the caller.
+    Across workers one refill per bucket runs at a time (a Redis NX lock),
+    and pushes are capped at ``size`` atomically, so a bucket never holds
+    more than ``size`` levels.
+    """
+
+    def __init__(self, size: int = None, workers: int = None):
+        self.size = size if size is not None else settings.DUNGEON_POOL_SIZE
+        self.workers = workers or settings.DUNGEON_POOL_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._refilling: Set[Bucket] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_latency_total = 0.0
+        self.refill_latency_max = 0.0
+
+    def _key(self, bucket: Bucket) -> str:
+        theme, level, width, height = bucket
+        return f"dungeon:pool:{theme}:{level}:{width}x{height}"
+
+    def _bucket(self, theme: str, level: int, width: int = None, height: int = None) -> Bucket:
+        return (theme, level, width or settings.DUNGEON_WIDTH, height or settings.DUNGEON_HEIGHT)
+
+    async def _generate(self, bucket: Bucket) -> Dict[str, Any]:
+        """Generate a packed level in the process pool"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        seed = random.randint(1, 999999)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _generate_level, *bucket, seed)
+
+    async def acquire(self, theme: str, level: int, width: int = None, height: int = None) -> Dict[str, Any]:
+        """
+        Get a level for (theme, level, size)
+
+        Returns {"seed", "dungeon": List[List[str]], "spawn_point"}.
+        """
+        bucket = self._bucket(theme, level, width, height)
+        packed = await redis_client.rpop(self._key(bucket))
+
+        if packed:
+            self.hits += 1
+        else:
+            self.misses += 1
+            logger.debug(f"Dungeon pool miss for {bucket}")
+            packed = await self._generate(bucket)
+
+        self.schedule_refill(bucket)
+        return _unpack_level(packed)
+
+    def schedule_refill(self, bucket: Bucket):
+        """Top a bucket back up in the background (no-op if already running)"""
+        if bucket in self._refilling:
+            return
+        self._refilling.add(bucket)
+        task = asyncio.create_task(self._refill(bucket))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def prefill(self, theme: str, level: int, width: int = None, height: int = None):
+        """Start filling a bucket ahead of demand"""
+        self.schedule_refill(self._bucket(theme, level, width, height))
+
+    async def _refill(self, bucket: Bucket):
+        key = self._key(bucket)
+        lock_key = f"{key}:refill"
+        owner = False
+        try:
+            owner = await redis_client.set_nx(lock_key, self._worker_id, ttl=REFILL_LOCK_TTL)
+            if not owner:
+                return  # another worker is topping this bucket up
+            missing = self.size - await redis_client.llen(key)
+            if missing <= 0:
+                return
+
+            start = time.perf_counter()
+            levels = await asyncio.gather(*(self._generate(bucket) for _ in range(missing)))
+            for packed in levels:
+                if not await redis_client.lpush_capped(key, packed, self.size):
+                    break
+
+            elapsed = time.perf_counter() - start
+            self.refills += 1
+            self.refill_latency_total += elapsed
+            self.refill_latency_max = max(self.refill_latency_max, elapsed)
+        except Exception as e:
+            logger.error(f"Dungeon pool refill failed for {bucket}: {e}")
+        finally:
+            if owner:
+                await redis_client.delete_if_equals(lock_key, self._worker_id)
+            self._refilling.discard(bucket)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/refill counters"""
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "refills": self.refills,
+            "refill_latency_avg": self.refill_latency_total / self.refills if self.refills else 0.0,
+            "refill_latency_max": self.refill_latency_max,
+        }
+
+    async def close(self):
+        """Cancel pending refills and stop worker processes"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+dungeon_pool = DungeonPool()
@@ -0,0 +1,79 @@
+"""Incremental JSON parser that reports top-level fields as they complete"""
+import json
+from typing import Any, Dict, Optional
+
+class IncrementalJSONParser:
+    """
+    Feed streamed text of a JSON object; get back fields once complete
+
+    Only the outermost object is tracked: a member counts as complete when
+    the ``,`` or ``}`` that ends it arrives at depth 1, so nested values are
+    emitted whole. Text before the opening ``{`` is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+
+    def feed(self, text: str) -> Dict[str, Any]:
+        """Add text; returns fields completed by it"""
+        self.buffer += text
+        completed: Dict[str, Any] = {}
+
+        while self._pos < len(self.buffer) and not self.done:
+            ch = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1 and ch == "{":
+                    self._member_start = self._pos + 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    self._complete_member(completed)
+                    self.done = True
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._complete_member(completed)
+                self._member_start = self._pos + 1
+            self._pos += 1
+
+        return completed
+
+    def _complete_member(self, completed: Dict[str, Any]):
+        if self._member_start is None:
+            return
+        member = self.buffer[self._member_start:self._pos].strip()
+        if not member:
+            return
+        try:
+            field = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            return
+        completed.update(field)
+        self.fields.update(field)
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Full parsed object, or the fields seen so far if it never closed"""
+        start = self.buffer.find("{")
+        if start >= 0:
+            try:
+                value = json.loads(self.buffer[start:self._pos] if self.done else self.buffer[start:])
+                if isinstance(value, dict):
+                    return value
+            except json.JSONDecodeError:
+                pass
+        return dict(self.fields) or None
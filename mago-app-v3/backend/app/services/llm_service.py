@@ -1,12 +1,22 @@
 """Hybrid LLM service - routes between local and remote models"""
 import asyncio
+import json
 import logging
-from typing import Dict, Any, Optional
+import os
+import uuid
+from typing import Dict, Any, Optional, Callable, Awaitable
 from enum import Enum
-import ollama
+import httpx
 
 from app.core.config import settings
+from app.core.local_cache import TieredCache
 from app.core.redis_client import redis_client
+from app.game_engine.pathfinding import APPROACH, FLEE, RANGED, DijkstraCache
+from app.services.content_library import ContentLibrary
+from app.services.context_canonicalizer import canonicalize, to_canonical, to_world
+from app.services.json_stream import IncrementalJSONParser
+from app.services.tactical_solver import TacticalSolver
+from app.services.variant_pool import VariantPool, band_levels, level_band
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +26,16 @@ class DecisionComplexity(Enum):
     MODERATE = "moderate"  # Tactical combat, simple dialogue
     COMPLEX = "complex"    # Quest generation, story, complex reasoning
 
+# Decision types the tactical pre-solver may answer without a model
+TACTICAL_TYPES = {"enemy_movement", "basic_attack"}
+
+# Generated content served from per-(level band, theme) variant pools,
+# mapped to its kind in the pre-generated content library
+CONTENT_TYPES = {"generate_quest": "quest"}
+
+# Seconds a pending marker outlives its last refresh (the leader refreshes it while it works)
+PENDING_MARKER_TTL = 10
+
 class HybridLLMService:
     """
     Intelligent LLM routing service
@@ -23,21 +43,127 @@ class HybridLLMService:
     Routes decisions to:
     - Client WebLLM: Simple, latency-sensitive decisions
     - Server Ollama: Complex reasoning, content generation
-    - Redis Cache: Previously seen scenarios
+    - Cache: Previously seen scenarios (per-worker L1 in front of Redis)
+    
+    Ollama is called through one pooled httpx.AsyncClient, with a per-call
+    timeout and at most ``max_concurrency`` (OLLAMA_MAX_CONCURRENCY)
+    requests in flight, so
+    inference never blocks the event loop.
+    
+    Identical requests are coalesced (single-flight): callers in this
+    worker share one in-flight task, and other workers see a short-lived
+    Redis pending marker and wait for the leader's cached result.
+    
+    Cache keys hash a position-relative, rotation/reflection-normalized
+    form of the context, so the same local situation anywhere on the map
+    shares one entry; cached moves are mapped back to world coordinates.
+    
+    Quests are served from a small pool of variants per (level band,
+    theme), refilled in the background, rather than generated per request.
+    Pools draw from the pre-generated content library (batch_generate)
+    first and only ask the model on a library miss.
+    
+    Enemy moves with an obvious answer (adjacent, clear path, out of sight)
+    are resolved by a rule-based TacticalSolver before any of the above.
     """
     
-    def __init__(self):
+    def __init__(self, host: str = None, max_concurrency: int = None):
+        self.host = host or settings.OLLAMA_HOST
+        self.max_concurrency = max_concurrency or settings.OLLAMA_MAX_CONCURRENCY
         self.ollama_available = True
-        self._check_ollama()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pull: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Unique per process, also across hosts: owner value of pending markers
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.paths = DijkstraCache(settings.PATH_CACHE_ENTRIES)
+        self.solver = TacticalSolver(settings.TACTICAL_SIGHT_RADIUS, self.paths)
+        self.library = ContentLibrary(settings.CONTENT_LIBRARY_PATH, settings.CONTENT_LIBRARY_COUNT_TTL)
+        self.content_pool = VariantPool(
+            self._generate_content,
+            variants=settings.CONTENT_POOL_VARIANTS,
+            max_uses=settings.CONTENT_POOL_MAX_USES,
+            max_buckets=settings.CONTENT_POOL_MAX_BUCKETS,
+        )
+        
+        self.coalesced_local = 0
+        self.coalesced_remote = 0
+        self.cache = TieredCache(
+            redis_client,
+            channel="llm:decision:invalidate",
+            enabled=settings.ENABLE_LLM_L1_CACHE,
+            max_entries=settings.LLM_L1_MAX_ENTRIES,
+            max_bytes=settings.LLM_L1_MAX_BYTES,
+            ttl=settings.LLM_L1_TTL,
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for ``host``"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=httpx.Timeout(settings.OLLAMA_TIMEOUT, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
     
-    def _check_ollama(self):
-        """Check if Ollama is available"""
+    async def check_ollama(self, pull_model: bool = False) -> bool:
+        """
+        Check if Ollama is available, optionally pulling the configured model
+        
+        A missing model is pulled in the background (bounded by
+        OLLAMA_PULL_TIMEOUT); until it lands Ollama counts as unavailable
+        and decisions use the fallbacks, so startup doesn't wait on it.
+        """
         try:
-            ollama.list()
+            response = await self.client.get("/api/tags")
+            response.raise_for_status()
+            models = [m["name"] for m in response.json().get("models", [])]
+            
+            if pull_model and settings.OLLAMA_MODEL not in models:
+                self.ollama_available = False
+                if self._pull is None or self._pull.done():
+                    self._pull = asyncio.create_task(self._pull_model())
+                return False
+            
             logger.info("Ollama service available")
+            self.ollama_available = True
         except Exception as e:
             logger.warning(f"Ollama unavailable: {e}")
             self.ollama_available = False
+        return self.ollama_available
+    
+    async def _pull_model(self):
+        logger.info(f"Pulling Ollama model {settings.OLLAMA_MODEL} in the background...")
+        try:
+            response = await self.client.post(
+                "/api/pull",
+                json={"model": settings.OLLAMA_MODEL, "stream": False},
+                timeout=settings.OLLAMA_PULL_TIMEOUT,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Ollama model pull failed: {e}")
+            return
+        logger.info("Ollama model pulled; service available")
+        self.ollama_available = True
+    
+    async def close(self):
+        """Close pooled Ollama connections, the cache listener, pool refills and a running pull"""
+        if self._pull is not None:
+            self._pull.cancel()
+            await asyncio.gather(self._pull, return_exceptions=True)
+        await self.content_pool.close()
+        self.library.close()
+        await self.cache.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     def classify_decision(self, context: Dict[str, Any]) -> DecisionComplexity:
         """
@@ -61,22 +187,154 @@ class HybridLLMService:
         Get AI decision with intelligent routing
         
         Flow:
+        0. Resolve obvious enemy moves with the tactical pre-solver, and
+           serve generated content from its variant pool
         1. Check cache
-        2. Classify complexity
-        3. Route to appropriate model
-        4. Cache result
+        2. Join an identical in-flight request (this worker or another)
+        3. Classify complexity
+        4. Route to appropriate model
+        5. Cache result
+        
+        Enemy contexts may carry ``map_version`` (unique per map state, bumped
+        on tile changes) so path lookups don't rehash the dungeon.
         """
-        # Generate cache key
-        cache_key = self._generate_cache_key(context)
+        if settings.ENABLE_TACTICAL_SOLVER:
+            decision = self._presolve(context)
+            if decision is not None:
+                return decision
+        
+        if context.get("type") in CONTENT_TYPES:
+            # The pool already asked the model; don't ask it again for the same content
+            variant = await self.content_pool.get(self._content_key(context), context)
+            return variant if variant is not None else self._get_fallback_decision(context)
+        
+        # Generate cache key from the canonical form
+        canonical, transform = canonicalize(context, settings.LLM_CACHE_WINDOW)
+        cache_key = self._generate_cache_key(canonical)
         
         # Check cache
         if settings.ENABLE_LLM_CACHE:
-            cached = await redis_client.get(cache_key)
+            cached = await self.cache.get(cache_key)
             if cached:
                 logger.debug(f"Cache hit for {cache_key}")
-                return cached
+                return self._localize(cached, transform, context)
         
-        # Classify and route
+        # Join an identical in-flight request in this worker if there is one
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._decide_once(context, cache_key, transform))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(cache_key, done))
+        else:
+            self.coalesced_local += 1
+        
+        # Shield so one caller cancelling does not cancel it for the others
+        return self._localize(await asyncio.shield(task), transform, context)
+    
+    def _localize(self, decision: Dict[str, Any], transform: int, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a canonical-frame decision back to this caller's world frame"""
+        decision = to_world(decision, transform)
+        if "context" in decision:
+            decision["context"] = context
+        return decision
+    
+    def _presolve(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Rule-based decision for an obvious enemy move, or None"""
+        if context.get("type") not in TACTICAL_TYPES:
+            return None
+        enemy_pos, player_pos = context.get("enemy_pos"), context.get("player_pos")
+        if enemy_pos is None or player_pos is None:
+            return None
+        decision = self.solver.solve(enemy_pos, player_pos, context.get("dungeon"), context.get("map_version"))
+        if decision is not None:
+            decision["route"] = "rules"
+        return decision
+    
+    def _content_key(self, context: Dict[str, Any]) -> tuple:
+        """Variant pool bucket: (type, level band, theme)"""
+        return (
+            context.get("type"),
+            level_band(context.get("player_level", 1), settings.CONTENT_LEVEL_BAND),
+            context.get("dungeon_theme", "dark"),
+        )
+    
+    def _from_library(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Pre-generated content for the context's bucket, if the library has any"""
+        kind = CONTENT_TYPES[context["type"]]
+        _, band, theme = self._content_key(context)
+        min_level, max_level = band_levels(band, settings.CONTENT_LEVEL_BAND)
+        item = self.library.sample(kind, kind, theme, min_level, max_level)
+        if item is not None:
+            item["route"] = "library"
+        return item
+    
+    async def _generate_content(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Generate a pool variant (library first); fallbacks are not pooled"""
+        item = self._from_library(context)
+        if item is not None:
+            return item
+        decision = await self._route(context)
+        return decision if decision.get("route") == "server" else None
+    
+    def _forget_inflight(self, cache_key: str, task: asyncio.Task):
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+    
+    async def _decide_once(self, context: Dict[str, Any], cache_key: str, transform: int) -> Dict[str, Any]:
+        """
+        Route a decision unless another worker is already producing it
+        
+        The leader's pending marker is refreshed while it waits for the
+        Ollama semaphore and the model, so it outlives neither; followers
+        wait until it is gone. If the leader dies, the marker expires
+        within PENDING_MARKER_TTL.
+        
+        Returns the decision in the canonical frame of ``cache_key``.
+        """
+        if not settings.ENABLE_LLM_CACHE:
+            return to_canonical(await self._route(context), transform)
+        
+        pending_key = f"{cache_key}:pending"
+        
+        owner = await redis_client.set_nx(pending_key, self._worker_id, ttl=PENDING_MARKER_TTL)
+        if not owner:
+            decision = await self._wait_for_peer(cache_key, pending_key)
+            if decision is not None:
+                self.coalesced_remote += 1
+                return decision
+        
+        keepalive = asyncio.create_task(self._keep_pending(pending_key)) if owner else None
+        try:
+            decision = to_canonical(await self._route(context), transform)
+            # Fallback moves follow the whole map, which the cache key doesn't cover
+            if decision.get("route") != "fallback":
+                await self.cache.set(cache_key, decision, ttl=settings.LLM_CACHE_TTL)
+            return decision
+        finally:
+            # Only the owner releases the marker
+            if owner:
+                keepalive.cancel()
+                await redis_client.delete_if_equals(pending_key, self._worker_id)
+    
+    async def _keep_pending(self, pending_key: str):
+        """Refresh our pending marker's TTL until cancelled"""
+        while True:
+            await asyncio.sleep(PENDING_MARKER_TTL / 3)
+            if not await redis_client.expire_if_equals(pending_key, self._worker_id, PENDING_MARKER_TTL):
+                return
+    
+    async def _wait_for_peer(self, cache_key: str, pending_key: str) -> Optional[Dict[str, Any]]:
+        """Poll for another worker's result until its pending marker goes away"""
+        while True:
+            await asyncio.sleep(settings.LLM_PENDING_POLL_INTERVAL)
+            cached = await redis_client.get(cache_key)
+            if cached:
+                return cached
+            if not await redis_client.exists(pending_key):
+                return await redis_client.get(cache_key)
+    
+    async def _route(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify and send to the appropriate model"""
         complexity = self.classify_decision(context)
         
         if complexity == DecisionComplexity.SIMPLE:
@@ -96,39 +354,129 @@ class HybridLLMService:
             # Fallback to rule-based
             decision = self._get_fallback_decision(context)
         
-        # Cache result
-        if settings.ENABLE_LLM_CACHE:
-            await redis_client.set(cache_key, decision, ttl=settings.LLM_CACHE_TTL)
-        
         return decision
     
+    def stats(self) -> Dict[str, Any]:
+        """Cache, request coalescing, pre-solver and content pool counters"""
+        return {
+            "cache": self.cache.stats(),
+            "inflight": len(self._inflight),
+            "coalesced_local": self.coalesced_local,
+            "coalesced_remote": self.coalesced_remote,
+            "tactical": self.solver.stats(),
+            "paths": self.paths.stats(),
+            "content_pool": self.content_pool.stats(),
+            "content_library": self.library.stats(),
+        }
+    
+    async def generate(self, context: Dict[str, Any], max_tokens: int = 500) -> Optional[Dict[str, Any]]:
+        """A fresh model answer for ``context`` (no cache, pool or library), or None if the model failed"""
+        decision = await self._get_ollama_decision(context, max_tokens)
+        return decision if decision.pop("route", None) == "server" else None
+    
     async def _get_ollama_decision(self, context: Dict[str, Any], max_tokens: int = 200) -> Dict[str, Any]:
         """Get decision from Ollama"""
         prompt = self._build_prompt(context)
         
         try:
-            response = ollama.chat(
-                model=settings.OLLAMA_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a tactical AI for a roguelike game. Respond with JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                options={
-                    "temperature": 0.7,
-                    "num_predict": max_tokens,
-                }
-            )
+            async with self._semaphore:
+                response = await asyncio.wait_for(
+                    self.client.post("/api/chat", json=self._chat_payload(prompt, max_tokens, stream=False)),
+                    timeout=settings.OLLAMA_TIMEOUT,
+                )
+            response.raise_for_status()
             
             # Parse JSON response
-            import json
-            decision = json.loads(response['message']['content'])
+            decision = json.loads(response.json()['message']['content'])
             decision['route'] = 'server'
             return decision
             
+        except asyncio.TimeoutError:
+            logger.error(f"Ollama timed out after {settings.OLLAMA_TIMEOUT}s")
+            return self._get_fallback_decision(context)
         except Exception as e:
             logger.error(f"Ollama error: {e}")
             return self._get_fallback_decision(context)
     
+    def _chat_payload(self, prompt: str, max_tokens: int, stream: bool) -> Dict[str, Any]:
+        """Ollama /api/chat request body"""
+        return {
+            "model": settings.OLLAMA_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are a tactical AI for a roguelike game. Respond with JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            "stream": stream,
+            "options": {
+                "temperature": 0.7,
+                "num_predict": max_tokens,
+            }
+        }
+    
+    async def stream_decision(
+        self,
+        context: Dict[str, Any],
+        on_chunk: Callable[[Dict[str, Any]], Awaitable[None]],
+        max_tokens: int = 500,
+    ) -> Dict[str, Any]:
+        """
+        Get a decision, forwarding Ollama tokens as they are generated
+        
+        ``on_chunk`` receives {"token": str, "fields": {...}} for every
+        streamed token, where ``fields`` holds top-level JSON fields that
+        the token completed. The final result is cached like get_decision;
+        a stream that fails or ends before the JSON closes returns the
+        fallback decision and caches nothing. httpx's read timeout
+        (OLLAMA_TIMEOUT) applies between chunks.
+        """
+        is_content = context.get("type") in CONTENT_TYPES
+        if is_content:
+            variant = self.content_pool.take(self._content_key(context), context) or self._from_library(context)
+            if variant is not None:
+                return variant
+        
+        canonical, transform = canonicalize(context, settings.LLM_CACHE_WINDOW)
+        cache_key = self._generate_cache_key(canonical)
+        if settings.ENABLE_LLM_CACHE:
+            cached = await self.cache.get(cache_key)
+            if cached:
+                return self._localize(cached, transform, context)
+        
+        if not self.ollama_available:
+            return self._get_fallback_decision(context)
+        
+        parser = IncrementalJSONParser()
+        payload = self._chat_payload(self._build_prompt(context), max_tokens, stream=True)
+        finished = False
+        try:
+            async with self._semaphore:
+                async with self.client.stream("POST", "/api/chat", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        token = chunk.get("message", {}).get("content", "")
+                        if token:
+                            await on_chunk({"token": token, "fields": parser.feed(token)})
+                        if chunk.get("done"):
+                            finished = True
+                            break
+        except Exception as e:
+            logger.error(f"Ollama stream error: {e}")
+        
+        # A cut-off stream leaves partial fields; never pool or cache those
+        decision = parser.result() if finished and parser.done else None
+        if decision is None:
+            return self._get_fallback_decision(context)
+        
+        decision['route'] = 'server'
+        if is_content:
+            self.content_pool.add(self._content_key(context), context, decision)
+        if settings.ENABLE_LLM_CACHE:
+            await self.cache.set(cache_key, to_canonical(decision, transform), ttl=settings.LLM_CACHE_TTL)
+        return decision
+    
     def _build_prompt(self, context: Dict[str, Any]) -> str:
         """Build prompt based on context type"""
         decision_type = context.get("type", "")
@@ -164,19 +512,25 @@ Respond with JSON:
         decision_type = context.get("type", "")
         
         if decision_type == "enemy_movement":
-            # Simple pathfinding toward player
             enemy_pos = context.get("enemy_pos", (0, 0))
             player_pos = context.get("player_pos", (0, 0))
+            dungeon = context.get("dungeon")
             
-            dx = 0 if enemy_pos[0] == player_pos[0] else (1 if player_pos[0] > enemy_pos[0] else -1)
-            dy = 0 if enemy_pos[1] == player_pos[1] else (1 if player_pos[1] > enemy_pos[1] else -1)
+            if not dungeon:
+                # No map: step straight toward the player
+                dx = 0 if enemy_pos[0] == player_pos[0] else (1 if player_pos[0] > enemy_pos[0] else -1)
+                dy = 0 if enemy_pos[1] == player_pos[1] else (1 if player_pos[1] > enemy_pos[1] else -1)
+                return {"route": "fallback", "action": "move", "dx": dx, "dy": dy}
             
-            return {
-                "route": "fallback",
-                "action": "move",
-                "dx": dx,
-                "dy": dy
-            }
+            # Follow the shared Dijkstra map; "behavior" may ask to flee or keep at range
+            behavior = context.get("behavior", APPROACH)
+            kind = behavior if behavior in (FLEE, RANGED) else APPROACH
+            blocked = {tuple(p) for p in context.get("occupied", [])}
+            step = self.paths.step(dungeon, enemy_pos, player_pos, kind,
+                                   distance=context.get("range", 4), blocked=blocked,
+                                   version=context.get("map_version"))
+            if step is not None:
+                return {"route": "fallback", "action": "move", "dx": step[0], "dy": step[1]}
         
         return {
             "route": "fallback",
@@ -184,9 +538,8 @@ Respond with JSON:
         }
     
     def _generate_cache_key(self, context: Dict[str, Any]) -> str:
-        """Generate cache key from context"""
+        """Generate cache key from a (canonicalized) context"""
         import hashlib
-        import json
         
         # Sort keys for consistent hashing
         sorted_context = json.dumps(context, sort_keys=True)
@@ -0,0 +1,122 @@
+"""Batched, coalescing auto-save of game state to Postgres"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.game_save import GameSave
+
+logger = logging.getLogger(__name__)
+
+class SaveScheduler:
+    """
+    Marks sessions dirty and flushes them together every AUTO_SAVE_INTERVAL
+
+    Only the latest state per user is kept between flushes, so any number
+    of actions costs one row write. Each flush is a few multi-row
+    INSERT ... ON CONFLICT DO UPDATE statements in one transaction, so the
+    write rate depends on the interval rather than on player activity.
+    States that fail to save are re-queued unless a newer one arrived.
+    ``after_flush``, if set, is awaited with the user ids just written.
+    """
+
+    def __init__(self, interval: float = settings.AUTO_SAVE_INTERVAL, batch_size: int = settings.SAVE_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.after_flush: Optional[Callable[[List[str]], Awaitable[None]]] = None
+
+        self.marked = 0
+        self.coalesced = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def mark_dirty(self, user_id: str, state: Dict[str, Any]):
+        """Record the user's latest state for the next flush"""
+        if user_id in self._dirty:
+            self.coalesced += 1
+        self._dirty[user_id] = state
+        self.marked += 1
+
+    def is_dirty(self, user_id: str) -> bool:
+        return user_id in self._dirty
+
+    async def start(self):
+        """Start the periodic flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self, user_ids: Optional[Iterable[str]] = None) -> int:
+        """Write dirty states (all, or only ``user_ids``); returns rows written"""
+        async with self._lock:
+            if user_ids is None:
+                batch, self._dirty = self._dirty, {}
+            else:
+                batch = {uid: self._dirty.pop(uid) for uid in user_ids if uid in self._dirty}
+            if not batch:
+                return 0
+
+            now = datetime.now(timezone.utc)
+            rows = [{"user_id": uid, "state": state, "updated_at": now} for uid, state in batch.items()]
+            try:
+                async with AsyncSessionLocal() as session:
+                    async with session.begin():
+                        for i in range(0, len(rows), self.batch_size):
+                            stmt = insert(GameSave).values(rows[i:i + self.batch_size])
+                            stmt = stmt.on_conflict_do_update(
+                                index_elements=[GameSave.user_id],
+                                set_={"state": stmt.excluded.state, "updated_at": stmt.excluded.updated_at},
+                            )
+                            await session.execute(stmt)
+            except Exception as e:
+                logger.error(f"Auto-save of {len(rows)} sessions failed: {e}")
+                self.failures += 1
+                for uid, state in batch.items():
+                    self._dirty.setdefault(uid, state)
+                return 0
+
+            self.flushes += 1
+            self.rows_written += len(rows)
+            logger.debug(f"Auto-saved {len(rows)} sessions")
+            if self.after_flush is not None:
+                try:
+                    await self.after_flush(list(batch))
+                except Exception as e:
+                    logger.error(f"after_flush hook failed: {e}")
+            return len(rows)
+
+    async def close(self):
+        """Stop the loop and write whatever is still dirty"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Save coalescing counters"""
+        return {
+            "dirty": len(self._dirty),
+            "marked": self.marked,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+        }
+
+save_scheduler = SaveScheduler()
@@ -0,0 +1,119 @@
+"""Live game state kept in Redis, written behind to Postgres"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis_client import RedisClient, redis_client
+from app.models.game_save import GameSave
+from app.services.save_scheduler import SaveScheduler, save_scheduler
+
+logger = logging.getLogger(__name__)
+
+DIRTY_FIELD = "__dirty__"
+
+class SessionStore:
+    """
+    Per-user hot game state in Redis hashes (one field per top-level key)
+
+    A reconnect resumes from here, and saves write only the fields that
+    changed. Actions still run through GameService on a DB session held
+    for that one call, so this is a write-behind copy rather than the
+    state actions read; every action still takes a pooled connection.
+    Postgres is otherwise touched when loading a user Redis no longer
+    has and by the SaveScheduler's batched flush.
+
+    A ``__dirty__`` field marks state newer than Postgres; it is cleared
+    after the flush, so state left unflushed by a crashed worker is
+    re-queued the next time the user connects.
+    """
+    
+    def __init__(self, redis: RedisClient, scheduler: SaveScheduler, ttl: int = settings.SESSION_STATE_TTL):
+        self.redis = redis
+        self.scheduler = scheduler
+        self.ttl = ttl
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._encoded: Dict[str, Dict[str, str]] = {}
+        scheduler.after_flush = self._mark_flushed
+        
+        self.redis_loads = 0
+        self.db_loads = 0
+        self.fields_written = 0
+    
+    def _key(self, user_id: str) -> str:
+        return f"game:state:{user_id}"
+    
+    async def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """State from this worker, else Redis, else the last Postgres save"""
+        state = self._local.get(user_id)
+        if state is not None:
+            return state
+        
+        state = await self.redis.hgetall(self._key(user_id))
+        if state:
+            self.redis_loads += 1
+            if state.pop(DIRTY_FIELD, None):
+                self.scheduler.mark_dirty(user_id, state)
+        else:
+            state = await self._load_from_db(user_id)
+            if state is None:
+                return None
+            self.db_loads += 1
+            await self.redis.hset(self._key(user_id), state, ttl=self.ttl)
+        
+        self._local[user_id] = state
+        self._encoded[user_id] = self._encode(state)
+        return state
+    
+    def _encode(self, state: Dict[str, Any]) -> Dict[str, str]:
+        # Compared as JSON so in-place mutation by callers can't hide a change
+        return {key: json.dumps(value, sort_keys=True) for key, value in state.items()}
+    
+    async def _load_from_db(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with AsyncSessionLocal() as session:
+                save = await session.get(GameSave, user_id)
+                return dict(save.state) if save is not None else None
+        except Exception as e:
+            logger.error(f"Loading saved game for {user_id} failed: {e}")
+            return None
+    
+    async def save(self, user_id: str, state: Dict[str, Any]):
+        """Write changed fields to Redis and queue a write-behind flush"""
+        previous = self._encoded.get(user_id, {})
+        encoded = self._encode(state)
+        changed = {key: state[key] for key, value in encoded.items() if previous.get(key) != value}
+        changed[DIRTY_FIELD] = 1
+        await self.redis.hset(self._key(user_id), changed, ttl=self.ttl)
+        
+        removed = [key for key in previous if key not in state]
+        if removed:
+            await self.redis.hdel(self._key(user_id), *removed)
+        
+        self.fields_written += len(changed) - 1
+        self._local[user_id] = state
+        self._encoded[user_id] = encoded
+        self.scheduler.mark_dirty(user_id, state)
+    
+    async def _mark_flushed(self, user_ids: List[str]):
+        for user_id in user_ids:
+            # Saved again since the flush started: still newer than Postgres
+            if not self.scheduler.is_dirty(user_id):
+                await self.redis.hdel(self._key(user_id), DIRTY_FIELD)
+    
+    def release(self, user_id: str):
+        """Drop this worker's copy when the user disconnects (Redis keeps it)"""
+        self._local.pop(user_id, None)
+        self._encoded.pop(user_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Live session counters"""
+        return {
+            "live": len(self._local),
+            "redis_loads": self.redis_loads,
+            "db_loads": self.db_loads,
+            "fields_written": self.fields_written,
+        }
+
+session_store = SessionStore(redis_client, save_scheduler)
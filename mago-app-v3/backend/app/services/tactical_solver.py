@@ -0,0 +1,66 @@
+"""Rule-based pre-solver for enemy moves that don't need the LLM"""
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+from app.game_engine.pathfinding import DijkstraCache
+
+Position = Tuple[int, int]
+Grid = Sequence[Sequence[str]]
+
+class TacticalSolver:
+    """
+    Resolves obvious enemy moves locally and escalates the rest
+
+    - adjacent to the player: attack
+    - player beyond ``sight_radius``: wait
+    - player within ``sight_radius`` (walls in between or not) with a path
+      of at most ``2 * sight_radius`` steps: step along it
+
+    Anything else (no map, no path, already on the player's tile) returns
+    None and should go to the model.
+    Paths come from a shared DijkstraCache, so all enemies hunting one
+    player on a turn read the same distance field.
+    """
+
+    def __init__(self, sight_radius: int = 8, paths: Optional[DijkstraCache] = None):
+        self.sight_radius = sight_radius
+        self.paths = paths or DijkstraCache()
+        self.resolved: Dict[str, int] = {"attack": 0, "move": 0, "wait": 0}
+        self.escalated = 0
+
+    def solve(self, enemy_pos: Sequence[int], player_pos: Sequence[int],
+              grid: Optional[Grid] = None, map_version: Optional[Hashable] = None) -> Optional[Dict[str, Any]]:
+        """Decision dict for an obvious case, or None to escalate; ``map_version`` keys the path cache"""
+        ex, ey = enemy_pos
+        px, py = player_pos
+        dx, dy = px - ex, py - ey
+        distance = max(abs(dx), abs(dy))
+
+        if distance == 1:
+            return self._resolve({"action": "attack", "dx": dx, "dy": dy, "target": "player"})
+        if distance > self.sight_radius:
+            return self._resolve({"action": "wait"})
+        if not grid:
+            return self._escalate()
+
+        step = self.paths.step(grid, (ex, ey), (px, py), max_distance=2 * self.sight_radius,
+                               version=map_version)
+        if step is None:
+            return self._escalate()
+        return self._resolve({"action": "move", "dx": step[0], "dy": step[1]})
+
+    def _resolve(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        self.resolved[decision["action"]] += 1
+        return decision
+
+    def _escalate(self) -> None:
+        self.escalated += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Resolved/escalated counters and the share sent to the model"""
+        total = sum(self.resolved.values()) + self.escalated
+        return {
+            "resolved": dict(self.resolved),
+            "escalated": self.escalated,
+            "escalation_ratio": round(self.escalated / total, 4) if total else 0.0,
+        }
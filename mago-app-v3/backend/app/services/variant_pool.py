@@ -0,0 +1,164 @@
+"""Bounded pools of generated content variants, bucketed by normalized parameters"""
+import asyncio
+import copy
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Generator = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+def level_band(level: int, band_size: int) -> int:
+    """Levels 1..band_size share band 0, the next band_size band 1, ..."""
+    return max(int(level) - 1, 0) // band_size
+
+def band_levels(band: int, band_size: int) -> Tuple[int, int]:
+    """Lowest and highest level in a level band"""
+    return band * band_size + 1, (band + 1) * band_size
+
+class _Bucket:
+    def __init__(self, context: Dict[str, Any]):
+        self.context = context
+        self.variants: List[Dict[str, Any]] = []
+        self.uses: List[int] = []
+        self.refill: Optional[asyncio.Task] = None
+        # Requests waiting on a cold bucket for the refill's next variant
+        self.waiters: List[asyncio.Future] = []
+
+class VariantPool:
+    """
+    A few generated variants per bucket, served at random and refilled
+
+    Each bucket (e.g. (level band, theme, type)) keeps up to ``variants``
+    results from ``generate``. A variant is retired after ``max_uses``
+    serves and replaced in the background, so repeated requests stay
+    varied without waiting on the model. At most ``max_buckets`` buckets
+    are kept, least recently used first out. ``generate`` may return None
+    for results that should not be pooled (e.g. fallbacks).
+    """
+
+    def __init__(self, generate: Generator, variants: int = 4, max_uses: int = 3, max_buckets: int = 64):
+        self.generate = generate
+        self.variants = variants
+        self.max_uses = max_uses
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    def _bucket(self, key: Hashable, context: Dict[str, Any]) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(context)
+            while len(self._buckets) > self.max_buckets:
+                _, evicted = self._buckets.popitem(last=False)
+                if evicted.refill is not None:
+                    evicted.refill.cancel()
+        else:
+            bucket.context = context
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def take(self, key: Hashable, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A pooled variant (copy) if the bucket has one; schedules a refill either way"""
+        bucket = self._bucket(key, context)
+        variant = None
+        if bucket.variants:
+            i = random.randrange(len(bucket.variants))
+            variant = copy.deepcopy(bucket.variants[i])
+            bucket.uses[i] += 1
+            if bucket.uses[i] >= self.max_uses:
+                del bucket.variants[i], bucket.uses[i]
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._schedule_refill(bucket)
+        return variant
+
+    async def get(self, key: Hashable, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        A pooled variant, or on a cold bucket the refill's next one
+
+        Waits on the bucket's refill rather than generating alongside it,
+        so a cold bucket costs one model call however many requests hit
+        it. None when the refill produces nothing poolable.
+        """
+        variant = self.take(key, context)
+        if variant is not None:
+            return variant
+        bucket = self._bucket(key, context)
+        if bucket.refill is None or bucket.refill.done():
+            return None
+        waiter = asyncio.get_running_loop().create_future()
+        bucket.waiters.append(waiter)
+        try:
+            return await waiter
+        finally:
+            if waiter in bucket.waiters:
+                bucket.waiters.remove(waiter)
+
+    def add(self, key: Hashable, context: Dict[str, Any], variant: Optional[Dict[str, Any]]):
+        """Offer a result generated elsewhere to the bucket"""
+        bucket = self._bucket(key, context)
+        if variant is not None and len(bucket.variants) < self.variants:
+            bucket.variants.append(copy.deepcopy(variant))
+            bucket.uses.append(1)
+
+    def _schedule_refill(self, bucket: _Bucket):
+        if len(bucket.variants) >= self.variants or (bucket.refill is not None and not bucket.refill.done()):
+            return
+        bucket.refill = asyncio.create_task(self._refill(bucket))
+        self._tasks.add(bucket.refill)
+        bucket.refill.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, bucket: _Bucket):
+        # One generation at a time per bucket keeps model load predictable
+        try:
+            while len(bucket.variants) < self.variants:
+                try:
+                    variant = await self.generate(bucket.context)
+                except Exception as e:
+                    logger.error(f"Variant generation failed: {e}")
+                    return
+                if variant is None:
+                    return
+                self.generated += 1
+                served = self._serve_waiters(bucket, variant)
+                if served < self.max_uses:
+                    bucket.variants.append(variant)
+                    bucket.uses.append(served)
+        finally:
+            self._serve_waiters(bucket, None)
+
+    @staticmethod
+    def _serve_waiters(bucket: _Bucket, variant: Optional[Dict[str, Any]]) -> int:
+        """Hand ``variant`` (a copy each) to every waiting request; returns how many"""
+        waiters, bucket.waiters = bucket.waiters, []
+        served = 0
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(copy.deepcopy(variant))
+                served += 1
+        return served
+
+    async def close(self):
+        """Cancel pending refills"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool hit/miss counters and size"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "buckets": len(self._buckets),
+            "variants": sum(len(b.variants) for b in self._buckets.values()),
+            "refilling": len(self._tasks),
+        }
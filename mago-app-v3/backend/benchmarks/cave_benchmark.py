@@ -0,0 +1,109 @@
+"""
+Benchmark: per-cell vs vectorized cave cellular automata, then the full
+DungeonGenerator._generate_cave (noise, automata, region connection)
+with per-cell vs batched noise
+
+Run from mago-app-v3/backend:
+    python -m benchmarks.cave_benchmark
+or as a script from anywhere:
+    python mago-app-v3/backend/benchmarks/cave_benchmark.py
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+import numpy as np
+
+if __package__ in (None, ""):
+    # Run as a script: make the backend's "app" package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.game_engine import cellular_automata
+from app.game_engine.dungeon_generator import DungeonGenerator
+from app.game_engine.tile_grid import new_grid
+
+SIZES = [(80, 40), (256, 256), (1024, 1024)]
+
+def reference_step(walls: List[List[bool]]) -> List[List[bool]]:
+    """Original per-cell iteration (one neighbour lookup per cell per offset)"""
+    height, width = len(walls), len(walls[0])
+    new_walls = [row[:] for row in walls]
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            count = 0
+            for dy in [-1, 0, 1]:
+                for dx in [-1, 0, 1]:
+                    if dx == 0 and dy == 0:
+                        continue
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < width and 0 <= ny < height:
+                        count += walls[ny][nx]
+                    else:
+                        count += 1
+            if count >= 5:
+                new_walls[y][x] = True
+            elif count <= 3:
+                new_walls[y][x] = False
+    return new_walls
+
+class PerCellNoiseGenerator(DungeonGenerator):
+    """Cave noise drawn with one rng.random() call per cell, as before batching"""
+
+    def _random_floats(self, count: int) -> np.ndarray:
+        return np.array([self.rng.random() for _ in range(count)])
+
+def generate_cave(cls: type, width: int, height: int, seed: int) -> DungeonGenerator:
+    generator = cls(width, height, seed=seed)
+    generator.grid = new_grid(width, height)
+    generator._generate_cave(level=1)
+    return generator
+
+def _time(fn: Callable[[], object], min_seconds: float) -> float:
+    """Average seconds per call, repeating until min_seconds has elapsed"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--min-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'size':>11} {'per-cell':>12} {'vectorized':>12} {'speedup':>9}")
+    for width, height in SIZES:
+        rng = random.Random(args.seed)
+        walls = np.array(
+            [[rng.random() >= 0.45 for _ in range(width)] for _ in range(height)]
+        )
+        walls_list = walls.tolist()
+
+        expected = reference_step(walls_list)
+        assert cellular_automata.step(walls).tolist() == expected, "layouts differ"
+
+        slow = _time(lambda: reference_step(walls_list), args.min_seconds)
+        fast = _time(lambda: cellular_automata.step(walls), args.min_seconds)
+        print(f"{width:>5}x{height:<5} {slow * 1000:>10.2f}ms {fast * 1000:>10.3f}ms {slow / fast:>8.0f}x")
+
+    print()
+    print(f"{'_generate_cave':>11} {'per-cell noise':>15} {'batched noise':>14} {'speedup':>9}")
+    for width, height in SIZES:
+        expected = generate_cave(PerCellNoiseGenerator, width, height, args.seed)
+        actual = generate_cave(DungeonGenerator, width, height, args.seed)
+        assert np.array_equal(expected.grid, actual.grid), "layouts differ"
+        assert expected.rng.getstate() == actual.rng.getstate(), "random streams differ"
+
+        slow = _time(lambda: generate_cave(PerCellNoiseGenerator, width, height, args.seed), args.min_seconds)
+        fast = _time(lambda: generate_cave(DungeonGenerator, width, height, args.seed), args.min_seconds)
+        print(f"{width:>5}x{height:<5} {slow * 1000:>13.2f}ms {fast * 1000:>12.2f}ms {slow / fast:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
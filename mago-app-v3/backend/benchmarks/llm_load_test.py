@@ -0,0 +1,77 @@
+"""
+Load test: event-loop responsiveness while LLM inference is in flight
+
+Runs concurrent MODERATE decisions against a stub Ollama that takes
+--latency seconds per call, while a ticker (standing in for other
+players' sockets) measures how late it wakes up. Compares the async
+client path with a blocking call made inside the coroutine.
+
+Run from mago-app-v3/backend:
+    python -m benchmarks.llm_load_test
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+import httpx
+
+from app.core.config import settings
+from app.services.llm_service import HybridLLMService
+
+CONTEXT = {"type": "combat_tactic", "enemy_type": "goblin"}
+REPLY = {"message": {"role": "assistant", "content": json.dumps({"action": "attack"})}}
+
+async def _ticker(lags: List[float], stop: asyncio.Event, interval: float = 0.01):
+    """Wake every ``interval`` and record how late each wake-up was"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def _run(service: HybridLLMService, requests: int) -> List[float]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    await asyncio.gather(*(service.get_decision(dict(CONTEXT, n=i)) for i in range(requests)))
+    stop.set()
+    await ticker
+    return lags
+
+def _report(name: str, lags: List[float], elapsed: float):
+    lags = sorted(lags) or [0.0]
+    p99 = lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[0]
+    print(f"{name:>9}: total {elapsed:6.2f}s  ticks {len(lags):4d}  "
+          f"max lag {lags[-1] * 1000:8.1f}ms  p99 lag {p99 * 1000:8.1f}ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.25)
+    args = parser.parse_args()
+    settings.ENABLE_LLM_CACHE = False
+
+    async def stub(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(args.latency)
+        return httpx.Response(200, json=REPLY)
+
+    service = HybridLLMService()
+    service._client = httpx.AsyncClient(base_url=settings.OLLAMA_HOST, transport=httpx.MockTransport(stub))
+    start = time.perf_counter()
+    lags = await _run(service, args.requests)
+    _report("async", lags, time.perf_counter() - start)
+    await service.close()
+
+    # Previous behaviour: a synchronous client call inside the coroutine
+    class BlockingService(HybridLLMService):
+        async def _get_ollama_decision(self, context, max_tokens=200):
+            time.sleep(args.latency)
+            return dict(json.loads(REPLY["message"]["content"]), route="server")
+
+    start = time.perf_counter()
+    lags = await _run(BlockingService(), args.requests)
+    _report("blocking", lags, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    asyncio.run(main())
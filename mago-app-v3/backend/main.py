@@ -1,16 +1,24 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Optional, Set
 
 from app.api import auth, game, llm
 from app.core.config import settings
-from app.core.database import engine, Base, get_db
+from app.core.database import AsyncSessionLocal, engine, Base
 from app.core.websocket_manager import manager
 from app.core.redis_client import redis_client
+from app.core.state_sync import StateSync
+from app.game_engine import map_codec
+from app.game_engine.fov import PlayerView
 from app.services.game_service import GameService
+from app.services.dungeon_pool import dungeon_pool
+from app.services.llm_service import llm_service
+from app.services.save_scheduler import save_scheduler
+from app.services.session_store import session_store
 
 # Configure logging
 logging.basicConfig(
@@ -25,7 +33,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     # Startup
     logger.info("Starting Mago V3 Backend...")
     
-    # Create database tables
+    # Create database tables (models register on import)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
@@ -33,20 +41,26 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     await redis_client.ping()
     logger.info("Redis connected")
     
-    # Pull Ollama model if needed
-    try:
-        import ollama
-        models = ollama.list()
-        if not any(m['name'].startswith('llama3.2') for m in models['models']):
-            logger.info("Pulling Ollama model...")
-            ollama.pull('llama3.2:3b-instruct-q4_K_M')
-    except Exception as e:
-        logger.warning(f"Ollama not available: {e}")
+    # Keep per-worker LLM caches coherent across workers
+    await llm_service.cache.start()
+    
+    # Pull the Ollama model in the background if it's missing
+    await llm_service.check_ollama(pull_model=True)
+    
+    # Warm the dungeon pool for first levels
+    for theme in ("dungeon", "cave", "fortress"):
+        await dungeon_pool.prefill(theme, level=1)
+    
+    # Batched auto-save every AUTO_SAVE_INTERVAL seconds
+    await save_scheduler.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down Mago V3 Backend...")
+    await save_scheduler.close()
+    await dungeon_pool.close()
+    await llm_service.close()
     await redis_client.close()
 
 app = FastAPI(
@@ -80,24 +94,93 @@ async def health_check():
             "database": "connected",
             "redis": "connected",
             "ollama": "available"
-        }
+        },
+        "dungeon_pool": dungeon_pool.stats(),
+        "llm": llm_service.stats(),
+        "auto_save": save_scheduler.stats(),
+        "sessions": session_store.stats()
     }
 
+@asynccontextmanager
+async def game_service_scope() -> AsyncGenerator[GameService, None]:
+    """GameService(db, redis) on a DB session held for one call, committed on success"""
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            yield GameService(db, redis_client)
+
+async def send_state_update(user_id: str, state: dict, map_encoding: str, sync: StateSync,
+                            view: Optional[PlayerView] = None):
+    """
+    Send a STATE_DELTA, or a STATE_UPDATE keyframe when the client needs one
+    
+    With a PlayerView the client only gets tiles its player can see or
+    remembers (unseen tiles are " ") and entities in view, so deltas
+    carry newly revealed tiles rather than the whole level.
+    
+    Keyframes with a binary map encoding carry
+    "dungeon": {"encoding": ..., "binary": true} and the encoded map
+    follows immediately as a binary WebSocket frame.
+    """
+    if view is not None:
+        state = view.filter_state(state)
+    message = sync.encode(state)
+    dungeon = state.get("dungeon")
+    if message["type"] == "STATE_DELTA" or map_encoding == map_codec.ENCODING_JSON or not dungeon:
+        await manager.send_personal_message(message, user_id)
+        return
+    
+    payload = map_codec.encode_map(dungeon, compress=map_encoding == map_codec.ENCODING_RLE_ZLIB)
+    message["data"] = {**state, "dungeon": {"encoding": map_encoding, "binary": True}}
+    await manager.send_personal_message(message, user_id)
+    await manager.send_personal_bytes(payload, user_id)
+
+async def stream_llm_request(user_id: str, request_id: Any, context: dict):
+    """Stream an LLM request to the user as LLM_CHUNK events, then LLM_RESULT"""
+    async def forward(chunk: dict):
+        await manager.send_personal_message(
+            {"type": "LLM_CHUNK", "data": {"request_id": request_id, **chunk}},
+            user_id
+        )
+    
+    # map_version is only trusted from the server's own state; a client's could alias another map
+    context = {k: v for k, v in context.items() if k != "map_version"}
+    try:
+        result = await llm_service.stream_decision(context, forward)
+        await manager.send_personal_message(
+            {"type": "LLM_RESULT", "data": {"request_id": request_id, "result": result}},
+            user_id
+        )
+    except Exception as e:
+        logger.error(f"LLM stream error: {e}", exc_info=True)
+        await manager.send_personal_message({"type": "ERROR", "message": str(e)}, user_id)
+
 @app.websocket("/ws/{token}")
-async def websocket_endpoint(websocket: WebSocket, token: str, db = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, token: str):
     """
     WebSocket endpoint for real-time game updates
     
+    Query params:
+    - map_encoding: "json" (default) | "rle" | "rle+zlib"
+    
     Client sends:
     - ACTION: {"type": "move", "direction": "north"}
+    - ACK: {"seq": n} after applying STATE_UPDATE/STATE_DELTA n
+    - LLM_REQUEST: {"request_id": ..., "context": {"type": "generate_quest", ...}}
     - PING: {}
     - SAVE: {}
     
     Server sends:
-    - STATE_UPDATE: {full game state delta}
+    - STATE_UPDATE: {"seq": n, "keyframe": true, "data": full game state}
+    - STATE_DELTA: {"seq": n, "base": acked seq, "data": diff against base}
+    - LLM_CHUNK: {"request_id", "token", "fields": {completed JSON fields}}
+    - LLM_RESULT: {"request_id", "result": {...}}
     - EVENT: {"type": "level_up", "data": {...}}
     - ERROR: {"message": "..."}
     - PONG: {}
+    
+    The connection holds no DB session between messages: each ACTION
+    runs GameService on its own short session, and session_store (Redis)
+    keeps a write-behind copy a reconnect resumes from.
     """
     # Verify token and get user
     from app.core.auth import verify_token
@@ -107,16 +190,21 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db = Depends(get_
         await websocket.close(code=1008, reason="Invalid token")
         return
     
+    map_encoding = map_codec.negotiate(websocket.query_params.get("map_encoding", "json"))
+    
     await manager.connect(websocket, user_id)
-    game_service = GameService(db, redis_client)
+    sync = StateSync()
+    view = PlayerView(settings.FOV_RADIUS, settings.FOV_CACHE_ENTRIES) if settings.ENABLE_FOV else None
+    llm_tasks: Set[asyncio.Task] = set()
     
     try:
-        # Send initial state
-        state = await game_service.get_game_state(user_id)
-        await manager.send_personal_message(
-            {"type": "STATE_UPDATE", "data": state},
-            user_id
-        )
+        # Send initial state (new players get one from the game service)
+        state = await session_store.load(user_id)
+        if state is None:
+            async with game_service_scope() as game_service:
+                state = await game_service.get_game_state(user_id)
+            await session_store.save(user_id, state)
+        await send_state_update(user_id, state, map_encoding, sync, view)
         
         while True:
             data = await websocket.receive_json()
@@ -125,15 +213,27 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db = Depends(get_
                 await manager.send_personal_message({"type": "PONG"}, user_id)
                 continue
             
+            if data.get("type") == "ACK":
+                sync.ack(data.get("seq"))
+                continue
+            
+            if data.get("type") == "LLM_REQUEST":
+                # Stream in the background so the socket keeps taking messages
+                task = asyncio.create_task(
+                    stream_llm_request(user_id, data.get("request_id"), data.get("context", {}))
+                )
+                llm_tasks.add(task)
+                task.add_done_callback(llm_tasks.discard)
+                continue
+            
             if data.get("type") == "ACTION":
-                # Process player action
-                result = await game_service.process_action(user_id, data.get("action"))
+                # Process player action; written behind with the next auto-save batch
+                async with game_service_scope() as game_service:
+                    result = await game_service.process_action(user_id, data.get("action"))
+                await session_store.save(user_id, result["state"])
                 
                 # Send state update
-                await manager.send_personal_message(
-                    {"type": "STATE_UPDATE", "data": result["state"]},
-                    user_id
-                )
+                await send_state_update(user_id, result["state"], map_encoding, sync, view)
                 
                 # Broadcast events to relevant players
                 if result.get("events"):
@@ -144,7 +244,11 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db = Depends(get_
                         )
             
             elif data.get("type") == "SAVE":
-                await game_service.save_game(user_id)
+                # Write now if anything changed since the last auto-save
+                await save_scheduler.flush([user_id])
+                if settings.ENABLE_LEGACY_SAVE:
+                    async with game_service_scope() as game_service:
+                        await game_service.save_game(user_id)
                 await manager.send_personal_message(
                     {"type": "EVENT", "data": {"type": "save_complete"}},
                     user_id
@@ -159,9 +263,17 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db = Depends(get_
             user_id
         )
     finally:
+        for task in llm_tasks:
+            task.cancel()
         manager.disconnect(user_id)
-        # Auto-save on disconnect
-        await game_service.save_game(user_id)
+        # Unsaved changes are already queued for the next auto-save batch
+        if settings.ENABLE_LEGACY_SAVE:
+            try:
+                async with game_service_scope() as game_service:
+                    await game_service.save_game(user_id)
+            except Exception as e:
+                logger.error(f"Legacy save for {user_id} failed: {e}")
+        session_store.release(user_id)
 
 if __name__ == "__main__":
     import uvicorn
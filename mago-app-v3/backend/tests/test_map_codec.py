@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+from app.game_engine import map_codec
+
+def _map(width, height, seed=0):
+    rng = random.Random(seed)
+    return [[rng.choice("#..+~") for _ in range(width)] for _ in range(height)]
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("rows", [
+    _map(80, 40),
+    [["#"] * 600],  # runs longer than 255 tiles
+    [["."]],
+    [],
+])
+def test_round_trip(rows, compress):
+    assert map_codec.decode_map(map_codec.encode_map(rows, compress=compress)) == rows
+
+def test_header_flags_compression():
+    rows = _map(10, 10)
+    assert map_codec.encode_map(rows, compress=False)[0] == 0
+    assert map_codec.encode_map(rows, compress=True)[0] == map_codec.FLAG_ZLIB
+
+def test_truncated_payload_is_rejected():
+    data = map_codec.encode_map(_map(20, 10), compress=False)
+    with pytest.raises(ValueError):
+        map_codec.decode_map(data[:-2])
+
+def test_negotiate_falls_back_to_json():
+    assert map_codec.negotiate("rle+zlib") == map_codec.ENCODING_RLE_ZLIB
+    assert map_codec.negotiate("bogus") == map_codec.ENCODING_JSON
@@ -0,0 +1,73 @@
+import copy
+
+from app.core.state_sync import StateSync, apply_delta, diff_state
+
+def _state():
+    return {
+        "player": {"position": [1, 1], "health": 20, "stats": {"str": 3}},
+        "dungeon": [list("#####"), list("#...#"), list("#####")],
+        "entities": [{"id": "a", "hp": 3}, {"id": "b", "hp": 5}],
+        "message_log": ["one", "two", "three"],
+        "level": 1,
+    }
+
+def _round_trip(old, new):
+    delta = diff_state(old, new)
+    assert apply_delta(copy.deepcopy(old), delta) == new
+    return delta
+
+def test_unchanged_state_has_empty_delta():
+    assert _round_trip(_state(), _state()) == {}
+
+def test_tiles_are_sent_as_cells():
+    new = _state()
+    new["dungeon"][1][2] = "+"
+    assert _round_trip(_state(), new) == {"tiles": {"dungeon": [[2, 1, "+"]]}}
+
+def test_resized_map_is_replaced():
+    new = _state()
+    new["dungeon"] = [list("###"), list("#.#")]
+    assert _round_trip(_state(), new)["set"] == {"dungeon": new["dungeon"]}
+
+def test_entities_upsert_remove_and_reorder():
+    new = _state()
+    new["entities"] = [{"id": "c", "hp": 1}, {"id": "a", "hp": 2}]
+    delta = _round_trip(_state(), new)["entities"]["entities"]
+    assert delta["remove"] == ["b"]
+    assert delta["order"] == ["c", "a"]
+
+def test_log_appends_and_trims():
+    new = _state()
+    new["message_log"] = ["two", "three", "four", "five"]
+    delta = _round_trip(_state(), new)
+    assert delta["append"] == {"message_log": {"lines": ["four", "five"], "length": 4}}
+
+def test_nested_set_and_unset():
+    new = _state()
+    new["player"]["stats"]["dex"] = 2
+    new["player"]["health"] = 15
+    del new["level"]
+    new["theme"] = "cave"
+    delta = _round_trip(_state(), new)
+    assert delta["unset"] == ["level"]
+    assert delta["set"] == {"theme": "cave"}
+
+def test_sync_sends_deltas_against_acked_state():
+    sync = StateSync(keyframe_interval=100, max_lag=8)
+    first = _state()
+    keyframe = sync.encode(first)
+    assert keyframe["type"] == "STATE_UPDATE"
+    client = {keyframe["seq"]: copy.deepcopy(keyframe["data"])}
+    sync.ack(keyframe["seq"])
+
+    second = _state()
+    second["player"]["position"] = [2, 1]
+    message = sync.encode(second)
+    assert message["type"] == "STATE_DELTA" and message["base"] == keyframe["seq"]
+    assert apply_delta(client[message["base"]], message["data"]) == second
+
+def test_sync_sends_keyframe_when_client_lags():
+    sync = StateSync(keyframe_interval=100, max_lag=2)
+    sync.ack(sync.encode(_state())["seq"])
+    messages = [sync.encode(_state()) for _ in range(3)]
+    assert [m["type"] for m in messages] == ["STATE_DELTA", "STATE_DELTA", "STATE_UPDATE"]
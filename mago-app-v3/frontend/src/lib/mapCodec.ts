@@ -0,0 +1,52 @@
+/**
+ * Decoder for the compact binary dungeon map format
+ *
+ * Negotiate with `?map_encoding=rle` or `?map_encoding=rle+zlib` on the
+ * WebSocket URL. STATE_UPDATE then carries
+ * `dungeon: { encoding, binary: true }` and the map follows as a binary frame:
+ *
+ *   u8 flags (bit 0 = zlib) | u16 width | u16 height | (count u8, tile u8)*
+ */
+
+export type MapEncoding = 'json' | 'rle' | 'rle+zlib';
+
+const FLAG_ZLIB = 0x01;
+const HEADER_SIZE = 5;
+
+async function inflate(data: Uint8Array): Promise<Uint8Array> {
+  // zlib streams are the 'deflate' format of the Compression Streams API
+  const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+export async function decodeMap(buffer: ArrayBuffer): Promise<string[][]> {
+  const view = new DataView(buffer);
+  const flags = view.getUint8(0);
+  const width = view.getUint16(1);
+  const height = view.getUint16(3);
+
+  let body = new Uint8Array(buffer, HEADER_SIZE);
+  if (flags & FLAG_ZLIB) {
+    body = await inflate(body);
+  }
+
+  const tiles = new Uint8Array(width * height);
+  let offset = 0;
+  for (let i = 0; i + 1 < body.length; i += 2) {
+    tiles.fill(body[i + 1], offset, offset + body[i]);
+    offset += body[i];
+  }
+  if (offset !== tiles.length) {
+    throw new Error('Map payload does not match its dimensions');
+  }
+
+  const map: string[][] = [];
+  for (let y = 0; y < height; y++) {
+    const row: string[] = [];
+    for (let x = 0; x < width; x++) {
+      row.push(String.fromCharCode(tiles[y * width + x]));
+    }
+    map.push(row);
+  }
+  return map;
+}
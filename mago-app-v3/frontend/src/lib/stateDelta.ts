@@ -0,0 +1,62 @@
+/**
+ * Client side of STATE_UPDATE / STATE_DELTA sync
+ *
+ * Keep the state of every message until it is acknowledged; a delta is
+ * applied to the state of its `base` seq. Send `{type: 'ACK', seq}` after
+ * applying each message so the server can diff against it.
+ */
+
+type State = Record<string, any>;
+
+interface EntityDelta {
+  upsert?: { id: string }[];
+  remove?: string[];
+  order?: string[];
+}
+
+export interface StateDelta {
+  set?: State;
+  unset?: string[];
+  tiles?: Record<string, [number, number, string][]>;
+  entities?: Record<string, EntityDelta>;
+  append?: Record<string, { lines: string[]; length: number }>;
+  nested?: Record<string, StateDelta>;
+}
+
+export function applyDelta(state: State, delta: StateDelta): State {
+  const result: State = { ...state };
+  for (const key of delta.unset ?? []) {
+    delete result[key];
+  }
+  Object.assign(result, delta.set ?? {});
+
+  for (const [key, sub] of Object.entries(delta.nested ?? {})) {
+    result[key] = applyDelta(result[key], sub);
+  }
+  for (const [key, changes] of Object.entries(delta.tiles ?? {})) {
+    const rows: string[][] = result[key].map((row: string[]) => row.slice());
+    for (const [x, y, tile] of changes) {
+      rows[y][x] = tile;
+    }
+    result[key] = rows;
+  }
+  for (const [key, { lines, length }] of Object.entries(delta.append ?? {})) {
+    const merged = [...result[key], ...lines];
+    result[key] = merged.slice(merged.length - length);
+  }
+  for (const [key, sub] of Object.entries(delta.entities ?? {})) {
+    const byId = new Map<string, any>(result[key].map((e: any) => [e.id, e]));
+    let order: string[] = result[key].map((e: any) => e.id);
+    const removed = new Set(sub.remove ?? []);
+    order = order.filter((id) => !removed.has(id));
+    removed.forEach((id) => byId.delete(id));
+    for (const entity of sub.upsert ?? []) {
+      if (!byId.has(entity.id)) {
+        order.push(entity.id);
+      }
+      byId.set(entity.id, entity);
+    }
+    result[key] = (sub.order ?? order).map((id) => byId.get(id));
+  }
+  return result;
+}
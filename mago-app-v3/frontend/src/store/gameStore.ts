@@ -5,12 +5,32 @@
  * - Player state (position, health, inventory, skills)
  * - Dungeon map
  * - Entities (enemies, NPCs)
- * - WebSocket connection
+ * - WebSocket connection (STATE_UPDATE keyframes, STATE_DELTA diffs
+ *   against the last acknowledged state, binary map frames)
  * - UI state
  */
 
 import { create } from 'zustand';
 import { immer } from 'zustand/middleware/immer';
+import { applyDelta, StateDelta } from '@/lib/stateDelta';
+import { decodeMap, MapEncoding } from '@/lib/mapCodec';
+
+type ServerState = Record<string, any>;
+
+// Server keeps the last 8 messages as delta bases; keep a few more
+const MAX_BASE_STATES = 16;
+
+let socket: WebSocket | null = null;
+// Messages are handled one at a time, in order (map decoding is async)
+let inbox: Promise<void> = Promise.resolve();
+// State of every applied message a later delta may be based on, by seq
+const baseStates = new Map<number, ServerState>();
+// A keyframe whose map follows as the next binary frame
+let awaitingMap: { seq: number; state: ServerState } | null = null;
+
+function preferredMapEncoding(): MapEncoding {
+  return typeof DecompressionStream !== 'undefined' ? 'rle+zlib' : 'rle';
+}
 
 export interface Position {
   x: number;
@@ -78,6 +98,8 @@ export interface GameState {
   wsConnected: boolean;
   wsUrl: string;
   token: string | null;
+  mapEncoding: MapEncoding;
+  serverState: ServerState | null;
   
   // UI
   selectedItem: string | null;
@@ -99,6 +121,10 @@ export interface GameState {
   
   setWsConnected: (connected: boolean) => void;
   setToken: (token: string | null) => void;
+  connect: () => void;
+  disconnect: () => void;
+  sendAction: (action: Record<string, any>) => void;
+  applyServerState: (state: ServerState) => void;
   
   addMessage: (message: string) => void;
   toggleInventory: () => void;
@@ -107,109 +133,201 @@ export interface GameState {
 }
 
 export const useGameStore = create<GameState>()(
-  immer((set) => ({
-    // Initial state
-    player: null,
-    dungeonMap: [],
-    dungeonLevel: 1,
-    dungeonTheme: 'dungeon',
-    entities: [],
-    wsConnected: false,
-    wsUrl: process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000/ws',
-    token: null,
-    selectedItem: null,
-    hoveredTile: null,
-    messageLog: ['Welcome to Mago V3!'],
-    showInventory: false,
-    showSkills: false,
-    
-    // Player actions
-    setPlayer: (player) => set((state) => {
-      state.player = player;
-    }),
-    
-    updatePlayerPosition: (position) => set((state) => {
-      if (state.player) {
-        state.player.position = position;
-      }
-    }),
-    
-    updatePlayerHealth: (health) => set((state) => {
-      if (state.player) {
-        state.player.health = Math.max(0, Math.min(health, state.player.maxHealth));
+  immer((set, get) => {
+    // Apply a state message, remember it as a delta base and acknowledge it
+    const accept = (seq: number, state: ServerState) => {
+      baseStates.set(seq, state);
+      while (baseStates.size > MAX_BASE_STATES) {
+        baseStates.delete(baseStates.keys().next().value as number);
       }
-    }),
-    
-    addItemToInventory: (item) => set((state) => {
-      if (state.player) {
-        // Check for existing stackable item
-        const existingItem = state.player.inventory.find(
-          i => i.id === item.id && i.stackable
-        );
-        
-        if (existingItem) {
-          existingItem.quantity += item.quantity;
-        } else {
-          state.player.inventory.push(item);
+      get().applyServerState(state);
+      socket?.send(JSON.stringify({ type: 'ACK', seq }));
+    };
+
+    const handle = async (data: string | ArrayBuffer) => {
+      if (data instanceof ArrayBuffer) {
+        if (awaitingMap) {
+          const { seq, state } = awaitingMap;
+          awaitingMap = null;
+          accept(seq, { ...state, dungeon: await decodeMap(data) });
         }
+        return;
       }
-    }),
-    
-    removeItemFromInventory: (itemId) => set((state) => {
-      if (state.player) {
-        state.player.inventory = state.player.inventory.filter(i => i.id !== itemId);
-      }
-    }),
-    
-    // World actions
-    setDungeonMap: (map) => set((state) => {
-      state.dungeonMap = map;
-    }),
-    
-    setEntities: (entities) => set((state) => {
-      state.entities = entities;
-    }),
-    
-    updateEntity: (entityId, updates) => set((state) => {
-      const entity = state.entities.find(e => e.id === entityId);
-      if (entity) {
-        Object.assign(entity, updates);
-      }
-    }),
-    
-    // WebSocket actions
-    setWsConnected: (connected) => set((state) => {
-      state.wsConnected = connected;
-    }),
-    
-    setToken: (token) => set((state) => {
-      state.token = token;
-    }),
-    
-    // UI actions
-    addMessage: (message) => set((state) => {
-      state.messageLog.push(message);
-      if (state.messageLog.length > 50) {
-        state.messageLog = state.messageLog.slice(-50);
-      }
-    }),
-    
-    toggleInventory: () => set((state) => {
-      state.showInventory = !state.showInventory;
-      if (state.showInventory) {
-        state.showSkills = false;
-      }
-    }),
-    
-    toggleSkills: () => set((state) => {
-      state.showSkills = !state.showSkills;
-      if (state.showSkills) {
-        state.showInventory = false;
+
+      const message = JSON.parse(data);
+      switch (message.type) {
+        case 'STATE_UPDATE':
+          if (message.data.dungeon?.binary) {
+            awaitingMap = { seq: message.seq, state: message.data };
+          } else {
+            accept(message.seq, message.data);
+          }
+          break;
+        case 'STATE_DELTA': {
+          // Older bases are never used again: the server's base only moves forward
+          for (const seq of baseStates.keys()) {
+            if (seq < message.base) baseStates.delete(seq);
+          }
+          const base = baseStates.get(message.base);
+          // Without its base the delta is dropped unacknowledged; the server
+          // falls back to a keyframe once we lag far enough behind
+          if (base) {
+            accept(message.seq, applyDelta(base, message.data as StateDelta));
+          }
+          break;
+        }
+        case 'ERROR':
+          get().addMessage(message.message);
+          break;
       }
-    }),
-    
-    setHoveredTile: (position) => set((state) => {
-      state.hoveredTile = position;
-    }),
-  }))
+    };
+
+    return {
+      // Initial state
+      player: null,
+      dungeonMap: [],
+      dungeonLevel: 1,
+      dungeonTheme: 'dungeon',
+      entities: [],
+      wsConnected: false,
+      wsUrl: process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000/ws',
+      token: null,
+      mapEncoding: preferredMapEncoding(),
+      serverState: null,
+      selectedItem: null,
+      hoveredTile: null,
+      messageLog: ['Welcome to Mago V3!'],
+      showInventory: false,
+      showSkills: false,
+      
+      // Player actions
+      setPlayer: (player) => set((state) => {
+        state.player = player;
+      }),
+      
+      updatePlayerPosition: (position) => set((state) => {
+        if (state.player) {
+          state.player.position = position;
+        }
+      }),
+      
+      updatePlayerHealth: (health) => set((state) => {
+        if (state.player) {
+          state.player.health = Math.max(0, Math.min(health, state.player.maxHealth));
+        }
+      }),
+      
+      addItemToInventory: (item) => set((state) => {
+        if (state.player) {
+          // Check for existing stackable item
+          const existingItem = state.player.inventory.find(
+            i => i.id === item.id && i.stackable
+          );
+        
+          if (existingItem) {
+            existingItem.quantity += item.quantity;
+          } else {
+            state.player.inventory.push(item);
+          }
+        }
+      }),
+      
+      removeItemFromInventory: (itemId) => set((state) => {
+        if (state.player) {
+          state.player.inventory = state.player.inventory.filter(i => i.id !== itemId);
+        }
+      }),
+      
+      // World actions
+      setDungeonMap: (map) => set((state) => {
+        state.dungeonMap = map;
+      }),
+      
+      setEntities: (entities) => set((state) => {
+        state.entities = entities;
+      }),
+      
+      updateEntity: (entityId, updates) => set((state) => {
+        const entity = state.entities.find(e => e.id === entityId);
+        if (entity) {
+          Object.assign(entity, updates);
+        }
+      }),
+      
+      // WebSocket actions
+      setWsConnected: (connected) => set((state) => {
+        state.wsConnected = connected;
+      }),
+      
+      setToken: (token) => set((state) => {
+        state.token = token;
+      }),
+      
+      connect: () => {
+        const { wsUrl, token, mapEncoding } = get();
+        if (!token || socket) return;
+      
+        baseStates.clear();
+        awaitingMap = null;
+        const ws = new WebSocket(`${wsUrl}/${token}?map_encoding=${encodeURIComponent(mapEncoding)}`);
+        ws.binaryType = 'arraybuffer';
+        ws.onopen = () => get().setWsConnected(true);
+        ws.onmessage = (event) => {
+          inbox = inbox.then(() => handle(event.data)).catch((error) => {
+            console.error('Failed to apply server message', error);
+          });
+        };
+        ws.onclose = () => {
+          if (socket === ws) socket = null;
+          get().setWsConnected(false);
+        };
+        socket = ws;
+      },
+      
+      disconnect: () => {
+        socket?.close();
+        socket = null;
+      },
+      
+      sendAction: (action) => {
+        socket?.send(JSON.stringify({ type: 'ACTION', action }));
+      },
+      
+      applyServerState: (serverState) => set((state) => {
+        state.serverState = serverState;
+        if (Array.isArray(serverState.dungeon)) {
+          state.dungeonMap = serverState.dungeon;
+        }
+        if (Array.isArray(serverState.entities)) {
+          state.entities = serverState.entities;
+        }
+      }),
+      
+      // UI actions
+      addMessage: (message) => set((state) => {
+        state.messageLog.push(message);
+        if (state.messageLog.length > 50) {
+          state.messageLog = state.messageLog.slice(-50);
+        }
+      }),
+      
+      toggleInventory: () => set((state) => {
+        state.showInventory = !state.showInventory;
+        if (state.showInventory) {
+          state.showSkills = false;
+        }
+      }),
+      
+      toggleSkills: () => set((state) => {
+        state.showSkills = !state.showSkills;
+        if (state.showSkills) {
+          state.showInventory = false;
+        }
+      }),
+      
+      setHoveredTile: (position) => set((state) => {
+        state.hoveredTile = position;
+      }),
+    };
+  })
 );